@@ -1,20 +1,79 @@
 import os
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 CALLBACK_URI = "https://schoolmanagingsystem.onrender.com/callback"
 CLIENT_ID = os.environ.get("client_id")
 CLIENT_SECRET = os.environ.get("client_secret")
+NOTIFY_API_URL = os.environ.get("NOTIFY_API_URL", "https://notify-api.line.me/api/notify")
+NOTIFY_BOT_URL = os.environ.get("NOTIFY_BOT_URL", "https://notify-bot.line.me")
+# How many messages are in flight at the same time in Push_messages
+MAX_WORKERS = int(os.environ.get("NOTIFY_MAX_WORKERS", 16))
+# (connect, read) timeout in seconds for every call to LINE
+TIMEOUT = (3.05, 10)
+# Longest we wait for a rate limit to reset before giving up on a message
+MAX_RATE_LIMIT_WAIT = 60
+
+
+class RateLimitRetry(Retry):
+    """Retry that also honours LINE's X-RateLimit-Reset header when there is no Retry-After."""
+
+    # a 503 only comes back when LINE says when to retry, 413 never does
+    RETRY_AFTER_STATUS_CODES = frozenset([429, 503])
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is not None:
+            return retry_after
+        if response.headers.get("X-RateLimit-Remaining") != "0":
+            return None
+        try:
+            wait = int(response.headers["X-RateLimit-Reset"]) - time.time()
+        except (KeyError, ValueError):
+            return None
+        if wait > MAX_RATE_LIMIT_WAIT:
+            return None
+        return max(wait, 0)
+
+
+def Create_session(pool_size=MAX_WORKERS):
+    # The notify POST isn't idempotent, only retry what says the message wasn't taken: connect errors,
+    # 429 and a 503 with Retry-After. A read error, 502 or 504 might mean LINE delivered it, those go
+    # back to the caller (the notify job records them) instead of being sent twice.
+    retry = RateLimitRetry(
+        total=3,
+        connect=3,
+        read=0,
+        backoff_factor=0.5,
+        status_forcelist=[429],
+        allowed_methods=["POST"],
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    # pool_block keeps the number of connections at pool_size, extra threads wait for a free one
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=retry, pool_block=True)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# Shared by every call so connections to LINE are kept alive and reused
+session = Create_session()
 
 
 def Generate_auth_link(user_id):
-    end_point = "https://notify-bot.line.me/oauth/authorize"
+    end_point = f"{NOTIFY_BOT_URL}/oauth/authorize"
     line_oauth_url = f'{end_point}?client_id={CLIENT_ID}&scope=notify&redirect_uri={CALLBACK_URI}&response_type=code&state={user_id}'
     return line_oauth_url
 
 
 def Get_access_token(code):
-    end_point = "https://notify-bot.line.me/oauth/token"
+    end_point = f"{NOTIFY_BOT_URL}/oauth/token"
     headers = {
         'Content-Type': "application/x-www-form-urlencoded"
     }
@@ -25,17 +84,36 @@ def Get_access_token(code):
         'client_id': CLIENT_ID,
         'client_secret': CLIENT_SECRET
     }
-    response = requests.post(url=end_point, headers=headers, params=request_params)
+    response = session.post(url=end_point, headers=headers, params=request_params, timeout=TIMEOUT)
     return response.json()
 
 
 def Push_message(token, message):
-    end_point = "https://notify-api.line.me/api/notify"
     headers = {
         'Authorization': f"Bearer {token}"
     }
     data = {
         'message': message
     }
-    response = requests.post(url=end_point, headers=headers, data=data)
+    response = session.post(url=NOTIFY_API_URL, headers=headers, data=data, timeout=TIMEOUT)
     return response.status_code
+
+
+def Push_messages(messages, max_workers=MAX_WORKERS):
+    """Push a list of (token, message) pairs in parallel.
+
+    Returns the status code of every message in the same order as `messages`,
+    or None for a message that could not be sent at all (connection error etc.).
+    """
+    if not messages:
+        return []
+
+    def push(pair):
+        token, message = pair
+        try:
+            return Push_message(token=token, message=message)
+        except requests.RequestException:
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(messages))) as executor:
+        return list(executor.map(push, messages))
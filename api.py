@@ -0,0 +1,167 @@
+import datetime
+import hashlib
+
+from flask import Blueprint, abort, current_app, g, jsonify, request
+from flask_login import current_user
+from sqlalchemy import func, select
+from sqlalchemy.orm import load_only
+
+from models import db, User, Student, Course, Communication, Test, Score
+from pagination import paginate
+from search import search
+
+# Versioned JSON API. Every row carries updated_at, so a GET first asks the database for the
+# validator only (the row's updated_at, or count + max(updated_at) for a list) and answers 304
+# when the client already has it, before any row is loaded or serialized.
+
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+
+class Resource:
+    def __init__(self, model, fields, sortable=(), filters=()):
+        self.model = model
+        # passwords and LINE tokens are never served, only the listed columns are
+        self.fields = ['id'] + list(fields) + ['updated_at']
+        self.sortable = {name: getattr(model, name) for name in sortable}
+        self.filters = list(filters)
+
+
+RESOURCES = {
+    'students': Resource(Student, ['name', 'grade', 'email', 'address', 'cellphone', 'tel_number', 'card_number'],
+                         sortable=['name', 'grade', 'updated_at']),
+    'users': Resource(User, ['name', 'email', 'cellphone'], sortable=['name', 'updated_at']),
+    'courses': Resource(Course, ['subject', 'teacher_id'], sortable=['subject', 'updated_at'], filters=['teacher_id']),
+    'tests': Resource(Test, ['title', 'course_id', 'teacher_id'], sortable=['title', 'updated_at'],
+                      filters=['course_id', 'teacher_id']),
+    'scores': Resource(Score, ['score', 'student_id', 'test_id'], sortable=['score', 'updated_at'],
+                       filters=['student_id', 'test_id']),
+    'communications': Resource(Communication, ['title', 'body', 'course_id', 'teacher_id'],
+                               sortable=['title', 'updated_at'], filters=['course_id', 'teacher_id']),
+}
+
+
+@api.before_request
+def require_login():
+    if not current_user.is_authenticated:
+        return abort(403, "Access forbidden - Admin access required")
+    # the API only reads
+    g.replica_reads = True
+
+
+def get_resource(name):
+    resource = RESOURCES.get(name)
+    if resource is None:
+        return abort(404, f"No resource called {name}")
+    return resource
+
+
+def selected_fields(resource):
+    """The fields named in ?fields=a,b (all of them by default), a 400 for unknown ones."""
+    wanted = [field for field in request.args.get('fields', "").split(",") if field]
+    unknown = [field for field in wanted if field not in resource.fields]
+    if unknown:
+        return abort(400, f"Unknown field(s): {', '.join(unknown)}")
+    return wanted or resource.fields
+
+
+def serialize(row, fields):
+    item = {}
+    for field in fields:
+        value = getattr(row, field)
+        item[field] = value.isoformat() if isinstance(value, datetime.datetime) else value
+    return item
+
+
+def etag_for(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def not_modified(etag, last_modified):
+    """A 304 response if the request's If-None-Match / If-Modified-Since already match, else None."""
+    if request.if_none_match:
+        matched = request.if_none_match.contains(etag)
+    elif request.if_modified_since and last_modified:
+        matched = last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    else:
+        matched = False
+    if not matched:
+        return None
+    return with_validators(current_app.response_class(status=304), etag, last_modified)
+
+
+def with_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified.replace(tzinfo=datetime.timezone.utc)
+    # clients have to revalidate, but may keep the body
+    response.cache_control.no_cache = True
+    return response
+
+
+def filtered(resource, stmt):
+    for name in resource.filters:
+        value = request.args.get(name, type=int)
+        if value is not None:
+            stmt = stmt.where(getattr(resource.model, name) == value)
+    return stmt
+
+
+@api.route('/search')
+def search_json():
+    page = max(request.args.get('page', 1, type=int), 1)
+    results, has_more = search(request.args.get('q', ""), request.args.getlist('kind'), page)
+    return jsonify({
+        'items': [{'kind': result['kind'], 'id': result['id'], 'title': result['title']} for result in results],
+        'next_page': page + 1 if has_more else None,
+    })
+
+
+@api.route('/<name>')
+def list_resource(name):
+    resource = get_resource(name)
+    fields = selected_fields(resource)
+    model = resource.model
+
+    count, last_modified = db.session.execute(
+        filtered(resource, select(func.count(model.id), func.max(model.updated_at)))
+    ).one()
+    args = sorted((key, value) for key, value in request.args.items(multi=True))
+    etag = etag_for(name, args, count, last_modified)
+    # a delete leaves max(updated_at) alone, only the ETag (with the count) notices it,
+    # so lists don't offer Last-Modified / If-Modified-Since
+    response = not_modified(etag, None)
+    if response is not None:
+        return response
+
+    # the cursor needs the id and the sort column even when ?fields= leaves them out
+    loaded = set(fields) | {'id'}
+    if request.args.get('sort') in resource.sortable:
+        loaded.add(request.args['sort'])
+    stmt = filtered(resource, select(model).options(load_only(*[getattr(model, field) for field in loaded])))
+    page = paginate(stmt, model, resource.sortable)
+    return with_validators(jsonify({
+        'items': [serialize(row, fields) for row in page.items],
+        'next': page.next_cursor,
+        'prev': page.prev_cursor,
+        'count': count,
+    }), etag, None)
+
+
+@api.route('/<name>/<int:row_id>')
+def get_row(name, row_id):
+    resource = get_resource(name)
+    fields = selected_fields(resource)
+    model = resource.model
+
+    last_modified = db.session.execute(select(model.updated_at).where(model.id == row_id)).scalar()
+    if last_modified is None:
+        return abort(404, f"No {name} with id {row_id}")
+    etag = etag_for(name, row_id, last_modified, fields)
+    response = not_modified(etag, last_modified)
+    if response is not None:
+        return response
+
+    row = db.session.execute(
+        select(model).options(load_only(*[getattr(model, field) for field in fields])).where(model.id == row_id)
+    ).scalar_one()
+    return with_validators(jsonify(serialize(row, fields)), etag, last_modified)
@@ -0,0 +1,91 @@
+import os
+
+from flask import Flask
+from flask_bootstrap import Bootstrap5
+from flask_login import LoginManager
+
+from models import db
+from migrations import upgrade
+from database import init_db
+from instrumentation import init_instrumentation
+from principals import load_principal
+from api import api
+from assets import assets, build as build_assets
+from views.site import site
+from views.auth import auth
+from views.line import line
+from views.students import students
+from views.users import users
+from views.courses import courses
+from views.tests import tests
+from views.comms import comms
+from views.exports import exports
+
+# create_app() builds the app without touching the database: engines connect on the first query,
+# so importing the app (a gunicorn worker booting, a script, a shell) costs no round trip and works
+# while the database is down. The schema is created and migrated by the CLI instead:
+#
+#   flask --app main db-create     create missing tables, then apply the migrations
+#   flask --app main db-upgrade    only apply the migrations
+#   flask --app main assets-build  minify, hash and compress the static assets, see assets.py
+#
+# Configuration comes from the environment: FLASK_KEY is the secret key, any FLASK_<NAME> variable
+# sets config[NAME] (FLASK_WTF_CSRF_ENABLED=false), database.py reads the database settings. The
+# `config` argument overrides all of them.
+#
+# `gunicorn --preload main:app` builds the app once in the master and forks the workers from it.
+# Nothing connects before the fork, and database.py drops inherited pool connections in the child.
+
+BLUEPRINTS = [site, auth, line, students, users, courses, tests, comms, exports, api, assets]
+
+bootstrap = Bootstrap5()
+login_manager = LoginManager()
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    return load_principal(user_id)
+
+
+def create_app(config=None):
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.environ.get('FLASK_KEY')
+    app.config.from_prefixed_env()
+    app.config.update(config or {})
+
+    bootstrap.init_app(app)
+    login_manager.init_app(app)
+    # Connect to DB, see database.py for the settings
+    engines = init_db(app)
+    # Request timing and profiling, off unless INSTRUMENT=1
+    init_instrumentation(app, engines)
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint)
+    register_commands(app)
+    return app
+
+
+def register_commands(app):
+    @app.cli.command("db-create")
+    def db_create():
+        """Create the tables that don't exist yet, then bring the database up to the current schema."""
+        with app.app_context():
+            db.create_all()
+            applied = upgrade(db.engine)
+        print(f"Tables created, {len(applied)} migration(s) applied")
+
+    @app.cli.command("db-upgrade")
+    def db_upgrade():
+        """Bring an existing database up to the current schema."""
+        with app.app_context():
+            applied = upgrade(db.engine)
+        for version, description in applied:
+            print(f"Applied migration {version}: {description}")
+        if not applied:
+            print("Database is up to date")
+
+    @app.cli.command("assets-build")
+    def assets_build():
+        """Bundle, minify, hash and compress the static assets into static/dist."""
+        for name, filename in build_assets().items():
+            print(f"{name} -> {filename}")
@@ -0,0 +1,170 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+
+from flask import Blueprint, abort, current_app, request, send_file, url_for
+from werkzeug.utils import safe_join
+
+try:
+    import brotli
+except ImportError:  # browsers get gzip instead
+    brotli = None
+
+# Built static assets. Every entry of ASSETS is bundled from its source files in static/, minified,
+# written under a name with its content hash (app.3f2a9c1b7e40.css) plus .gz and .br variants, and
+# listed in manifest.json. Templates link them with asset_url(name).
+#
+# A hashed name never changes its content, so the files are served with a one year immutable
+# Cache-Control and browsers stop asking for them until a deploy changes the hash. The variant is
+# picked from Accept-Encoding, brotli first (only when the brotli package was there at build time).
+#
+#   flask --app main assets-build
+#
+# runs the build. Without it the first asset_url() builds the assets, and with FLASK_DEBUG it
+# rebuilds them whenever a source file changed.
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+BUILD_DIR = os.path.join(STATIC_DIR, "dist")
+MAX_AGE = 365 * 24 * 60 * 60
+
+# name in the templates -> files in static/ it is built from, in page order
+ASSETS = {
+    'app.css': ["css/styles.css", "css/bootstrap.min.css"],
+    'app.js': ["js/bootstrap.bundle.min.js"],
+    'color-modes.js': ["js/color-modes.js"],
+    'typeahead.js': ["js/typeahead.js"],
+}
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+assets = Blueprint("assets", __name__)
+_manifest = None
+_lock = threading.Lock()
+
+
+# Minifying
+
+CSS_TOKENS = re.compile(r"""
+    ("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')   # strings, copied as they are
+  | (/\*!.*?\*/)                            # license comments, kept
+  | (/\*.*?\*/)                             # other comments
+  | (\s*;\s*(?=}))                          # the last ; of a block
+  | \s*([{};,])\s*                          # whitespace around punctuation
+  | (\s+)                                   # any other run of whitespace
+""", re.DOTALL | re.VERBOSE)
+
+
+def minify_css(text):
+    def token(match):
+        string, license, comment, last, punctuation, space = match.groups()
+        if string or license:
+            return string or license + "\n"
+        if punctuation:
+            return punctuation
+        return " " if space else ""
+    # @charset is only allowed at the very start of a file, bundle() puts one there
+    return CSS_TOKENS.sub(token, re.sub(r'@charset "[^"]*";', "", text)).strip()
+
+
+def minify_js(text):
+    # Only indentation, blank lines and whole-line comments go. Newlines stay, the scripts rely on
+    # automatic semicolon insertion.
+    lines = (line.strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//"))
+
+
+def read_source(path):
+    with open(os.path.join(STATIC_DIR, path), encoding="utf-8") as file:
+        text = file.read()
+    if path.endswith(".min.js") or path.endswith(".min.css"):
+        return re.sub(r'@charset "[^"]*";', "", text) if path.endswith(".css") else text
+    return minify_css(text) if path.endswith(".css") else minify_js(text)
+
+
+def bundle(name):
+    content = "\n".join(read_source(path) for path in ASSETS[name])
+    if name.endswith(".css"):
+        content = '@charset "UTF-8";' + content
+    return content.encode("utf-8")
+
+
+# Building
+
+def write(path, content):
+    # another worker building at the same time sees the old file or the new one, never half of it
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}"
+    with open(temporary, "wb") as file:
+        file.write(content)
+    os.replace(temporary, path)
+
+
+def build(directory=BUILD_DIR):
+    """Write every asset, its compressed variants and manifest.json to `directory`, returns the manifest."""
+    os.makedirs(directory, exist_ok=True)
+    manifest = {}
+    for name in ASSETS:
+        content = bundle(name)
+        stem, extension = os.path.splitext(name)
+        filename = f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{extension}"
+        path = os.path.join(directory, filename)
+        variants = {path: lambda: content, path + ".gz": lambda: gzip.compress(content, 9, mtime=0)}
+        if brotli is not None:
+            variants[path + ".br"] = lambda: brotli.compress(content, quality=11)
+        for variant, compress in variants.items():
+            # same name, same content, only new hashes cost a compression
+            if not os.path.exists(variant):
+                write(variant, compress())
+        manifest[name] = filename
+    write(os.path.join(directory, "manifest.json"), json.dumps(manifest, indent=2).encode())
+    return manifest
+
+
+def stale(directory=BUILD_DIR):
+    try:
+        built = os.path.getmtime(os.path.join(directory, "manifest.json"))
+    except OSError:
+        return True
+    return any(os.path.getmtime(os.path.join(STATIC_DIR, path)) > built
+               for sources in ASSETS.values() for path in sources)
+
+
+def manifest():
+    global _manifest
+    if _manifest is None or current_app.debug:
+        with _lock:
+            if stale():
+                _manifest = build()
+            elif _manifest is None:
+                with open(os.path.join(BUILD_DIR, "manifest.json")) as file:
+                    _manifest = json.load(file)
+    return _manifest
+
+
+@assets.app_template_global()
+def asset_url(name):
+    """URL of the built asset `name` (a key of ASSETS), with its content hash in the file name."""
+    return url_for("assets.asset", filename=manifest()[name])
+
+
+# Serving
+
+@assets.route("/static/dist/<path:filename>")
+def asset(filename):
+    path = safe_join(BUILD_DIR, filename)
+    if path is None or filename == "manifest.json" or not os.path.isfile(path):
+        return abort(404)
+    encoding, served = None, path
+    for name, suffix in ENCODINGS:
+        if name in request.accept_encodings and os.path.isfile(path + suffix):
+            encoding, served = name, path + suffix
+            break
+    response = send_file(served, mimetype=mimetypes.guess_type(filename)[0], max_age=MAX_AGE, conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add("Accept-Encoding")
+    if encoding:
+        response.content_encoding = encoding
+    return response
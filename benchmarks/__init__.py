@@ -0,0 +1,2 @@
+# Benchmarks, run each one from the repository root, e.g.
+#   python -m benchmarks.bench_notify
@@ -0,0 +1,86 @@
+import argparse
+import os
+import re
+import shutil
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_assets.db")
+os.environ['DB_URI'] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault('FLASK_KEY', "benchmark")
+
+from main import app  # noqa: E402
+from assets import BUILD_DIR, build  # noqa: E402
+
+# What the pages linked before the asset pipeline, served by Flask's static handler. Bootstrap's CSS
+# and JS came from jsDelivr; the local copies of the same 5.3.1 files stand in for them here.
+OLD_ASSETS = ["/static/css/styles.css", "/static/js/color-modes.js", "/static/css/bootstrap.min.css",
+              "/static/js/bootstrap.bundle.min.js"]
+
+
+class Browser:
+    """Fetches a page's assets the way a browser with an HTTP cache does."""
+
+    def __init__(self, client):
+        self.client = client
+        self.cache = {}
+        self.requests = 0
+        self.bytes = 0
+
+    def fetch(self, url):
+        cached = self.cache.get(url)
+        if cached and cached['fresh_until'] > time.time():
+            return
+        headers = {'Accept-Encoding': "gzip, deflate, br"}
+        if cached and cached['etag']:
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached['last_modified']:
+            headers['If-Modified-Since'] = cached['last_modified']
+        response = self.client.get(url, headers=headers)
+        assert response.status_code in (200, 304), (url, response.status_code)
+        self.requests += 1
+        # the test client doesn't decode, this is what went over the wire
+        self.bytes += len(response.get_data())
+        cache_control = response.cache_control
+        max_age = 0 if cache_control.no_cache else cache_control.max_age or 0
+        self.cache[url] = {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified'),
+                           'fresh_until': time.time() + max_age}
+
+
+def page_assets(client):
+    page = client.get("/login").get_data(as_text=True)
+    return re.findall(r'<(?:script|link)[^>]*(?:src|href)="(/static/[^"]+)"', page)
+
+
+def navigate(client, urls, views):
+    browser = Browser(client)
+    first = None
+    for view in range(views):
+        for url in urls:
+            browser.fetch(url)
+        if view == 0:
+            first = (browser.requests, browser.bytes)
+    return first, (browser.requests - first[0], browser.bytes - first[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Static requests and bytes per page view")
+    parser.add_argument('--views', type=int, default=10, help="page views in the session")
+    args = parser.parse_args()
+
+    shutil.rmtree(BUILD_DIR, ignore_errors=True)
+    start = time.perf_counter()
+    build()
+    print(f"assets built in {time.perf_counter() - start:.2f} s")
+
+    client = app.test_client()
+    new_assets = page_assets(client)
+    rows = [("Flask static, no caching", OLD_ASSETS), ("hashed + precompressed", new_assets)]
+    print(f"\n{'':26} {'first view':>22} {f'next {args.views - 1} views':>24}")
+    for label, urls in rows:
+        (requests, size), (later_requests, later_size) = navigate(client, urls, args.views)
+        print(f"{label:26} {requests:4} req {size / 1024:9.1f} KiB {later_requests:6} req {later_size / 1024:9.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
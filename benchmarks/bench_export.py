@@ -0,0 +1,107 @@
+import argparse
+import csv
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+DB_PATH = os.environ.get('BENCH_EXPORT_DB') or os.path.join(tempfile.mkdtemp(), "bench_export.db")
+os.environ['BENCH_EXPORT_DB'] = DB_PATH
+os.environ['DB_URI'] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault('FLASK_KEY', "benchmark")
+
+from main import app  # noqa: E402
+from models import db, Student, Score  # noqa: E402
+from exports import gradebook_tests, gradebook_header, pa  # noqa: E402
+from benchmarks.dataset import generate  # noqa: E402
+
+
+def peak_rss_mb():
+    # ru_maxrss carries over from the parent through fork/exec, VmHWM starts again with the new image
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def in_memory_gradebook():
+    # What an export without a cursor looks like: every score loaded, pivoted in a dict, written out at once
+    tests = gradebook_tests()
+    position = {test_id: i for i, (test_id, _, _) in enumerate(tests, start=2)}
+    lines = {student.id: [student.id, student.name] + [None] * len(tests)
+             for student in db.session.execute(db.select(Student)).scalars()}
+    for score in db.session.execute(db.select(Score)).scalars():
+        lines[score.student_id][position[score.test_id]] = score.score
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(gradebook_header(tests))
+    writer.writerows(lines.values())
+    return [buffer.getvalue().encode()]
+
+
+def child(mode):
+    # Runs in a fresh interpreter so ru_maxrss is the peak of this export alone
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    size = 0
+    if mode == "memory":
+        with app.app_context():
+            chunks = in_memory_gradebook()
+    else:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = "user:1"
+        response = client.get(f"/export/gradebook.{mode}", buffered=False)
+        assert response.status_code == 200, response.status_code
+        chunks = response.iter_encoded()
+    for chunk in chunks:
+        size += len(chunk)
+    elapsed = time.perf_counter() - start
+    with app.app_context():
+        rows = db.session.execute(db.select(db.func.count(Score.id))).scalar()
+        students = db.session.execute(db.select(db.func.count(Student.id))).scalar()
+    print(json.dumps({'mode': mode, 'seconds': elapsed, 'bytes': size, 'students': students, 'scores': rows,
+                      'baseline_mb': baseline, 'peak_mb': peak_rss_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak RSS and rows/sec of the gradebook export")
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--courses', type=int, default=60)
+    parser.add_argument('--per-course', type=int, default=400)
+    parser.add_argument('--tests', type=int, default=20, help="tests per course")
+    parser.add_argument('--child', choices=["csv", "arrow", "memory"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args.child)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        generate(students=args.students, courses=args.courses, students_per_course=args.per_course,
+                 tests_per_course=args.tests, teachers=10)
+    modes = ["memory", "csv"]
+    if pa is not None:
+        modes.append("arrow")
+    else:
+        print("pyarrow not installed, skipping the Arrow export")
+
+    for mode in modes:
+        output = subprocess.run([sys.executable, "-m", "benchmarks.bench_export", "--child", mode],
+                                capture_output=True, text=True, check=True, env=os.environ).stdout
+        result = json.loads(output.splitlines()[-1])
+        print(f"{mode:7}: {result['scores'] / result['seconds']:10.0f} scores/s  "
+              f"{result['students']:6} students  {result['bytes'] / 2 ** 20:6.1f} MB out  "
+              f"peak RSS {result['peak_mb']:6.1f} MB (+{result['peak_mb'] - result['baseline_mb']:.1f} MB over import)")
+
+
+if __name__ == "__main__":
+    main()
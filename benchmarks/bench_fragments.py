@@ -0,0 +1,57 @@
+import argparse
+import os
+import shutil
+import tempfile
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_fragments.db")
+os.environ['DB_URI'] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault('FLASK_KEY', "benchmark")
+
+from main import app  # noqa: E402
+from models import db, Student  # noqa: E402
+import fragments  # noqa: E402
+from benchmarks.dataset import generate  # noqa: E402
+from benchmarks.harness import requests_per_second  # noqa: E402
+
+
+def rename_student(every):
+    """Renames a student every `every` requests, the writes force re-renders."""
+    def before(n):
+        if n % every == 0:
+            with app.app_context():
+                student = db.session.get(Student, 1)
+                student.name = f"Student 1 ({n})"
+                db.session.commit()
+    return before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List pages with and without the fragment cache")
+    parser.add_argument('--paths', nargs="+", default=["/all_courses?size=50", "/all_students?size=50"])
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--write-every', type=int, default=20, help="requests between writes in the mixed run")
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        generate(students=2000, courses=100, students_per_course=40, tests_per_course=3)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = "user:1"
+
+    directory = tempfile.mkdtemp()
+    backends = [("off", None), ("memory", fragments.MemoryBackend()), ("file", fragments.FileBackend(directory))]
+    for path in args.paths:
+        print(path)
+        for label, backend in backends:
+            fragments.backend = backend
+            reads = requests_per_second(client, path, args.seconds)
+            mixed = requests_per_second(client, path, args.seconds, rename_student(args.write_every))
+            print(f"  {label:7}: {reads:8.1f} req/s read only  {mixed:8.1f} req/s with a write every "
+                  f"{args.write_every} requests")
+    shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
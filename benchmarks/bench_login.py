@@ -0,0 +1,175 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_login.db")
+os.environ['DB_URI'] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault('FLASK_KEY', "benchmark")
+
+from main import app  # noqa: E402
+from models import db, User  # noqa: E402
+import hashing  # noqa: E402
+from benchmarks.dataset import generate  # noqa: E402
+from benchmarks.bench_startup import ROOT, free_port  # noqa: E402
+
+
+def login_burst(clients, seconds):
+    """Every client logs in as fast as it can for `seconds`, returns ([latency of each 302], number of 503s)."""
+    latencies, rejected = [], []
+    deadline = time.perf_counter() + seconds
+
+    def run(client, email):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = client.post("/login", data={'email': email, 'password': "password"})
+            if response.status_code == 503:
+                assert response.headers['Retry-After'] == str(hashing.RETRY_AFTER)
+                rejected.append(1)
+            else:
+                assert response.status_code == 302, response.status_code
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=run, args=client) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, len(rejected)
+
+
+def http_login_burst(base_url, emails, seconds):
+    """login_burst over HTTP, one thread per email."""
+    latencies, rejected = [], []
+    deadline = time.perf_counter() + seconds
+    # don't follow the redirect, the page after login isn't what is measured
+    opener = urllib.request.build_opener(type("NoRedirect", (urllib.request.HTTPRedirectHandler,),
+                                              {'redirect_request': lambda *args: None}))
+
+    def run(email):
+        body = urllib.parse.urlencode({'email': email, 'password': "password"}).encode()
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                opener.open(f"{base_url}/login", body, timeout=60)
+                status = 200
+            except urllib.error.HTTPError as error:
+                status = error.code
+            if status == 503:
+                rejected.append(1)
+            else:
+                assert status == 302, status
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=run, args=(email,)) for email in emails]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, len(rejected)
+
+
+def children(pid):
+    result = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as file:
+            result += [int(child) for child in file.read().split()]
+    return result
+
+
+def running(pid):
+    with open(f"/proc/{pid}/stat") as file:
+        return file.read().rpartition(")")[2].split()[0] == "R"
+
+
+def hashing_processes(master):
+    """Yields (hash processes, how many of them were on the CPU or waiting for it) every 5 ms while gunicorn runs.
+
+    The hash processes are the pool processes the workers fork, the grandchildren of the master.
+    """
+    while master.poll() is None:
+        try:
+            pool = [pid for worker in children(master.pid) for pid in children(worker)]
+            yield len(pool), sum(running(pid) for pid in pool)
+        except OSError:  # a process exited while we looked
+            pass
+        time.sleep(0.005)
+
+
+def gunicorn_burst(emails, workers, seconds):
+    """The Procfile layout: gunicorn --preload with `workers` sync workers, hammered over HTTP."""
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=ROOT, FLASK_WTF_CSRF_ENABLED="false")
+    master = subprocess.Popen([sys.executable, "-m", "gunicorn", "--preload", "--workers", str(workers),
+                               "--bind", f"127.0.0.1:{port}", "--log-level", "warning", "main:app"], env=env, cwd=ROOT)
+    try:
+        for _ in range(500):
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=1)
+                break
+            except OSError:
+                time.sleep(0.02)
+        sampled = []
+        sampler = threading.Thread(target=lambda: sampled.extend(hashing_processes(master)), daemon=True)
+        sampler.start()
+        latencies, rejected = http_login_burst(f"http://127.0.0.1:{port}", emails, seconds)
+    finally:
+        master.terminate()
+        master.wait(timeout=30)
+    sampler.join(timeout=5)
+    # the ones sampled while idle after the burst would drag the average down
+    busy = [count for processes, count in sampled if count]
+    return latencies, rejected, (max(processes for processes, count in sampled), statistics.mean(busy or [0]))
+
+
+def report(label, latencies, rejected, seconds):
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else float("nan")
+    print(f"{label:22}: {len(latencies) / seconds:6.1f} logins/s  p50 {statistics.median(latencies or [0]) * 1000:7.0f} ms"
+          f"  p95 {p95 * 1000:7.0f} ms  max {max(latencies or [0]) * 1000:7.0f} ms  503s {rejected}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent logins with and without bounded hashing admission")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--gunicorn-workers', type=int, default=0,
+                        help="instead of the test client, run the Procfile's gunicorn --preload with this many workers")
+    args = parser.parse_args()
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        generate(students=10, courses=1, teachers=args.concurrency)
+        emails = [email for email in db.session.execute(db.select(User.email)).scalars()]
+        legacy = sum(hashing.needs_rehash(password) for password in db.session.execute(db.select(User.password)).scalars())
+    print(f"{hashing.HASH_WORKERS} hash workers, {hashing.METHOD}, {args.concurrency} concurrent clients, "
+          f"{legacy} legacy hashes to upgrade")
+    if args.gunicorn_workers:
+        latencies, rejected, (processes, busy) = gunicorn_burst(emails, args.gunicorn_workers, args.seconds)
+        report(f"{args.gunicorn_workers} gunicorn workers", latencies, rejected, args.seconds)
+        print(f"{processes} hash processes, {busy:.1f} of them hashing at once on average")
+    else:
+        clients = [(app.test_client(), email) for email in emails]
+        hashing.hash_pool()
+        for label, queue_size in [("unbounded", args.concurrency),
+                                  (f"queue {hashing.HASH_QUEUE_SIZE}", hashing.HASH_QUEUE_SIZE)]:
+            hashing._slots = threading.BoundedSemaphore(queue_size)
+            latencies, rejected = login_burst(clients, args.seconds)
+            report(label, latencies, rejected, args.seconds)
+
+    with app.app_context():
+        legacy = sum(hashing.needs_rehash(password) for password in db.session.execute(db.select(User.password)).scalars())
+    print(f"{legacy} legacy hashes left after the bursts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import argparse
+import time
+
+import LineNotify
+from benchmarks.stub_line import StubLineServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequential Push_message vs. Push_messages against a local stub")
+    parser.add_argument('--students', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.1, help="seconds the stub waits per request")
+    parser.add_argument('--workers', type=int, default=LineNotify.MAX_WORKERS)
+    args = parser.parse_args()
+
+    server = StubLineServer(latency=args.latency).start()
+    LineNotify.NOTIFY_API_URL = server.url
+    messages = [(f"token-{i}", f"message {i}") for i in range(args.students)]
+
+    try:
+        start = time.perf_counter()
+        sequential = [LineNotify.Push_message(token=token, message=message) for token, message in messages]
+        sequential_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parallel = LineNotify.Push_messages(messages, max_workers=args.workers)
+        parallel_time = time.perf_counter() - start
+    finally:
+        server.stop()
+
+    print(f"{args.students} messages, {args.latency * 1000:.0f} ms stub latency")
+    print(f"sequential : {sequential_time:7.3f} s  ok={sequential.count(200)}")
+    print(f"parallel   : {parallel_time:7.3f} s  ok={parallel.count(200)}  workers={args.workers}")
+    print(f"speed-up   : {sequential_time / parallel_time:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
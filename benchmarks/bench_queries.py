@@ -0,0 +1,61 @@
+import argparse
+import os
+import tempfile
+import time
+
+# The app reads its database from the environment at import time
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_queries.db")
+os.environ['DB_URI'] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault('FLASK_KEY', "benchmark")
+
+from main import app  # noqa: E402
+from models import db  # noqa: E402
+from cache import clear_all  # noqa: E402
+from benchmarks.dataset import generate  # noqa: E402
+from benchmarks.harness import StatementCounter  # noqa: E402
+
+PAGES = ['/all_students', '/all_users', '/all_courses', '/all_tests', '/all_comms']
+
+
+def measure(client, counter):
+    results = {}
+    for page in PAGES:
+        counter.reset()
+        start = time.perf_counter()
+        response = client.get(page)
+        assert response.status_code == 200, (page, response.status_code)
+        results[page] = (counter.count, time.perf_counter() - start)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQL statements per list page at two data sizes")
+    parser.add_argument('--small', type=int, default=10, help="number of courses in the small run")
+    parser.add_argument('--large', type=int, default=200, help="number of courses in the large run")
+    args = parser.parse_args()
+
+    runs = {}
+    for courses in (args.small, args.large):
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            generate(students=courses * 10, teachers=max(courses // 5, 1), courses=courses)
+            counter = StatementCounter([db.engine])
+        clear_all()
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = "1"
+        runs[courses] = measure(client, counter)
+
+    print(f"{'page':15} " + " ".join(f"{f'{n} courses':>24}" for n in runs))
+    constant = True
+    for page in PAGES:
+        counts = [runs[n][page][0] for n in runs]
+        constant = constant and len(set(counts)) == 1
+        print(f"{page:15} " + " ".join(f"{runs[n][page][0]:8} stmts {runs[n][page][1] * 1000:7.1f} ms" for n in runs))
+    print("statement count is constant" if constant else "statement count grows with the data (N+1)")
+    raise SystemExit(0 if constant else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_search.db")
+os.environ['DB_URI'] = f"sqlite:///{DB_PATH}"
+
+from sqlalchemy import bindparam, or_, select, union_all, literal, update  # noqa: E402
+
+from main import app  # noqa: E402
+from models import db, Student, Course, Communication  # noqa: E402
+from search import search  # noqa: E402
+from benchmarks.dataset import generate  # noqa: E402
+
+SYLLABLES = ["an", "bel", "chen", "da", "el", "fu", "gar", "hu", "li", "ma", "no", "pa", "ro", "su", "ta", "wei",
+             "xin", "ya", "zhi", "ko"]
+
+
+def fake_name(rand):
+    word = lambda: "".join(rand.choice(SYLLABLES) for _ in range(rand.randint(2, 3))).capitalize()  # noqa: E731
+    return f"{word()} {word()}"
+
+
+def ilike_search(query, size=20):
+    # What a search without an index does: a substring scan over every searchable column
+    pattern = f"%{query}%"
+    students = select(literal(1).label("code"), Student.id, Student.name.label("title")).where(
+        or_(Student.name.ilike(pattern), Student.email.ilike(pattern), Student.card_number.ilike(pattern)))
+    courses = select(literal(2), Course.id, Course.subject).where(Course.subject.ilike(pattern))
+    comms = select(literal(3), Communication.id, Communication.title).where(
+        or_(Communication.title.ilike(pattern), Communication.body.ilike(pattern)))
+    results = union_all(students, courses, comms).subquery()
+    return db.session.execute(select(results).limit(size)).all()
+
+
+def latency(function, queries, repeat=3):
+    times = []
+    for query in queries:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function(query)
+            times.append(time.perf_counter() - start)
+    times.sort()
+    return statistics.median(times) * 1000, times[int(len(times) * 0.95) - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search vs. ILIKE scans")
+    parser.add_argument('--students', type=int, default=100_000)
+    parser.add_argument('--courses', type=int, default=2000)
+    parser.add_argument('--comms', type=int, default=10, help="communications per course")
+    parser.add_argument('--queries', type=int, default=30)
+    args = parser.parse_args()
+    rand = random.Random(1)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        start = time.perf_counter()
+        generate(students=args.students, courses=args.courses, students_per_course=20, tests_per_course=0,
+                 comms_per_course=args.comms)
+        db.session.execute(update(Student.__table__).where(Student.id == bindparam("b_id")).values(name=bindparam("b_name")),
+                           [{'b_id': i, 'b_name': fake_name(rand)} for i in range(1, args.students + 1)])
+        db.session.commit()
+        print(f"{args.students} students, {args.courses} courses, {args.courses * args.comms} communications "
+              f"indexed in {time.perf_counter() - start:.1f} s")
+
+        names = db.session.execute(select(Student.name).order_by(Student.id)).scalars().all()
+        queries = [rand.choice(names).split()[rand.randint(0, 1)][:rand.randint(3, 6)] for _ in range(args.queries)]
+        queries += [f"C{rand.randint(1, args.students):07d}" for _ in range(args.queries // 3)]
+        queries += [f"notice {rand.randint(1, args.comms)}" for _ in range(args.queries // 3)]
+
+        indexed_p50, indexed_p95 = latency(search, queries)
+        scan_p50, scan_p95 = latency(ilike_search, queries)
+        print(f"full-text : p50 {indexed_p50:8.2f} ms  p95 {indexed_p95:8.2f} ms")
+        print(f"ILIKE scan: p50 {scan_p50:8.2f} ms  p95 {scan_p95:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
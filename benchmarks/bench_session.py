@@ -0,0 +1,57 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import LineNotify
+from benchmarks.stub_line import StubLineServer
+
+
+def bare_push(pair):
+    # What Push_message did before the shared session: a new connection per message
+    token, message = pair
+    response = requests.post(url=LineNotify.NOTIFY_API_URL, headers={'Authorization': f"Bearer {token}"},
+                             data={'message': message})
+    return response.status_code
+
+
+def pooled_push(pair):
+    token, message = pair
+    return LineNotify.Push_message(token=token, message=message)
+
+
+def run(server, push, messages, workers):
+    server.reset()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        codes = list(executor.map(push, messages))
+    return time.perf_counter() - start, server.connections, codes.count(200)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bare requests.post vs. the pooled LineNotify session")
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.005, help="seconds the stub waits per request")
+    parser.add_argument('--workers', type=int, default=LineNotify.MAX_WORKERS)
+    args = parser.parse_args()
+
+    server = StubLineServer(latency=args.latency).start()
+    LineNotify.NOTIFY_API_URL = server.url
+    messages = [(f"token-{i}", f"message {i}") for i in range(args.students)]
+
+    try:
+        results = {
+            'bare': run(server, bare_push, messages, args.workers),
+            'pooled': run(server, pooled_push, messages, args.workers),
+        }
+    finally:
+        server.stop()
+
+    print(f"{args.students} messages, {args.workers} threads, {args.latency * 1000:.0f} ms stub latency")
+    for name, (seconds, connections, ok) in results.items():
+        print(f"{name:7}: {seconds:7.3f} s  {args.students / seconds:8.1f} msg/s  connections={connections:5}  ok={ok}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_stats.db")
+os.environ['DB_URI'] = f"sqlite:///{DB_PATH}"
+
+from main import app  # noqa: E402
+from models import db, Student, Course, Test  # noqa: E402
+from stats import test_stats, course_trends, student_trajectory  # noqa: E402
+from benchmarks.dataset import generate  # noqa: E402
+
+
+def naive_test_stats(test_id):
+    # What the app would do by walking the ORM objects
+    scores = [score.score for score in db.session.get(Test, test_id).scores]
+    return statistics.mean(scores), statistics.median(scores), statistics.pstdev(scores)
+
+
+def naive_course_trends(course_id):
+    return [statistics.mean(score.score for score in test.scores) for test in db.session.get(Course, course_id).tests]
+
+
+def naive_student_trajectory(student_id):
+    student = db.session.get(Student, student_id)
+    return [(score.test.course.subject, score.score,
+             statistics.mean(other.score for other in score.test.scores)) for score in student.scores]
+
+
+def timed(function, *args, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        db.session.expire_all()
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQL statistics vs. iterating ORM objects on a school year of scores")
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--courses', type=int, default=40)
+    parser.add_argument('--per-course', type=int, default=200)
+    parser.add_argument('--tests', type=int, default=20, help="tests per course")
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        start = time.perf_counter()
+        generate(students=args.students, courses=args.courses, students_per_course=args.per_course,
+                 tests_per_course=args.tests, teachers=10)
+        print(f"generated {args.courses * args.per_course * args.tests} scores in {time.perf_counter() - start:.1f} s")
+
+        sql_time, stats = timed(test_stats, 1)
+        naive_time, (mean, median, stddev) = timed(naive_test_stats, 1)
+        assert abs(stats['mean'] - mean) < 1e-6 and stats['median'] == median and abs(stats['stddev'] - stddev) < 1e-6
+        print(f"test stats         sql {sql_time * 1000:8.2f} ms   orm {naive_time * 1000:8.2f} ms")
+
+        sql_time, _ = timed(course_trends, 1)
+        naive_time, _ = timed(naive_course_trends, 1)
+        print(f"course trends      sql {sql_time * 1000:8.2f} ms   orm {naive_time * 1000:8.2f} ms")
+
+        student_id = db.session.execute(db.select(db.func.min(Student.id))).scalar()
+        sql_time, _ = timed(student_trajectory, student_id)
+        naive_time, _ = timed(naive_student_trajectory, student_id)
+        print(f"student trajectory sql {sql_time * 1000:8.2f} ms   orm {naive_time * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import argparse
+import os
+import tempfile
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_user_loader.db")
+os.environ['DB_URI'] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault('FLASK_KEY', "benchmark")
+
+from main import app  # noqa: E402
+from models import db  # noqa: E402
+import principals  # noqa: E402
+from benchmarks.dataset import generate  # noqa: E402
+from benchmarks.harness import requests_per_second  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Requests/sec on a protected route with and without the principal cache")
+    parser.add_argument('--path', default="/all_comms?size=5")
+    parser.add_argument('--seconds', type=float, default=3)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        generate(students=50, courses=5)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = "user:1"
+
+    ttl = principals.cache.ttl
+    principals.cache.ttl = 0
+    principals.cache.clear()
+    uncached = requests_per_second(client, args.path, args.seconds)
+    principals.cache.ttl = ttl
+    cached = requests_per_second(client, args.path, args.seconds)
+
+    print(f"{args.path}")
+    print(f"without cache : {uncached:8.1f} req/s")
+    print(f"with cache    : {cached:8.1f} req/s  ({cached / uncached - 1:+.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import tempfile
+
+from sqlalchemy import create_engine, text
+
+from migrations import upgrade
+
+# The schema as the old db.create_all() made it: no keys on the association tables, no indexes
+LEGACY_SCHEMA = [
+    "CREATE TABLE users (id {id}, name VARCHAR NOT NULL, email VARCHAR NOT NULL UNIQUE, "
+    "password VARCHAR NOT NULL, cellphone INTEGER NOT NULL, line_notify_access_token VARCHAR)",
+    "CREATE TABLE students (id {id}, name VARCHAR NOT NULL, grade INTEGER NOT NULL, email VARCHAR NOT NULL UNIQUE, "
+    "password VARCHAR NOT NULL, address VARCHAR, cellphone INTEGER, tel_number INTEGER, card_number VARCHAR UNIQUE, "
+    "line_notify_access_token VARCHAR, note VARCHAR)",
+    "CREATE TABLE courses (id {id}, subject VARCHAR, teacher_id INTEGER REFERENCES users(id))",
+    "CREATE TABLE communications (id {id}, title VARCHAR NOT NULL, body VARCHAR NOT NULL, "
+    "teacher_id INTEGER REFERENCES users(id), course_id INTEGER REFERENCES courses(id))",
+    "CREATE TABLE tests (id {id}, title VARCHAR NOT NULL, teacher_id INTEGER REFERENCES users(id), "
+    "course_id INTEGER REFERENCES courses(id))",
+    "CREATE TABLE scores (id {id}, score INTEGER NOT NULL, student_id INTEGER REFERENCES students(id), "
+    "test_id INTEGER REFERENCES tests(id))",
+    "CREATE TABLE student_course_relation (student_id INTEGER REFERENCES students(id), "
+    "course_id INTEGER REFERENCES courses(id))",
+    "CREATE TABLE student_test_relation (student_id INTEGER REFERENCES students(id), "
+    "test_id INTEGER REFERENCES tests(id))",
+]
+
+# The lookups behind the list pages, rosters, score forms and notify jobs
+HOT_LOOKUPS = {
+    'students of a course': "SELECT student_id FROM student_course_relation WHERE course_id = 1",
+    'courses of a student': "SELECT course_id FROM student_course_relation WHERE student_id = 1",
+    'students of a test': "SELECT student_id FROM student_test_relation WHERE test_id = 1",
+    'scores of a test': "SELECT student_id, score FROM scores WHERE test_id = 1",
+    'score of a student': "SELECT score FROM scores WHERE student_id = 1 AND test_id = 1",
+    'tests of a course': "SELECT id FROM tests WHERE course_id = 1",
+    'comms of a course': "SELECT id FROM communications WHERE course_id = 1",
+    'courses of a teacher': "SELECT id FROM courses WHERE teacher_id = 1",
+}
+
+
+def legacy_database(engine):
+    id_column = "SERIAL PRIMARY KEY" if engine.dialect.name == "postgresql" else "INTEGER PRIMARY KEY"
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement.format(id=id_column)))
+        conn.execute(text("INSERT INTO users (id, name, email, password, cellphone) VALUES (1, 't', 't@x', 'x', 1)"))
+        conn.execute(text("INSERT INTO students (id, name, grade, email, password) VALUES (1, 's', 5, 's@x', 'x')"))
+        conn.execute(text("INSERT INTO courses (id, subject, teacher_id) VALUES (1, 'Math', 1)"))
+        conn.execute(text("INSERT INTO tests (id, title, teacher_id, course_id) VALUES (1, 'T', 1, 1)"))
+        # duplicates the migrations have to clean up
+        for _ in range(2):
+            conn.execute(text("INSERT INTO student_course_relation VALUES (1, 1)"))
+            conn.execute(text("INSERT INTO student_test_relation VALUES (1, 1)"))
+            conn.execute(text("INSERT INTO scores (score, student_id, test_id) VALUES (50, 1, 1)"))
+
+
+def plan(conn, query):
+    """(uses an index, plan text) for a query."""
+    if conn.dialect.name == "postgresql":
+        # Tiny tables are cheaper to scan, only fall back to a scan when there is no index at all
+        conn.execute(text("SET enable_seqscan = off"))
+        result = conn.execute(text(f"EXPLAIN (FORMAT JSON) {query}")).scalar()
+        result = json.dumps(result)
+        return "Seq Scan" not in result, result
+    rows = conn.execute(text(f"EXPLAIN QUERY PLAN {query}")).all()
+    detail = "; ".join(row[-1] for row in rows)
+    return all("USING" in row[-1] for row in rows if row[-1].startswith(("SCAN", "SEARCH"))), detail
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upgrade a database with the old schema and EXPLAIN the hot lookups")
+    parser.add_argument('--db', default=os.environ.get('CHECK_DB_URI'),
+                        help="an EMPTY database to use, a temporary SQLite file by default")
+    args = parser.parse_args()
+    uri = args.db or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'legacy.db')}"
+    engine = create_engine(uri)
+
+    legacy_database(engine)
+    for version, description in upgrade(engine):
+        print(f"applied {version}: {description}")
+    assert upgrade(engine) == [], "migrations must not run twice"
+
+    ok = True
+    with engine.connect() as conn:
+        for table in ("student_course_relation", "student_test_relation", "scores"):
+            rows = conn.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+            print(f"{table}: {rows} row(s) after removing duplicates")
+            ok = ok and rows == 1
+        for name, query in HOT_LOOKUPS.items():
+            uses_index, detail = plan(conn, query)
+            ok = ok and uses_index
+            print(f"{'index' if uses_index else 'SCAN ':5}  {name:22} {detail if not uses_index else ''}")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+# Two SQLite files stand in for a primary and a replica that stopped replicating: the replica is a
+# copy taken before the writes below, so every stale answer shows which database served it.
+DIRECTORY = tempfile.mkdtemp()
+PRIMARY_PATH = os.path.join(DIRECTORY, "primary.db")
+REPLICA_PATH = os.path.join(DIRECTORY, "replica.db")
+os.environ['DB_URI'] = f"sqlite:///{PRIMARY_PATH}"
+os.environ['DB_REPLICA_URI'] = f"sqlite:///{REPLICA_PATH}"
+os.environ.setdefault('DB_READ_YOUR_WRITES', "2")
+os.environ.setdefault('FLASK_KEY', "benchmark")
+os.environ['FRAGMENT_CACHE'] = "off"
+
+from main import app  # noqa: E402
+from models import db, Communication, Course  # noqa: E402
+from routing import READ_YOUR_WRITES  # noqa: E402
+from benchmarks.dataset import generate  # noqa: E402
+
+
+def logged_in_client():
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = "user:1"
+    return client
+
+
+def shows(client, title):
+    response = client.get("/all_comms?size=200")
+    assert response.status_code == 200, response.status_code
+    return title in response.text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Which database answers reads before and after a write")
+    parser.parse_args()
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        generate(students=20, courses=2, comms_per_course=3)
+        # the comm form only offers the logged in teacher's courses
+        db.session.get(Course, 1).teacher_id = 1
+        db.session.commit()
+        db.session.remove()
+        db.engines['replica'].dispose()
+        shutil.copyfile(PRIMARY_PATH, REPLICA_PATH)
+        comm = db.session.execute(db.select(Communication).order_by(Communication.id)).scalars().first()
+        comm_id, title = comm.id, f"{comm.title} (edited)"
+
+    writer, reader = logged_in_client(), logged_in_client()
+    # the edit goes to the primary only, the replica copy keeps the old title
+    response = writer.post(f"/comm/{comm_id}", data={'title': title, 'body': "edited", 'course': 1})
+    with app.app_context():
+        assert db.session.get(Communication, comm_id).title == title, "the edit didn't reach the primary"
+
+    print(f"read-your-writes window: {READ_YOUR_WRITES} s (edit answered {response.status_code})")
+    print(f"writer right after the edit  : {'primary (fresh)' if shows(writer, title) else 'replica (stale)'}")
+    print(f"another user right after     : {'primary (fresh)' if shows(reader, title) else 'replica (stale)'}")
+    time.sleep(READ_YOUR_WRITES + 0.1)
+    print(f"writer after the window      : {'primary (fresh)' if shows(writer, title) else 'replica (stale)'}")
+    shutil.rmtree(DIRECTORY)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import os
+import random
+import time
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from models import db, User, Student, Course, Communication, Test, Score, student_course_relation, \
+    student_test_relation
+
+# Named sizes for benchmarks, one course per 25 students and one teacher per two courses
+SCALES = {
+    '1k': dict(students=1_000, teachers=20, courses=40),
+    '10k': dict(students=10_000, teachers=200, courses=400),
+    '100k': dict(students=100_000, teachers=2_000, courses=4_000),
+}
+
+
+def generate(students=100, teachers=5, courses=10, students_per_course=30, tests_per_course=3,
+             comms_per_course=2, seed=0):
+    """Fill an empty database with deterministic fake data, call inside an app context.
+
+    Every user and student gets the password "password".
+    """
+    rand = random.Random(seed)
+    password = generate_password_hash("password", method="pbkdf2:sha256", salt_length=8)
+    students_per_course = min(students_per_course, students)
+
+    db.session.execute(insert(User), [{
+        'id': i, 'name': f"Teacher {i}", 'email': f"teacher{i}@demo-school.org", 'password': password,
+        'cellphone': 900000000 + i
+    } for i in range(1, teachers + 1)])
+    db.session.execute(insert(Student), [{
+        'id': i, 'name': f"Student {i}", 'grade': rand.randint(4, 12), 'email': f"student{i}@demo-school.org",
+        'password': password, 'address': f"{i} School Road", 'cellphone': 910000000 + i,
+        'tel_number': 20000000 + i, 'card_number': f"C{i:07d}",
+        'line_notify_access_token': f"token-{i}" if rand.random() < 0.8 else None
+    } for i in range(1, students + 1)])
+    db.session.execute(insert(Course), [{
+        'id': i, 'subject': f"Subject {i}", 'teacher_id': rand.randint(1, teachers)
+    } for i in range(1, courses + 1)])
+
+    rosters = {course_id: rand.sample(range(1, students + 1), students_per_course)
+               for course_id in range(1, courses + 1)}
+    roster_rows = [{'student_id': student_id, 'course_id': course_id}
+                   for course_id, roster in rosters.items() for student_id in roster]
+    if roster_rows:
+        db.session.execute(insert(student_course_relation), roster_rows)
+
+    test_rows, score_rows, taken_rows = [], [], []
+    for course_id, roster in rosters.items():
+        for n in range(tests_per_course):
+            test_id = len(test_rows) + 1
+            test_rows.append({'id': test_id, 'title': f"Test {n + 1}", 'course_id': course_id,
+                              'teacher_id': rand.randint(1, teachers)})
+            for student_id in roster:
+                score_rows.append({'score': rand.randint(0, 100), 'student_id': student_id, 'test_id': test_id})
+                taken_rows.append({'student_id': student_id, 'test_id': test_id})
+    if test_rows:
+        db.session.execute(insert(Test), test_rows)
+        db.session.execute(insert(Score), score_rows)
+        db.session.execute(insert(student_test_relation), taken_rows)
+
+    comm_rows = [{
+        'title': f"Notice {n + 1}", 'body': f"Notice {n + 1} for subject {course_id}", 'course_id': course_id,
+        'teacher_id': rand.randint(1, teachers)
+    } for course_id in range(1, courses + 1) for n in range(comms_per_course)]
+    if comm_rows:
+        db.session.execute(insert(Communication), comm_rows)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a fresh database with a benchmark dataset")
+    parser.add_argument('--scale', choices=SCALES, default='1k')
+    parser.add_argument('--db', default="bench.db", help="SQLite file, replaced if it exists")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    # the app reads its database from the environment at import time
+    os.environ['DB_URI'] = f"sqlite:///{os.path.abspath(args.db)}"
+    from main import app
+
+    start = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        generate(seed=args.seed, **SCALES[args.scale])
+    print(f"{args.scale} dataset written to {args.db} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,606 @@
+import argparse
+import io
+import json
+import os
+import platform
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# End-to-end benchmark: every route of the app against a generated dataset, through Flask's test
+# client (in this process) or a local gunicorn (--server gunicorn). LINE is a local stub server.
+#
+#   python -m benchmarks.harness --scale 10k --output results/10k.json
+#   python -m benchmarks.harness --scale 10k --compare results/10k.json
+#
+# Per endpoint it reports p50/p95/p99 latency, throughput, SQL statements per request and peak
+# memory. With the test client the statements are counted per request and the memory is the
+# tracemalloc peak of a separate pass (so tracing doesn't slow the timed one). With gunicorn the
+# statements come from the db_query_seconds count of /metrics (only with --workers 1, every worker
+# counts its own) and the memory is the VmHWM of the workers after the endpoint ran.
+
+from benchmarks.stub_line import StubLineServer
+
+stub = None
+if __name__ == "__main__":
+    # a throwaway database, the benchmarks and tests that import the helpers below bring their own
+    DIRECTORY = tempfile.mkdtemp(prefix="sms-harness-")
+    DB_PATH = os.path.join(DIRECTORY, "harness.db")
+    os.environ['DB_URI'] = f"sqlite:///{DB_PATH}"
+    os.environ.setdefault('FLASK_KEY', "benchmark")
+    # LineNotify reads the endpoints at import time, so the stub has to be up before main is imported
+    stub = StubLineServer(latency=float(os.environ.get("STUB_LINE_LATENCY", 0.01))).start()
+    os.environ['NOTIFY_API_URL'] = stub.url
+    os.environ['NOTIFY_BOT_URL'] = stub.base_url
+
+from sqlalchemy import event, func, insert, select  # noqa: E402
+
+from main import app  # noqa: E402
+from models import db, User, Student, Course, Communication, Test, NotifyJob, student_course_relation  # noqa: E402
+from notify_jobs import run_once  # noqa: E402
+import exports  # noqa: E402
+from benchmarks.dataset import generate, SCALES  # noqa: E402
+
+LOGIN = {'email': "teacher1@demo-school.org", 'password': "password"}
+# routes the harness leaves alone
+SKIPPED_ENDPOINTS = {'static', 'bootstrap.static'}
+CSRF_TOKEN = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+
+
+class Scenario:
+    """One endpoint to drive. `request(n, ids)` returns (method, path, form, files) for the n-th call.
+
+    `anonymous` scenarios get a client that isn't logged in, so register, login and logout can't
+    touch the session of the others.
+    """
+
+    def __init__(self, name, endpoint, request, anonymous=False):
+        self.name = name
+        self.endpoint = endpoint
+        self.request = request
+        self.anonymous = anonymous
+
+
+def get(path):
+    return lambda n, ids: ("GET", path.format(n=n, **ids.pick(n)), None, None)
+
+
+def post(path, form, files=None):
+    def request(n, ids):
+        values = ids.pick(n)
+        return ("POST", path.format(n=n, **values), form(n, values),
+                files(n, values) if files else None)
+    return request
+
+
+def csv_file(header, rows):
+    return lambda n, values: {'file': (f"{header}\n" + "\n".join(rows(n, values)) + "\n", "upload.csv")}
+
+
+class Ids:
+    """Row ids the scenarios work on.
+
+    pick(n) spreads the reads over the whole table, the deletes take ids from the end of their
+    table, each one only once, in a range nothing else reads.
+    """
+
+    def __init__(self, counts, teacher_course, empty_tests, rosters):
+        self.counts = counts
+        self.teacher_course = teacher_course
+        self.empty_tests = empty_tests
+        self.rosters = rosters
+        self.taken = {table: 0 for table in counts}
+        self.lock = threading.Lock()
+
+    def spread(self, table, n):
+        # a fixed stride through the ids that leaves the last quarter for the deletes
+        size = max(self.counts[table] * 3 // 4, 1)
+        return n * 7919 % size + 1
+
+    def pick(self, n):
+        return {'student': self.spread('students', n), 'user': self.spread('users', n),
+                'course': self.spread('courses', n), 'test': self.spread('tests', n),
+                'comm': self.spread('comms', n), 'teacher_course': self.teacher_course,
+                'empty_test': self.empty_tests[n % len(self.empty_tests)]}
+
+    def take(self, table):
+        with self.lock:
+            self.taken[table] += 1
+            return self.counts[table] - self.taken[table] + 1
+
+    def capacity(self, table):
+        return self.counts[table] // 4
+
+
+def deleting(path, table):
+    return lambda n, ids: ("GET", path.format(id=ids.take(table)), None, None)
+
+
+def roster_form(prefix, scores):
+    def form(n, values):
+        fields = {}
+        for i, student_id in enumerate(scores(values)):
+            fields[f"{prefix}-{i}-student_id"] = student_id
+            fields[f"{prefix}-{i}-score"] = (student_id * 31 + n) % 101
+        return fields
+    return form
+
+
+def scenarios(ids):
+    student = lambda n, values: {  # noqa: E731
+        'name': f"Harness Student {n}", 'grade': 4 + n % 9, 'email': f"harness{n}@demo-school.org",
+        'password': "password", 'address': f"{n} Bench Road", 'cellphone': f"09{n:08d}",
+        'tel_number': f"{20000000 + n}", 'card_number': f"H{n:07d}"}
+    course_students = lambda n, values: ids.rosters[values['teacher_course']][:5]  # noqa: E731
+    comm = lambda n, values: {'title': f"Harness notice {n}", 'course': values['teacher_course'],  # noqa: E731
+                              'body': f"Notice {n} from the harness"}
+    return [
+        Scenario("home", 'site.home', get("/")),
+        Scenario("register GET", 'auth.register', get("/register"), anonymous=True),
+        Scenario("register POST", 'auth.register', post("/register", lambda n, values: {
+            'name': f"Harness Teacher {n}", 'email': f"harness-teacher{n}@demo-school.org",
+            'password': "password", 'cellphone': f"09{n:08d}"}), anonymous=True),
+        Scenario("login GET", 'auth.login', get("/login"), anonymous=True),
+        Scenario("login POST", 'auth.login', post("/login", lambda n, values: dict(LOGIN)), anonymous=True),
+        Scenario("logout", 'auth.logout', get("/logout"), anonymous=True),
+        Scenario("metrics", 'site.metrics_text', get("/metrics")),
+
+        Scenario("all_students", 'students.all_students', get("/all_students")),
+        Scenario("all_students page", 'students.all_students', get("/all_students?page={n}")),
+        Scenario("all_users", 'users.all_users', get("/all_users")),
+        Scenario("all_courses", 'courses.all_courses', get("/all_courses")),
+        Scenario("all_tests", 'tests.all_tests', get("/all_tests")),
+        Scenario("all_comms", 'comms.all_comms', get("/all_comms")),
+        Scenario("test", 'tests.test', get("/test/{test}")),
+        Scenario("comm GET", 'comms.comm', get("/comm/{comm}")),
+        Scenario("search", 'site.search_page', get("/search?q=student+{n}")),
+        Scenario("student choices", 'students.student_choices_json', get("/api/choices/students?q=Student+{n}")),
+        Scenario("stats test", 'tests.test_stats_json', get("/api/stats/test/{test}")),
+        Scenario("stats course", 'courses.course_stats_json', get("/api/stats/course/{course}")),
+        Scenario("stats student", 'students.student_stats_json', get("/api/stats/student/{student}")),
+        Scenario("api list", 'api.list_resource', get("/api/v1/students?page={n}")),
+        Scenario("api row", 'api.get_row', get("/api/v1/students/{student}")),
+        Scenario("api search", 'api.search_json', get("/api/v1/search?q=notice+{n}")),
+
+        Scenario("export students", 'exports.export_students', get("/export/students.csv")),
+        Scenario("export scores", 'exports.export_scores', get("/export/scores.csv")),
+        Scenario("export rosters", 'exports.export_rosters', get("/export/rosters.csv")),
+        Scenario("export gradebook", 'exports.export_gradebook', get("/export/gradebook.csv")),
+        Scenario("export gradebook course", 'exports.export_gradebook', get("/export/gradebook/{course}.csv")),
+        Scenario("export gradebook arrow", 'exports.export_gradebook_arrow', get("/export/gradebook/{course}.arrow")),
+
+        Scenario("add_student GET", 'students.add_student', get("/add_student")),
+        Scenario("add_student POST", 'students.add_student', post("/add_student", student)),
+        Scenario("import_students", 'students.import_students_csv', post("/import_students", lambda n, values: {}, csv_file(
+            "name,grade,email,password,address,cellphone,tel_number,card_number",
+            lambda n, values: [f"Imported {n}-{i},7,imported{n}-{i}@demo-school.org,password,{i} Import Road,"
+                               f"09{n * 10 + i:08d},{30000000 + i},I{n * 10 + i:07d}" for i in range(10)]))),
+        Scenario("edit_student GET", 'students.edit_student', get("/edit_student/{student}")),
+        Scenario("edit_student POST", 'students.edit_student', post("/edit_student/{student}", lambda n, values: {
+            **student(n, values), 'name': f"Student {values['student']}",
+            'email': f"student{values['student']}@demo-school.org", 'card_number': f"C{values['student']:07d}"})),
+        Scenario("edit_user GET", 'users.edit_user', get("/edit_user/{user}")),
+        Scenario("edit_user POST", 'users.edit_user', post("/edit_user/{user}", lambda n, values: {
+            'name': f"Teacher {values['user']}", 'email': f"teacher{values['user']}@demo-school.org",
+            'cellphone': f"09{values['user']:08d}"})),
+        Scenario("add_course GET", 'courses.add_course', get("/add_course")),
+        Scenario("add_course POST", 'courses.add_course', post("/add_course", lambda n, values: {
+            'name': f"Harness Subject {n}", 'teacher': 1, 'students': course_students(n, values)})),
+        Scenario("edit_course GET", 'courses.edit_course', get("/edit_course/{course}")),
+        Scenario("edit_course POST", 'courses.edit_course', post("/edit_course/{teacher_course}", lambda n, values: {
+            'name': f"Subject {values['teacher_course']}", 'teacher': 1,
+            'students': ids.rosters[values['teacher_course']]})),
+        Scenario("add_test GET", 'tests.add_test', get("/add_test")),
+        Scenario("add_test POST", 'tests.add_test', post("/add_test", lambda n, values: {
+            'title': f"Harness Test {n}", 'course': values['teacher_course']})),
+        Scenario("add_score GET", 'tests.add_score', get("/add_score/{test}")),
+        Scenario("add_score POST", 'tests.add_score', post("/add_score/{empty_test}", roster_form(
+            "scores", lambda values: ids.rosters[values['teacher_course']]))),
+        Scenario("upload_scores", 'tests.upload_scores', post("/upload_scores/{empty_test}", lambda n, values: {},
+                                                        csv_file("student_id,score", lambda n, values: [
+                                                            f"{student_id},{(student_id + n) % 101}" for student_id
+                                                            in ids.rosters[values['teacher_course']]]))),
+        Scenario("edit_score GET", 'tests.edit_score', get("/edit_score/{test}")),
+        Scenario("edit_score POST", 'tests.edit_score', post("/edit_score/{empty_test}", roster_form(
+            "scores", lambda values: ids.rosters[values['teacher_course']]))),
+        Scenario("add_comm GET", 'comms.add_comm', get("/add_comm")),
+        Scenario("add_comm POST", 'comms.add_comm', post("/add_comm", comm)),
+        Scenario("comm POST", 'comms.comm', post("/comm/{comm}", comm)),
+
+        Scenario("push_test_result", 'tests.push_test_result', get("/push_test_result/{test}")),
+        Scenario("push_comm", 'comms.push_comm', get("/comm/{comm}/push_comm")),
+        Scenario("notify_job", 'comms.notify_job', get("/notify_job/1")),
+        Scenario("authorize", 'line.authorize', get("/authorize/{user}")),
+        Scenario("callback", 'line.callback', get("/callback?code=harness&state={student}"), anonymous=True),
+
+        Scenario("delete_comm", 'comms.delete_comm', deleting("/delete_comm/{id}", 'comms')),
+        Scenario("delete_test", 'tests.delete_test', deleting("/delete_test/{id}", 'tests')),
+        Scenario("delete_student", 'students.delete_student', deleting("/delete_student/{id}", 'students')),
+        Scenario("delete_course", 'courses.delete_course', deleting("/delete/{id}", 'courses')),
+        Scenario("delete_user", 'users.delete_user', deleting("/delete_user/{id}", 'users')),
+    ]
+
+
+DELETED_TABLES = {'comms.delete_comm': 'comms', 'tests.delete_test': 'tests', 'students.delete_student': 'students',
+                  'courses.delete_course': 'courses', 'users.delete_user': 'users'}
+
+
+# Clients
+
+class TestClient:
+    """Flask's test client in this process, the SQL statements of each request are counted on the engines."""
+
+    counts_statements = True
+
+    def __init__(self):
+        self.client = app.test_client()
+
+    def send(self, method, path, form=None, files=None):
+        data = dict(form or {})
+        for name, (content, filename) in (files or {}).items():
+            data[name] = (io.BytesIO(content.encode()), filename)
+        response = self.client.open(path, method=method, data=data)
+        body = response.get_data()
+        response.close()
+        return response.status_code, len(body), body.decode() if method == "GET" else ""
+
+
+class HttpClient:
+    """requests.Session against the gunicorn started by GunicornServer."""
+
+    counts_statements = False
+
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url
+        self.session = requests.Session()
+
+    def send(self, method, path, form=None, files=None):
+        files = {name: (filename, content) for name, (content, filename) in (files or {}).items()} or None
+        response = self.session.request(method, self.base_url + path, data=form, files=files,
+                                        allow_redirects=False, timeout=120)
+        return response.status_code, len(response.content), response.text if method == "GET" else ""
+
+
+def logged_in(client):
+    status, size, page = client.send("GET", "/login")
+    token = CSRF_TOKEN.search(page).group(1)
+    status, size, page = client.send("POST", "/login", {**LOGIN, 'csrf_token': token})
+    assert status == 302, f"login answered {status}"
+    client.csrf_token = csrf_token(client)
+    return client
+
+
+def csrf_token(client):
+    # Flask-WTF tokens are per session and reusable until they expire, one is enough for a run
+    status, size, page = client.send("GET", "/add_comm")
+    return CSRF_TOKEN.search(page).group(1)
+
+
+def anonymous(client):
+    status, size, page = client.send("GET", "/login")
+    client.csrf_token = CSRF_TOKEN.search(page).group(1)
+    return client
+
+
+class GunicornServer:
+    def __init__(self, workers, threads):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "--workers", str(workers), "--threads", str(threads),
+             "--bind", f"127.0.0.1:{self.port}", "--log-level", "warning", "main:app"],
+            env=dict(os.environ), cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.wait_until_up()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def wait_until_up(self, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with {self.process.returncode}")
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError("gunicorn didn't start")
+
+    def worker_pids(self):
+        pids = []
+        for task in os.listdir(f"/proc/{self.process.pid}/task"):
+            with open(f"/proc/{self.process.pid}/task/{task}/children") as file:
+                pids += [int(pid) for pid in file.read().split()]
+        return pids
+
+    def peak_memory(self):
+        """VmHWM of the workers summed, in bytes."""
+        total = 0
+        for pid in self.worker_pids():
+            with open(f"/proc/{pid}/status") as file:
+                total += next(int(line.split()[1]) * 1024 for line in file if line.startswith("VmHWM:"))
+        return total
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait(timeout=30)
+
+
+# Measuring
+
+class StatementCounter:
+    """SQL statements run by the current thread on `engines`."""
+
+    def __init__(self, engines):
+        self.engines = list(engines)
+        self.local = threading.local()
+        for engine in self.engines:
+            event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.local.count = getattr(self.local, 'count', 0) + 1
+
+    def reset(self):
+        self.local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self.local, 'count', 0)
+
+    def remove(self):
+        for engine in self.engines:
+            event.remove(engine, "before_cursor_execute", self.before_cursor_execute)
+
+
+def requests_per_second(client, path, seconds, before=None):
+    """GET `path` with a test client for `seconds`, `before(n)` runs ahead of the n-th request."""
+    done = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        if before is not None:
+            before(done)
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.status_code)
+        done += 1
+    return done / (time.perf_counter() - start)
+
+
+def metrics_statements(client):
+    status, size, page = client.send("GET", "/metrics")
+    match = re.search(r"^db_query_seconds_count (\d+)$", page, re.MULTILINE)
+    return int(match.group(1)) if match else 0
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def summary(latencies, statements, statuses, elapsed, peak_memory):
+    milliseconds = lambda value: None if value is None else round(value * 1000, 3)  # noqa: E731
+    return {
+        'requests': len(latencies),
+        'statuses': {str(status): statuses.count(status) for status in sorted(set(statuses))},
+        'p50_ms': milliseconds(percentile(latencies, 0.50)),
+        'p95_ms': milliseconds(percentile(latencies, 0.95)),
+        'p99_ms': milliseconds(percentile(latencies, 0.99)),
+        'max_ms': milliseconds(max(latencies, default=None)),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'sql_statements': round(sum(statements) / len(statements), 2) if statements else None,
+        'sql_statements_max': max(statements, default=None),
+        'peak_memory_bytes': peak_memory,
+    }
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.server = None
+        self.counter = None
+
+    def client(self, anonymous_client=False):
+        client = TestClient() if self.server is None else HttpClient(self.server.url)
+        return anonymous(client) if anonymous_client else logged_in(client)
+
+    def calls(self, scenario, ids):
+        table = DELETED_TABLES.get(scenario.endpoint)
+        wanted = self.args.warmup + self.args.requests + self.args.memory_requests
+        if table is None:
+            return wanted
+        # deletes can't repeat an id, they get what is left at the end of their table
+        return min(wanted, ids.capacity(table))
+
+    def send(self, client, scenario, ids, n):
+        method, path, form, files = scenario.request(n, ids)
+        if method == "POST":
+            form = {**form, 'csrf_token': client.csrf_token}
+        if self.counter:
+            self.counter.reset()
+        start = time.perf_counter()
+        status, size, page = client.send(method, path, form, files)
+        latency = time.perf_counter() - start
+        return latency, self.counter.count if self.counter else None, status
+
+    def run(self, scenario, ids):
+        calls = self.calls(scenario, ids)
+        warmup = min(self.args.warmup, calls // 3)
+        memory_requests = min(self.args.memory_requests, (calls - warmup) // 3) if self.server is None else 0
+        timed = calls - warmup - memory_requests
+        clients = [self.client(scenario.anonymous) for _ in range(self.args.concurrency)]
+        counter = iter(range(calls))
+        for _ in range(warmup):
+            self.send(clients[0], scenario, ids, next(counter))
+
+        statements_before = metrics_statements(clients[0]) if self.server and self.args.workers == 1 else None
+        numbers = [next(counter) for _ in range(timed)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as executor:
+            results = list(executor.map(
+                lambda pair: self.send(clients[pair[0] % len(clients)], scenario, ids, pair[1]),
+                enumerate(numbers)))
+        elapsed = time.perf_counter() - start
+        latencies = [latency for latency, statements, status in results]
+        statuses = [status for latency, statements, status in results]
+        statements = [statements for latency, statements, status in results if statements is not None]
+        if statements_before is not None:
+            # the count includes the /metrics request's own statements, which is none
+            statements = [(metrics_statements(clients[0]) - statements_before) / max(timed, 1)]
+
+        if self.server is not None:
+            peak_memory = self.server.peak_memory()
+        elif memory_requests:
+            tracemalloc.start()
+            for _ in range(memory_requests):
+                tracemalloc.reset_peak()
+                self.send(clients[0], scenario, ids, next(counter))
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            peak_memory = None
+        return summary(latencies, statements, statuses, elapsed, peak_memory)
+
+
+def prepare(scale, requests):
+    """Generate the dataset and the rows the write scenarios need, returns the Ids."""
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        start = time.perf_counter()
+        generate(**SCALES[scale])
+        generated = time.perf_counter() - start
+        # the comm, test and course forms only offer the logged in teacher's courses
+        course = db.session.get(Course, 1)
+        course.teacher_id = 1
+        # empty tests of that course for add_score, upload_scores and edit_score to fill
+        first = db.session.execute(select(func.max(Test.id))).scalar() + 1
+        db.session.execute(insert(Test), [{'id': first + i, 'title': f"Harness Test {i}", 'course_id': 1,
+                                           'teacher_id': 1} for i in range(requests)])
+        db.session.commit()
+        rosters = {1: db.session.execute(select(student_course_relation.c.student_id).where(
+            student_course_relation.c.course_id == 1).order_by(student_course_relation.c.student_id)).scalars().all()}
+        counts = {name: db.session.execute(select(func.max(model.id))).scalar() or 0 for name, model in [
+            ('students', Student), ('users', User), ('courses', Course), ('tests', Test), ('comms', Communication)]}
+        counts['tests'] = first - 1
+    return Ids(counts, 1, list(range(first, first + requests)), rosters), generated
+
+
+def drain_notify_jobs():
+    """Run the worker until the queue is empty, the deliveries go to the stub."""
+    stub.reset()
+    start = time.perf_counter()
+    with app.app_context():
+        jobs = db.session.execute(select(func.count(NotifyJob.id))).scalar()
+        while run_once():
+            pass
+    return {'jobs': jobs, 'messages': stub.requests, 'seconds': round(time.perf_counter() - start, 3)}
+
+
+def compare(previous, current):
+    print(f"\n{'endpoint':28} {'p50 before':>11} {'p50 now':>9} {'change':>8} {'sql before':>11} {'sql now':>8}")
+    for name, now in current['endpoints'].items():
+        before = previous['endpoints'].get(name)
+        if not before or not before['p50_ms'] or now['p50_ms'] is None:
+            continue
+        change = (now['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100
+        print(f"{name:28} {before['p50_ms']:11.2f} {now['p50_ms']:9.2f} {change:+7.1f}% "
+              f"{before['sql_statements'] if before['sql_statements'] is not None else '-':>11} "
+              f"{now['sql_statements'] if now['sql_statements'] is not None else '-':>8}")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency, throughput, SQL statements and memory of every route")
+    parser.add_argument('--scale', choices=SCALES, default='1k')
+    parser.add_argument('--server', choices=["testclient", "gunicorn"], default="testclient")
+    parser.add_argument('--workers', type=int, default=1, help="gunicorn workers")
+    parser.add_argument('--threads', type=int, default=1, help="gunicorn threads per worker")
+    parser.add_argument('--concurrency', type=int, default=1, help="clients sending at the same time")
+    parser.add_argument('--requests', type=int, default=30, help="timed requests per endpoint")
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--memory-requests', type=int, default=3, help="traced requests per endpoint (test client)")
+    parser.add_argument('--only', action="append", help="run only endpoints whose name contains this, repeatable")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="JSON file of an earlier run to compare with")
+    args = parser.parse_args()
+
+    calls = args.warmup + args.requests + args.memory_requests
+    ids, generated = prepare(args.scale, calls)
+    print(f"{args.scale} dataset generated in {generated:.1f} s, {ids.counts}")
+
+    harness = Harness(args)
+    todo = scenarios(ids)
+    covered = {scenario.endpoint for scenario in todo}
+    missing = {rule.endpoint for rule in app.url_map.iter_rules()} - covered - SKIPPED_ENDPOINTS
+    if missing:
+        print(f"warning: no scenario for {', '.join(sorted(missing))}")
+    if exports.pa is None:
+        todo = [scenario for scenario in todo if scenario.endpoint != 'exports.export_gradebook_arrow']
+    if args.only:
+        todo = [scenario for scenario in todo if any(part in scenario.name for part in args.only)]
+
+    if args.server == "gunicorn":
+        harness.server = GunicornServer(args.workers, args.threads)
+    else:
+        with app.app_context():
+            harness.counter = StatementCounter(db.engines.values())
+
+    results = {}
+    try:
+        print(f"{'endpoint':28} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'sql':>7} {'peak MiB':>9}  statuses")
+        for scenario in todo:
+            result = results[scenario.name] = harness.run(scenario, ids)
+            peak = result['peak_memory_bytes']
+            print(f"{scenario.name:28} {result['p50_ms']:8.2f} {result['p95_ms']:8.2f} {result['p99_ms']:8.2f} "
+                  f"{result['throughput_rps']:8.1f} "
+                  f"{result['sql_statements'] if result['sql_statements'] is not None else '-':>7} "
+                  f"{peak / 2 ** 20 if peak is not None else float('nan'):9.2f}  {result['statuses']}")
+        notify = drain_notify_jobs()
+        print(f"notify worker: {notify['jobs']} jobs, {notify['messages']} messages to the stub "
+              f"in {notify['seconds']} s")
+    finally:
+        if harness.server is not None:
+            harness.server.stop()
+        stub.stop()
+
+    report = {
+        'meta': {
+            'scale': args.scale, 'rows': ids.counts, 'server': args.server, 'workers': args.workers,
+            'threads': args.threads, 'concurrency': args.concurrency, 'requests': args.requests,
+            'commit': git_commit(), 'python': platform.python_version(),
+            'started': datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        'endpoints': results,
+        'notify_worker': notify,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as file:
+            compare(json.load(file), report)
+
+
+if __name__ == "__main__":
+    main()
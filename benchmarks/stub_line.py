@@ -0,0 +1,72 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubLineServer(ThreadingHTTPServer):
+    """Local stand-in for notify-api.line.me and the token endpoint of notify-bot.line.me.
+
+    Every request sleeps for `latency` seconds before answering 200, like the real API would.
+    `requests` and `connections` count what the clients did.
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, latency=0.1, port=0):
+        super().__init__(("127.0.0.1", port), StubLineHandler)
+        self.latency = latency
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"{self.base_url}/api/notify"
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.connections = 0
+
+
+class StubLineHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one segment, otherwise Nagle + delayed ACK adds 40 ms to kept-alive connections
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+        if self.path.startswith("/oauth/token"):
+            body = b'{"status":200,"access_token":"stub-token"}'
+        else:
+            body = b'{"status":200,"message":"ok"}'
+        self.send_response(200)
+        self.send_header('Content-Type', "application/json")
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
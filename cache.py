@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.base import NO_VALUE
+
+# In-process caches and the hook that keeps them fresh.
+#
+# Every flush records which rows it touched as (table name, id) keys, including the rows their
+# foreign keys and many-to-many collections point at. When the session commits, every function
+# registered with on_commit() gets the keys. Statements that bypass the ORM (bulk INSERT/UPDATE)
+# report their rows with mark_dirty().
+#
+# The caches live in one process, so other gunicorn workers only see a change once their copy
+# expires. Keep the TTL short for anything a user expects to see right after saving.
+
+
+_caches = []
+
+
+class TTLCache:
+    """Thread safe LRU cache whose entries expire `ttl` seconds after they were set."""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        _caches.append(self)
+
+    def get(self, key, default=None):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self.data[key]
+                return default
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self.lock:
+            self.data[key] = (time.monotonic() + self.ttl, value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def pop(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def pop_matching(self, predicate):
+        """Drop every entry whose key satisfies predicate(key)."""
+        with self.lock:
+            for key in [key for key in self.data if predicate(key)]:
+                del self.data[key]
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def __len__(self):
+        return len(self.data)
+
+
+def clear_all():
+    """Empty every cache, for when the database was changed behind the session's back (tests, benchmarks)."""
+    for cache in _caches:
+        cache.clear()
+
+
+_invalidators = []
+
+
+def on_commit(function):
+    """Register function(keys) to be called with the (table, id) keys of every committed change."""
+    _invalidators.append(function)
+    return function
+
+
+def mark_dirty(session, *keys):
+    session.info.setdefault('dirty_keys', set()).update(keys)
+
+
+def changed_keys(instance):
+    state = inspect(instance)
+    mapper = state.mapper
+    keys = {(mapper.local_table.name, state.identity[0] if state.identity else getattr(instance, 'id', None))}
+    for column in mapper.columns:
+        for foreign_key in column.foreign_keys:
+            # old and new value of a changed foreign key, or the current one (never triggers a load)
+            for value in state.attrs[column.key].history.sum() or [state.dict.get(column.key)]:
+                if value is not None:
+                    keys.add((foreign_key.column.table.name, value))
+    # many-to-many rows change without the other side being flushed, use what the session already loaded
+    for relationship in mapper.relationships:
+        if relationship.secondary is None:
+            continue
+        attribute = state.attrs[relationship.key]
+        related = list(attribute.history.deleted or [])
+        if attribute.loaded_value is not NO_VALUE:
+            related += list(attribute.loaded_value or [])
+        for other in related:
+            keys.add((relationship.mapper.local_table.name, other.id))
+    return keys
+
+
+@event.listens_for(Session, "after_flush")
+def collect_changes(session, flush_context):
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        mark_dirty(session, *changed_keys(instance))
+
+
+@event.listens_for(Session, "after_commit")
+def dispatch_changes(session):
+    keys = session.info.pop('dirty_keys', None)
+    if keys:
+        for invalidate in _invalidators:
+            invalidate(keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_changes(session):
+    session.info.pop('dirty_keys', None)
@@ -0,0 +1,100 @@
+import os
+
+from sqlalchemy import or_, select
+
+from cache import TTLCache, on_commit
+from routing import primary_reads
+from models import db, User, Student, Course
+
+# (id, label) lists for the SelectField / SelectMultipleField choices in forms.py.
+# Only the two columns are selected and each list is cached until a commit touches its table.
+#
+# Commits only invalidate the cache of the worker that made them, so another worker's list can miss a
+# row for up to CHOICE_CACHE_TTL seconds. That is fine for rendering a form, not for validating one:
+# with_submitted() adds the submitted ids from the database, so a teacher or student created on another
+# worker is never "Not a valid choice".
+
+CHOICE_CACHE_TTL = int(os.environ.get("CHOICE_CACHE_TTL", 30))
+# Above this many students the course forms switch to the typeahead instead of listing everyone
+INLINE_STUDENT_LIMIT = int(os.environ.get("INLINE_STUDENT_LIMIT", 200))
+SEARCH_LIMIT = 20
+
+cache = TTLCache(maxsize=1024, ttl=CHOICE_CACHE_TTL)
+
+
+def cached(key, query):
+    choices = cache.get(key)
+    if choices is None:
+        with primary_reads():
+            choices = [tuple(row) for row in db.session.execute(query)]
+        cache.set(key, choices)
+    return choices
+
+
+def teacher_choices():
+    return cached(("users",), select(User.id, User.name).order_by(User.name, User.id))
+
+
+def student_choices():
+    return cached(("students",), select(Student.id, Student.name).order_by(Student.name, Student.id))
+
+
+def student_count():
+    count = cache.get(("students", "count"))
+    if count is None:
+        with primary_reads():
+            count = db.session.execute(select(db.func.count(Student.id))).scalar()
+        cache.set(("students", "count"), count)
+    return count
+
+
+def course_choices(teacher_id):
+    return cached(("courses", teacher_id),
+                  select(Course.id, Course.subject).where(Course.teacher_id == teacher_id).order_by(Course.id))
+
+
+def teacher_choices_for(user_ids):
+    """Choices for just these users, read from the database."""
+    if not user_ids:
+        return []
+    return [tuple(row) for row in db.session.execute(
+        select(User.id, User.name).where(User.id.in_(user_ids)).order_by(User.name, User.id)
+    )]
+
+
+def with_submitted(choices, submitted, choices_for):
+    """`choices` plus the ones for the `submitted` ids it lacks, choices_for(ids) reads those from the database."""
+    known = {choice_id for choice_id, label in choices}
+    missing = set(submitted) - known
+    return choices + choices_for(missing) if missing else choices
+
+
+def student_choices_for(student_ids):
+    """Choices for just these students, e.g. the ones already in a course or the ones a form submitted."""
+    if not student_ids:
+        return []
+    return [tuple(row) for row in db.session.execute(
+        select(Student.id, Student.name).where(Student.id.in_(student_ids)).order_by(Student.name, Student.id)
+    )]
+
+
+def search_students(text, limit=SEARCH_LIMIT):
+    """Students whose name or email starts with `text`, or whose card number is `text`."""
+    text = text.strip()
+    if not text:
+        return []
+    pattern = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    return [tuple(row) for row in db.session.execute(
+        select(Student.id, Student.name)
+        .where(or_(Student.name.ilike(pattern, escape="\\"),
+                   Student.email.ilike(pattern, escape="\\"),
+                   Student.card_number == text))
+        .order_by(Student.name, Student.id)
+        .limit(limit)
+    )]
+
+
+@on_commit
+def invalidate(keys):
+    tables = {table for table, row_id in keys}
+    cache.pop_matching(lambda key: key[0] in tables)
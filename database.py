@@ -0,0 +1,63 @@
+import os
+
+from sqlalchemy.engine import make_url
+
+from metrics import TimedQueuePool, instrument_engine
+from models import db
+from routing import REPLICA_URI
+
+# Engine settings, all from the environment:
+#   DB_URI (or DATABASE_URL)  the database, a local SQLite file when neither is set
+#   DB_REPLICA_URI            optional read replica of it, see routing.py
+#   DB_POOL_SIZE              connections each process keeps open (5)
+#   DB_MAX_OVERFLOW           extra connections allowed under load (10)
+#   DB_POOL_TIMEOUT           seconds to wait for a free connection before failing (10)
+#   DB_POOL_RECYCLE           reconnect connections older than this many seconds (1800)
+#   DB_POOL_PRE_PING          test a connection before handing it out (on)
+
+LOCAL_DB_URI = "sqlite:///school.db"
+
+
+def database_uri():
+    uri = os.environ.get('DB_URI') or os.environ.get('DATABASE_URL') or LOCAL_DB_URI
+    # Heroku style URLs, SQLAlchemy only accepts the postgresql:// scheme
+    if uri.startswith("postgres://"):
+        uri = "postgresql://" + uri[len("postgres://"):]
+    return uri
+
+
+def engine_options(uri):
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # Flask-SQLAlchemy gives an in-memory database one shared connection, leave it alone
+        return {}
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', "1").lower() not in ("0", "false", "no"),
+    }
+
+
+def init_db(app):
+    """Configure and attach the database to `app`, returns its engines."""
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', database_uri())
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    if REPLICA_URI:
+        app.config['SQLALCHEMY_BINDS'] = {'replica': dict(engine_options(REPLICA_URI), url=REPLICA_URI)}
+    db.init_app(app)
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        instrument_engine(engine)
+
+    def reset_pools():
+        # connections opened before a fork (gunicorn --preload, the hashing pool) belong to the parent,
+        # the child drops its references without closing the parent's sockets
+        for engine in engines:
+            engine.dispose(close=False)
+
+    os.register_at_fork(after_in_child=reset_pools)
+    return engines
@@ -0,0 +1,149 @@
+import csv
+import io
+from itertools import groupby
+
+from flask import Response, abort, stream_with_context
+from sqlalchemy import select, and_
+
+try:
+    import pyarrow as pa
+except ImportError:  # the Arrow export is only offered when pyarrow is installed
+    pa = None
+
+from models import db, Student, Course, Test, Score, student_course_relation
+
+# CSV exports streamed straight from a server-side cursor, so memory stays flat whatever the table size
+
+YIELD_PER = 1000
+
+
+def csv_lines(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for n, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if n % YIELD_PER == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_rows(stmt):
+    return db.session.execute(stmt.execution_options(yield_per=YIELD_PER))
+
+
+def csv_response(filename, header, stmt):
+    return Response(stream_with_context(csv_lines(header, stream_rows(stmt))),
+                    mimetype="text/csv",
+                    headers={'Content-Disposition': f"attachment; filename={filename}"})
+
+
+def students_csv():
+    # the same columns import_students reads, minus the password
+    columns = [Student.id, Student.name, Student.grade, Student.email, Student.address, Student.cellphone,
+               Student.tel_number, Student.card_number]
+    return csv_response("students.csv", [column.key for column in columns],
+                        select(*columns).order_by(Student.id))
+
+
+def scores_csv():
+    return csv_response(
+        "scores.csv",
+        ['test_id', 'test', 'course', 'student_id', 'student', 'score'],
+        select(Test.id, Test.title, Course.subject, Student.id, Student.name, Score.score)
+        .join(Test, Test.id == Score.test_id)
+        .join(Student, Student.id == Score.student_id)
+        .outerjoin(Course, Course.id == Test.course_id)
+        .order_by(Test.id, Student.id)
+    )
+
+
+def rosters_csv():
+    return csv_response(
+        "rosters.csv",
+        ['course_id', 'course', 'student_id', 'student'],
+        select(Course.id, Course.subject, Student.id, Student.name)
+        .join(student_course_relation, student_course_relation.c.course_id == Course.id)
+        .join(Student, Student.id == student_course_relation.c.student_id)
+        .order_by(Course.id, Student.id)
+    )
+
+
+def gradebook_tests(course_id=None):
+    stmt = select(Test.id, Test.title, Course.subject).outerjoin(Course, Course.id == Test.course_id)
+    if course_id is not None:
+        stmt = stmt.where(Test.course_id == course_id)
+    return db.session.execute(stmt.order_by(Test.course_id, Test.id)).all()
+
+
+def gradebook_rows(course_id=None):
+    # one row per (student, score), students without scores come through once with a NULL test
+    if course_id is None:
+        return (select(Student.id, Student.name, Score.test_id, Score.score)
+                .outerjoin(Score, Score.student_id == Student.id)
+                .order_by(Student.id))
+    return (select(Student.id, Student.name, Score.test_id, Score.score)
+            .join(student_course_relation, and_(student_course_relation.c.student_id == Student.id,
+                                                student_course_relation.c.course_id == course_id))
+            .outerjoin(Score, and_(Score.student_id == Student.id,
+                                   Score.test_id.in_(select(Test.id).where(Test.course_id == course_id))))
+            .order_by(Student.id))
+
+
+def pivot(rows, test_ids):
+    """Fold rows ordered by student into [student_id, student, score per test], one student at a time."""
+    position = {test_id: i for i, test_id in enumerate(test_ids, start=2)}
+    width = len(test_ids) + 2
+    for (student_id, name), scores in groupby(rows, key=lambda row: (row[0], row[1])):
+        line = [student_id, name] + [None] * (width - 2)
+        for _, _, test_id, score in scores:
+            if test_id in position:
+                line[position[test_id]] = score
+        yield line
+
+
+def gradebook_header(tests, course_id=None):
+    if course_id is None:
+        return ['student_id', 'student'] + [f"{subject or '-'}: {title}" for _, title, subject in tests]
+    return ['student_id', 'student'] + [title for _, title, _ in tests]
+
+
+def gradebook_csv(course_id=None):
+    tests = gradebook_tests(course_id)
+    lines = pivot(stream_rows(gradebook_rows(course_id)), [test_id for test_id, _, _ in tests])
+    filename = "gradebook.csv" if course_id is None else f"gradebook-course-{course_id}.csv"
+    return Response(stream_with_context(csv_lines(gradebook_header(tests, course_id), lines)),
+                    mimetype="text/csv",
+                    headers={'Content-Disposition': f"attachment; filename={filename}"})
+
+
+def arrow_batches(schema, lines):
+    # an Arrow IPC stream, flushed one record batch of YIELD_PER students at a time
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        while True:
+            batch = [line for _, line in zip(range(YIELD_PER), lines)]
+            if not batch:
+                break
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(zip(*batch), schema)], schema=schema))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+    yield sink.getvalue()
+
+
+def gradebook_arrow(course_id=None):
+    if pa is None:
+        abort(501, "The Arrow export needs pyarrow installed")
+    tests = gradebook_tests(course_id)
+    header = gradebook_header(tests, course_id)
+    schema = pa.schema([pa.field(header[0], pa.int64(), nullable=False), pa.field(header[1], pa.string())]
+                       + [pa.field(name, pa.int32()) for name in header[2:]])
+    lines = pivot(stream_rows(gradebook_rows(course_id)), [test_id for test_id, _, _ in tests])
+    filename = "gradebook.arrow" if course_id is None else f"gradebook-course-{course_id}.arrow"
+    return Response(stream_with_context(arrow_batches(schema, lines)),
+                    mimetype="application/vnd.apache.arrow.stream",
+                    headers={'Content-Disposition': f"attachment; filename={filename}"})
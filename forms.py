@@ -1,7 +1,8 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import StringField, SubmitField, EmailField, PasswordField, SelectField, SelectMultipleField, widgets, \
     FieldList, IntegerField, FormField, TextAreaField, HiddenField
-from wtforms.validators import DataRequired, Email, Length
+from wtforms.validators import DataRequired, Email, Length, NumberRange, Optional
 
 
 class CreateCourseForm(FlaskForm):
@@ -76,8 +77,16 @@ class CreateTestForm(FlaskForm):
     submit = SubmitField("Create")
 
 
+MIN_SCORE, MAX_SCORE = 0, 100
+
+
 class StudentScore(FlaskForm):
-    score = IntegerField()
+    class Meta:
+        # one row of CreateScoreForm, its CSRF token covers every row
+        csrf = False
+
+    student_id = HiddenField()
+    score = IntegerField(validators=[Optional(), NumberRange(min=MIN_SCORE, max=MAX_SCORE)])
 
 
 class CreateScoreForm(FlaskForm):
@@ -85,6 +94,18 @@ class CreateScoreForm(FlaskForm):
     submit = SubmitField("Submit")
 
 
+class UploadScoreForm(FlaskForm):
+    file = FileField("Score sheet (CSV with student_id, email or card_number and score)",
+                     validators=[FileRequired(), FileAllowed(['csv'], "CSV files only")])
+    submit = SubmitField("Upload")
+
+
+class ImportStudentForm(FlaskForm):
+    file = FileField("Students (CSV with name, grade, email, password, address, cellphone, tel_number, card_number)",
+                     validators=[FileRequired(), FileAllowed(['csv'], "CSV files only")])
+    submit = SubmitField("Import")
+
+
 class CreateNotifyForm(FlaskForm):
     teachers = SelectMultipleField("Teachers",
                                    coerce=int,
@@ -0,0 +1,165 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from hashlib import sha1
+
+from flask import request
+from markupsafe import Markup
+
+from cache import TTLCache, on_commit
+from pagination import PAGE_ARGS
+from routing import primary_reads
+
+# Rendered HTML of the list tables. A fragment is stored together with the generation of the
+# tables it was rendered from, and every commit bumps the generation of the tables it touched
+# (or the single global one with FRAGMENT_GENERATIONS=global), so a fragment is served until
+# the next write to one of its tables and re-rendered after that.
+#
+# FRAGMENT_CACHE picks the backend:
+#   memory - LRU in each process. Other gunicorn workers don't see the bump, their
+#            copy lives at most FRAGMENT_CACHE_TTL seconds.
+#   file   - files in FRAGMENT_CACHE_DIR, fragments and generations shared by every worker.
+#            Fragments older than FRAGMENT_CACHE_TTL are swept, and the oldest ones beyond
+#            FRAGMENT_CACHE_SIZE files.
+#   off    - always render
+#
+# A fragment is keyed on the query arguments paginate() reads, anything else in the query string
+# doesn't make a new copy. The summaries a fragment shows check the same generations (see
+# summaries.py), so a worker that missed another worker's commit can't render its stale numbers
+# under the new generation.
+
+BACKEND = os.environ.get("FRAGMENT_CACHE", "memory")
+GENERATIONS = os.environ.get("FRAGMENT_GENERATIONS", "table")
+CACHE_DIR = os.environ.get("FRAGMENT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "sms-fragments"))
+CACHE_TTL = int(os.environ.get("FRAGMENT_CACHE_TTL", 300))
+CACHE_SIZE = int(os.environ.get("FRAGMENT_CACHE_SIZE", 512))
+SWEEP_INTERVAL = 60
+
+
+class MemoryBackend:
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.fragments = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.generations = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        return self.fragments.get(key)
+
+    def set(self, key, generation, html):
+        self.fragments.set(key, (generation, html))
+
+    def generation(self, name):
+        return self.generations.get(name, 0)
+
+    def bump(self, name):
+        with self.lock:
+            self.generations[name] = self.generations.get(name, 0) + 1
+
+
+class FileBackend:
+    """One file per fragment key, the generation on its first line, plus one file per generation."""
+
+    def __init__(self, directory=CACHE_DIR, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.directory = directory
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.next_sweep = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, kind, key):
+        return os.path.join(self.directory, f"{kind}-{sha1(repr(key).encode()).hexdigest()}")
+
+    def write(self, path, text):
+        # readers in other workers see the old file or the new one, never half of it
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(text)
+        os.replace(temporary, path)
+
+    def get(self, key):
+        try:
+            with open(self.path("fragment", key), encoding="utf-8") as file:
+                generation = file.readline().rstrip("\n")
+                return generation, file.read()
+        except OSError:
+            return None
+
+    def set(self, key, generation, html):
+        self.write(self.path("fragment", key), f"{generation}\n{html}")
+        if time.monotonic() >= self.next_sweep:
+            self.next_sweep = time.monotonic() + SWEEP_INTERVAL
+            self.sweep()
+
+    def sweep(self):
+        """Delete fragments older than the TTL, then the oldest ones above maxsize."""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith("fragment-"):
+                try:
+                    files.append((entry.stat().st_mtime, entry.path))
+                except OSError:  # another worker swept it first
+                    pass
+        files.sort(reverse=True)
+        expired = time.time() - self.ttl
+        for position, (modified, path) in enumerate(files):
+            if position >= self.maxsize or modified < expired:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def generation(self, name):
+        try:
+            with open(self.path("generation", name), encoding="utf-8") as file:
+                return file.read()
+        except OSError:
+            return "0"
+
+    def bump(self, name):
+        # a fresh token instead of a counter, so bumps from two workers can't collapse into one
+        self.write(self.path("generation", name), uuid.uuid4().hex)
+
+
+BACKENDS = {'memory': MemoryBackend, 'file': FileBackend}
+backend = BACKENDS[BACKEND]() if BACKEND in BACKENDS else None
+
+
+def generation_names(tables):
+    return ["*"] if GENERATIONS == "global" else sorted(tables)
+
+
+def current_generation(tables):
+    """The generations of `tables` as one string, the same for every worker with a shared backend."""
+    if backend is None:
+        return ""
+    return "/".join(str(backend.generation(name)) for name in generation_names(tables))
+
+
+def cached(name, tables, render):
+    """HTML of fragment `name` for the current query string, render() only runs on a miss.
+
+    `tables` are the tables the fragment shows data from.
+    """
+    if backend is None:
+        return Markup(render())
+    key = (name, tuple((arg, request.args.get(arg)) for arg in PAGE_ARGS if arg in request.args))
+    # read before rendering, a commit during the render leaves the fragment already stale
+    generation = current_generation(tables)
+    entry = backend.get(key)
+    if entry is not None and entry[0] == generation:
+        return Markup(entry[1])
+    # from the primary, a lagging replica would be cached until the next write
+    with primary_reads():
+        html = render()
+    backend.set(key, generation, html)
+    return Markup(html)
+
+
+@on_commit
+def bump_generations(keys):
+    if backend is None:
+        return
+    for name in generation_names({table for table, row_id in keys}):
+        backend.bump(name)
@@ -0,0 +1,146 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+# Password hashing runs in a process pool instead of the web worker, so a login burst competes for
+# HASH_WORKERS cores rather than for every gunicorn worker at once. At most HASH_QUEUE_SIZE hashes
+# may be running or waiting per web worker, past that the request gets a 503 with Retry-After
+# instead of queueing until every login times out.
+#
+# How many hashes run at once is limited across workers by a table of leases created when this
+# module is imported, with `gunicorn --preload` in the master, so every worker forked from it shares
+# it. A lease names its process and expires, so a worker or pool process killed mid-hash (a gunicorn
+# timeout, the OOM killer) can't take its share of the cores with it. Without --preload each worker
+# imports its own table and the limit is per worker.
+
+
+def full_method(method):
+    # werkzeug fills in pbkdf2 defaults when hashing, spell them out so stored hashes compare equal
+    parts = method.split(":")
+    if parts[0] == "pbkdf2":
+        parts += ["sha256", str(DEFAULT_PBKDF2_ITERATIONS)][len(parts) - 1:]
+    return ":".join(parts)
+
+
+METHOD = full_method(os.environ.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256:260000"))
+SALT_LENGTH = int(os.environ.get("PASSWORD_SALT_LENGTH", 16))
+HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+HASH_QUEUE_SIZE = int(os.environ.get("PASSWORD_HASH_QUEUE_SIZE", HASH_WORKERS * 4))
+ADMIT_TIMEOUT = float(os.environ.get("PASSWORD_HASH_ADMIT_TIMEOUT", 0.5))
+RETRY_AFTER = int(os.environ.get("PASSWORD_HASH_RETRY_AFTER", 2))
+LEASE_SECONDS = float(os.environ.get("PASSWORD_HASH_LEASE", 30))
+
+
+def alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Leases:
+    """At most `size` holders across processes. A lease lapses when its process dies or after `ttl` seconds."""
+
+    def __init__(self, size, ttl=LEASE_SECONDS):
+        # (pid, expiry) per slot, the array's lock is only held while scanning it
+        self.table = multiprocessing.Array("d", size * 2)
+        self.ttl = ttl
+
+    def acquire(self):
+        while True:
+            with self.table.get_lock():
+                now = time.time()
+                for slot in range(0, len(self.table), 2):
+                    pid, expires = int(self.table[slot]), self.table[slot + 1]
+                    if not pid or expires < now or not alive(pid):
+                        self.table[slot], self.table[slot + 1] = os.getpid(), now + self.ttl
+                        return slot
+            time.sleep(0.005)
+
+    def release(self, slot):
+        with self.table.get_lock():
+            # a lease that lapsed may have gone to someone else since
+            if int(self.table[slot]) == os.getpid():
+                self.table[slot] = 0
+
+    def __enter__(self):
+        self.held = self.acquire()
+
+    def __exit__(self, *exc_info):
+        self.release(self.held)
+
+
+_pool = None
+_pool_pid = None
+# hashes admitted (running or waiting) in this web worker
+_slots = None
+# hashes running, shared by every worker, taken by the pool process around each hash
+_cores = Leases(HASH_WORKERS)
+
+
+def _init_pool(cores):
+    global _cores
+    _cores = cores
+
+
+def hash_pool():
+    # created on first use in each process, a pool inherited through fork would be unusable
+    global _pool, _pool_pid, _slots
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = ProcessPoolExecutor(max_workers=HASH_WORKERS, initializer=_init_pool, initargs=(_cores,))
+        _pool_pid = os.getpid()
+        _slots = threading.BoundedSemaphore(HASH_QUEUE_SIZE)
+    return _pool
+
+
+def _generate(password):
+    with _cores:
+        return generate_password_hash(password, method=METHOD, salt_length=SALT_LENGTH)
+
+
+def _check(password_hash, password):
+    with _cores:
+        return check_password_hash(password_hash, password)
+
+
+def _admitted(function, *args):
+    pool = hash_pool()
+    if not _slots.acquire(timeout=ADMIT_TIMEOUT):
+        raise ServiceUnavailable("Too many logins at once, please try again in a moment.", retry_after=RETRY_AFTER)
+    try:
+        future = pool.submit(function, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future.result()
+
+
+def hash_password(password):
+    """Hash with the configured method, raises ServiceUnavailable (503) when the queue is full."""
+    return _admitted(_generate, password)
+
+
+def check_password(password_hash, password):
+    """check_password_hash in the pool, raises ServiceUnavailable (503) when the queue is full."""
+    return _admitted(_check, password_hash, password)
+
+
+def hash_passwords(passwords):
+    """Hash a batch for bulk imports, spread over the pool without going through admission."""
+    return list(hash_pool().map(_generate, passwords, chunksize=max(len(passwords) // HASH_WORKERS, 1)))
+
+
+def needs_rehash(password_hash):
+    """True when the hash was made with another method or a shorter salt than configured."""
+    method, _, rest = password_hash.partition("$")
+    salt = rest.partition("$")[0]
+    return method != METHOD or len(salt) < SALT_LENGTH
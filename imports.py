@@ -0,0 +1,121 @@
+import csv
+import datetime
+import io
+import os
+from itertools import islice
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from werkzeug.datastructures import MultiDict
+
+from cache import mark_dirty
+from forms import CreateStudentForm
+from hashing import hash_passwords
+from models import db, Student
+
+# Bulk student import from CSV. The file is read CHUNK_SIZE rows at a time, every row goes
+# through the same validation as the add_student form, passwords are hashed in a process pool
+# and each chunk is written with one INSERT ... ON CONFLICT (email) DO UPDATE.
+
+CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", 500))
+COLUMNS = ['name', 'grade', 'email', 'password', 'address', 'cellphone', 'tel_number', 'card_number']
+NOT_UTF8 = "the file is not UTF-8 text, rows from here on were not imported"
+
+
+def validate_row(row):
+    """(values for the students table, None) or (None, error message) for one CSV row."""
+    form = CreateStudentForm(formdata=MultiDict({key: (value or "").strip() for key, value in row.items() if key}),
+                             meta={'csrf': False})
+    if not form.validate():
+        return None, "; ".join(f"{field}: {', '.join(messages)}" for field, messages in form.errors.items())
+    try:
+        cellphone, tel_number = int(form.cellphone.data), int(form.tel_number.data)
+    except ValueError:
+        return None, "cellphone and tel_number must be numbers"
+    return {
+        'name': form.name.data,
+        'grade': int(form.grade.data),
+        'email': form.email.data,
+        'password': form.password.data,
+        'address': form.address.data,
+        'cellphone': cellphone,
+        'tel_number': tel_number,
+        'card_number': form.card_number.data or None,
+    }, None
+
+
+def upsert_statement(rows):
+    dialect = postgresql if db.engine.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(Student).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[Student.email],
+        # onupdate isn't applied to ON CONFLICT DO UPDATE, stamp updated_at by hand
+        set_=dict({column: stmt.excluded[column] for column in COLUMNS if column != 'email'},
+                  updated_at=datetime.datetime.utcnow())
+    ).returning(Student.id)
+
+
+def import_chunk(numbered_rows):
+    """Validate, hash and upsert one chunk. Returns (number of students written, [(line, error)])."""
+    errors, valid, card_lines = [], {}, {}
+    for line, row in numbered_rows:
+        values, error = validate_row(row)
+        card_number = values and values['card_number']
+        if error:
+            errors.append((line, error))
+        elif values['email'] in valid:
+            errors.append((line, f"{values['email']} is already on line {valid[values['email']][0]}"))
+        elif card_number in card_lines:
+            errors.append((line, f"card number {card_number} is already on line {card_lines[card_number]}"))
+        else:
+            valid[values['email']] = (line, values)
+            if card_number:
+                card_lines[card_number] = line
+
+    # a card number can only move with its own email, the upsert is keyed on email
+    cards = {values['card_number']: email for email, (line, values) in valid.items() if values['card_number']}
+    if cards:
+        taken = db.session.execute(
+            select(Student.card_number, Student.email).where(Student.card_number.in_(cards))
+        ).all()
+        for card_number, email in taken:
+            if cards[card_number] != email:
+                line, values = valid.pop(cards[card_number])
+                errors.append((line, f"card number {card_number} belongs to {email}"))
+    if not valid:
+        return 0, errors
+
+    rows = [values for line, values in valid.values()]
+    for values, hashed in zip(rows, hash_passwords([values['password'] for values in rows])):
+        values['password'] = hashed
+    student_ids = db.session.execute(upsert_statement(rows)).scalars().all()
+    mark_dirty(db.session, *[("students", student_id) for student_id in student_ids])
+    db.session.commit()
+    return len(student_ids), errors
+
+
+def import_students(file, chunk_size=CHUNK_SIZE):
+    """Import a CSV of students chunk by chunk. Returns (number of students written, [(line, error)])."""
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig"))
+    try:
+        fieldnames = reader.fieldnames or []
+    except UnicodeDecodeError:
+        return 0, [(1, NOT_UTF8)]
+    missing = [column for column in COLUMNS if column not in fieldnames and column not in ('address', 'card_number')]
+    if missing:
+        return 0, [(1, f"missing column(s): {', '.join(missing)}")]
+
+    written, errors, next_line = 0, [], 2
+    numbered = enumerate(reader, start=2)
+    while True:
+        try:
+            chunk = list(islice(numbered, chunk_size))
+        except UnicodeDecodeError:
+            # the chunks before this one are already committed
+            return written, errors + [(next_line, NOT_UTF8)]
+        if not chunk:
+            return written, errors
+        chunk_written, chunk_errors = import_chunk(chunk)
+        written += chunk_written
+        errors += chunk_errors
+        next_line = chunk[-1][0] + 1
@@ -0,0 +1,188 @@
+import cProfile
+import heapq
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+
+from flask import g, has_request_context, request
+from jinja2 import Template
+from sqlalchemy import event
+
+import LineNotify
+import metrics
+
+# Opt-in per-request instrumentation, switched on with INSTRUMENT=1. Every request logs one JSON
+# line to the "request_stats" logger with its wall time, number of SQL statements and time in the
+# database, time rendering templates and time waiting on LINE. Requests slower than
+# SLOW_REQUEST_MS are logged as warnings together with their slowest statements, and /metrics
+# gets wall time percentiles per endpoint.
+#
+# PROFILE_ENDPOINTS=tests.all_tests,courses.edit_course profiles PROFILE_SAMPLE_RATE of the requests
+# to those endpoints with cProfile and writes one .prof file per request to PROFILE_DIR. The files
+# load in snakeviz, or turn into a flame graph with flameprof.
+#
+# LINE calls made from Push_messages' thread pool run outside the request and aren't counted.
+
+ENABLED = os.environ.get("INSTRUMENT", "0").lower() in ("1", "true", "yes")
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", 500))
+SLOWEST_STATEMENTS = int(os.environ.get("SLOWEST_STATEMENTS", 5))
+PERCENTILE_WINDOW = int(os.environ.get("PERCENTILE_WINDOW", 1000))
+PROFILE_ENDPOINTS = {name for name in os.environ.get("PROFILE_ENDPOINTS", "").split(",") if name}
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.1))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+logger = logging.getLogger("request_stats")
+
+
+class RequestStats:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        # (seconds, n, statement) of the slowest statements, smallest first
+        self.slowest = []
+        self.template_seconds = 0.0
+        self.http_count = 0
+        self.http_seconds = 0.0
+
+    def add_statement(self, seconds, statement):
+        self.sql_count += 1
+        self.sql_seconds += seconds
+        item = (seconds, self.sql_count, statement)
+        if len(self.slowest) < SLOWEST_STATEMENTS:
+            heapq.heappush(self.slowest, item)
+        else:
+            heapq.heappushpop(self.slowest, item)
+
+
+def current_stats():
+    return g.get('request_stats') if has_request_context() else None
+
+
+class TimedTemplate(Template):
+    """Template whose render() time is added to the current request's stats."""
+
+    def render(self, *args, **kwargs):
+        stats = current_stats()
+        if stats is None:
+            return super().render(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            stats.template_seconds += time.perf_counter() - start
+
+
+class EndpointTimes:
+    """Wall times of the last PERCENTILE_WINDOW requests per endpoint."""
+
+    def __init__(self):
+        self.times = defaultdict(lambda: deque(maxlen=PERCENTILE_WINDOW))
+        self.lock = threading.Lock()
+
+    def add(self, endpoint, seconds):
+        with self.lock:
+            self.times[endpoint].append(seconds)
+
+    def lines(self):
+        with self.lock:
+            snapshot = {endpoint: sorted(times) for endpoint, times in self.times.items()}
+        yield "# HELP request_seconds Wall time of recent requests per endpoint"
+        yield "# TYPE request_seconds summary"
+        for endpoint, times in sorted(snapshot.items()):
+            for quantile in QUANTILES:
+                value = times[min(int(quantile * len(times)), len(times) - 1)]
+                yield f'request_seconds{{endpoint="{endpoint}",quantile="{quantile}"}} {value}'
+            yield f'request_seconds_count{{endpoint="{endpoint}"}} {len(times)}'
+
+
+endpoint_times = EndpointTimes()
+
+
+def instrument_sql(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_statement(conn, cursor, statement, parameters, context, executemany):
+        if current_stats() is not None:
+            conn.info.setdefault('request_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def end_statement(conn, cursor, statement, parameters, context, executemany):
+        stats = current_stats()
+        if stats is not None and conn.info.get('request_query_start'):
+            stats.add_statement(time.perf_counter() - conn.info['request_query_start'].pop(), statement)
+
+    @event.listens_for(engine, "handle_error")
+    def failed_statement(context):
+        if context.connection is not None and context.connection.info.get('request_query_start'):
+            context.connection.info['request_query_start'].pop()
+
+
+def time_line_response(response, *args, **kwargs):
+    stats = current_stats()
+    if stats is not None:
+        stats.http_count += 1
+        stats.http_seconds += response.elapsed.total_seconds()
+
+
+def start_request():
+    g.request_stats = RequestStats()
+    if request.endpoint in PROFILE_ENDPOINTS and random.random() < PROFILE_SAMPLE_RATE:
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+def finish_request(response):
+    stats = current_stats()
+    if stats is None:
+        return response
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(os.path.join(PROFILE_DIR, f"{request.endpoint}-{time.time():.6f}-{os.getpid()}.prof"))
+
+    wall = time.perf_counter() - stats.start
+    endpoint = request.endpoint or "none"
+    endpoint_times.add(endpoint, wall)
+    record = {
+        'endpoint': endpoint,
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'wall_ms': round(wall * 1000, 2),
+        'sql_count': stats.sql_count,
+        'sql_ms': round(stats.sql_seconds * 1000, 2),
+        'template_ms': round(stats.template_seconds * 1000, 2),
+        'http_count': stats.http_count,
+        'http_ms': round(stats.http_seconds * 1000, 2),
+    }
+    if wall * 1000 >= SLOW_REQUEST_MS:
+        record['slowest_sql'] = [{'ms': round(seconds * 1000, 2), 'statement': " ".join(statement.split())[:500]}
+                                 for seconds, n, statement in sorted(stats.slowest, reverse=True)]
+        logger.warning(json.dumps(record))
+    else:
+        logger.info(json.dumps(record))
+    return response
+
+
+def init_instrumentation(app, engines):
+    """Wire the hooks into `app`, does nothing unless INSTRUMENT=1."""
+    if not ENABLED:
+        return
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    app.jinja_env.template_class = TimedTemplate
+    for engine in engines:
+        instrument_sql(engine)
+    LineNotify.session.hooks['response'].append(time_line_response)
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    metrics.collector(endpoint_times.lines)
@@ -0,0 +1,131 @@
+import bisect
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+# Database metrics for /metrics, in the Prometheus text format. Everything is counted per process,
+# so with several gunicorn workers each scrape sees the worker that answered it.
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    def __init__(self, name, description, buckets=BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+
+    def lines(self):
+        with self.lock:
+            counts, total = list(self.counts), self.sum
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} histogram"
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), counts):
+            cumulative += count
+            yield f'{self.name}_bucket{{le="{bound}"}} {cumulative}'
+        yield f"{self.name}_sum {total}"
+        yield f"{self.name}_count {cumulative}"
+
+
+class Counter:
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def lines(self):
+        yield f"# HELP {self.name} {self.description}"
+        yield f"# TYPE {self.name} counter"
+        yield f"{self.name} {self.value}"
+
+
+QUERY_SECONDS = Histogram("db_query_seconds", "Time spent executing SQL statements")
+QUERY_ERRORS = Counter("db_query_errors_total", "SQL statements that raised")
+POOL_WAIT_SECONDS = Histogram("db_pool_wait_seconds", "Time spent waiting for a pooled connection")
+POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "Checkouts that gave up after pool_timeout")
+
+_engines = []
+_collectors = []
+
+
+def collector(function):
+    """Register function() -> lines of text to be appended to /metrics."""
+    _collectors.append(function)
+    return function
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited (or connected) for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+
+def instrument_engine(engine):
+    """Time every statement run on `engine` and report its pool on /metrics."""
+    _engines.append(engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_query(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def end_query(conn, cursor, statement, parameters, context, executemany):
+        QUERY_SECONDS.observe(time.perf_counter() - conn.info['query_start'].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def failed_query(context):
+        QUERY_ERRORS.inc()
+        if context.connection is not None and context.connection.info.get('query_start'):
+            context.connection.info['query_start'].pop()
+
+
+def pool_lines():
+    gauges = [
+        ("db_pool_size", "Connections the pool keeps open", "size"),
+        ("db_pool_checked_out", "Connections in use right now", "checkedout"),
+        ("db_pool_checked_in", "Idle connections in the pool", "checkedin"),
+        ("db_pool_overflow", "Connections open beyond pool_size (negative while the pool fills up)", "overflow"),
+    ]
+    for name, description, method in gauges:
+        yield f"# HELP {name} {description}"
+        yield f"# TYPE {name} gauge"
+        for engine in _engines:
+            # NullPool / StaticPool (in-memory SQLite) don't count their connections
+            if hasattr(engine.pool, method):
+                yield f'{name}{{database="{engine.url.database}"}} {getattr(engine.pool, method)()}'
+
+
+def render():
+    lines = [f"# pid {os.getpid()}"]
+    lines += pool_lines()
+    for metric in (POOL_WAIT_SECONDS, POOL_TIMEOUTS, QUERY_SECONDS, QUERY_ERRORS):
+        lines += metric.lines()
+    for function in _collectors:
+        lines += function()
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,155 @@
+import datetime
+
+from sqlalchemy import inspect, text
+
+from search import create_search_index
+
+# Schema changes for databases created before the models declared them.
+# db.create_all() only creates missing tables, it never changes existing ones, so every
+# change to an existing table gets a numbered migration here. Run them with
+#   flask --app main db-upgrade
+# Each step checks the schema first, so it is a no-op on a database create_all() just made.
+
+
+def leading_columns(columns, wanted):
+    return list(columns)[:len(wanted)] == list(wanted)
+
+
+def has_index(conn, table, columns, unique=False):
+    """True if an index (or primary key / unique constraint) starts with `columns`."""
+    inspector = inspect(conn)
+    if unique:
+        candidates = [index['column_names'] for index in inspector.get_indexes(table) if index['unique']]
+        candidates += [constraint['column_names'] for constraint in inspector.get_unique_constraints(table)]
+        return any(sorted(candidate) == sorted(columns) for candidate in candidates)
+    candidates = [index['column_names'] for index in inspector.get_indexes(table)]
+    candidates += [constraint['column_names'] for constraint in inspector.get_unique_constraints(table)]
+    candidates.append(inspector.get_pk_constraint(table)['constrained_columns'])
+    return any(leading_columns(candidate, columns) for candidate in candidates)
+
+
+def create_index(conn, name, table, columns, unique=False):
+    if has_index(conn, table, columns, unique=unique):
+        return
+    conn.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({', '.join(columns)})"))
+
+
+def add_primary_key(conn, table, references):
+    """Give an association table a composite primary key over its columns.
+
+    `references` maps each column to the table it points at. Rows with NULLs and duplicate rows
+    can't be part of the key, so they are removed first.
+    """
+    columns = list(references)
+    if inspect(conn).get_pk_constraint(table)['constrained_columns']:
+        return
+    conn.execute(text(f"DELETE FROM {table} WHERE {' OR '.join(f'{column} IS NULL' for column in columns)}"))
+
+    if conn.dialect.name == "sqlite":
+        # SQLite can't add a primary key to a table, copy the rows into a new one instead
+        definitions = [f"{column} INTEGER NOT NULL REFERENCES {target}(id)" for column, target in references.items()]
+        conn.execute(text(f"CREATE TABLE {table}_new ({', '.join(definitions)}, PRIMARY KEY ({', '.join(columns)}))"))
+        conn.execute(text(f"INSERT INTO {table}_new SELECT DISTINCT {', '.join(columns)} FROM {table}"))
+        conn.execute(text(f"DROP TABLE {table}"))
+        conn.execute(text(f"ALTER TABLE {table}_new RENAME TO {table}"))
+        return
+
+    if conn.dialect.name == "postgresql":
+        same_row = " AND ".join(f"a.{column} = b.{column}" for column in columns)
+        conn.execute(text(f"DELETE FROM {table} a USING {table} b WHERE a.ctid < b.ctid AND {same_row}"))
+    conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY ({', '.join(columns)})"))
+
+
+def association_primary_keys(conn):
+    add_primary_key(conn, "student_course_relation", {'student_id': "students", 'course_id': "courses"})
+    add_primary_key(conn, "student_test_relation", {'student_id': "students", 'test_id': "tests"})
+
+
+def foreign_key_indexes(conn):
+    create_index(conn, "ix_student_course_relation_course_id", "student_course_relation", ["course_id"])
+    create_index(conn, "ix_student_test_relation_test_id", "student_test_relation", ["test_id"])
+    create_index(conn, "ix_courses_teacher_id", "courses", ["teacher_id"])
+    create_index(conn, "ix_tests_course_id", "tests", ["course_id"])
+    create_index(conn, "ix_tests_teacher_id", "tests", ["teacher_id"])
+    create_index(conn, "ix_communications_course_id", "communications", ["course_id"])
+    create_index(conn, "ix_communications_teacher_id", "communications", ["teacher_id"])
+    create_index(conn, "ix_scores_test_id", "scores", ["test_id"])
+
+
+def unique_scores(conn):
+    if has_index(conn, "scores", ["student_id", "test_id"], unique=True):
+        return
+    # Keep the latest score when a student has more than one for the same test
+    conn.execute(text(
+        "DELETE FROM scores WHERE id NOT IN (SELECT max(id) FROM scores GROUP BY student_id, test_id)"
+    ))
+    create_index(conn, "uq_scores_student_test", "scores", ["student_id", "test_id"], unique=True)
+
+
+def student_name_index(conn):
+    create_index(conn, "ix_students_name_id", "students", ["name", "id"])
+
+
+def has_column(conn, table, column):
+    return any(existing['name'] == column for existing in inspect(conn).get_columns(table))
+
+
+def updated_at_columns(conn):
+    # SQLite can't add a column with a non-constant default, so add it with a constant one
+    # and stamp the existing rows afterwards
+    for table in ["users", "students", "courses", "communications", "tests", "scores"]:
+        if not has_column(conn, table, "updated_at"):
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN updated_at TIMESTAMP NOT NULL "
+                              f"DEFAULT '1970-01-01 00:00:00'"))
+            conn.execute(text(f"UPDATE {table} SET updated_at = :now"), {'now': datetime.datetime.utcnow()})
+        create_index(conn, f"ix_{table}_updated_at", table, ["updated_at"])
+
+
+def delivery_tokens_from_students(conn):
+    # deliveries used to carry a copy of the student's token, it is read from students when sending now
+    if "notify_deliveries" not in inspect(conn).get_table_names():
+        return
+    if has_column(conn, "notify_deliveries", "token"):
+        conn.execute(text("ALTER TABLE notify_deliveries DROP COLUMN token"))
+    if not has_column(conn, "notify_deliveries", "claimed_at"):
+        conn.execute(text("ALTER TABLE notify_deliveries ADD COLUMN claimed_at TIMESTAMP"))
+
+
+MIGRATIONS = [
+    (1, "composite primary keys on the association tables", association_primary_keys),
+    (2, "indexes on foreign keys", foreign_key_indexes),
+    (3, "one score per student per test", unique_scores),
+    (4, "students sorted by name", student_name_index),
+    (5, "updated_at on the tables the API serves", updated_at_columns),
+    (6, "full-text search index", create_search_index),
+    (7, "notify deliveries read the token from the student", delivery_tokens_from_students),
+]
+
+
+def current_version(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_version "
+            "(version INTEGER PRIMARY KEY, description VARCHAR NOT NULL, applied_at TIMESTAMP NOT NULL)"
+        ))
+        return conn.execute(text("SELECT max(version) FROM schema_version")).scalar() or 0
+
+
+def upgrade(engine):
+    """Apply every migration newer than the database, each in its own transaction.
+
+    Returns the (version, description) of the migrations that ran.
+    """
+    version = current_version(engine)
+    applied = []
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {'v': number, 'd': description, 't': datetime.datetime.utcnow()}
+            )
+        applied.append((number, description))
+    return applied
@@ -0,0 +1,167 @@
+import datetime
+
+from flask_login import UserMixin
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import relationship
+
+from routing import RoutingSession
+
+# reads of @replica_reads views go to the replica when DB_REPLICA_URI is set, see routing.py
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def updated_at_column():
+    # bumped on every UPDATE, the API builds its ETag / Last-Modified from it
+    return db.Column(db.DateTime, nullable=False, index=True,
+                     default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+# CONFIGURE TABLES
+student_course_relation = db.Table(
+    "student_course_relation",
+    db.Column("student_id", db.ForeignKey("students.id"), primary_key=True),
+    db.Column("course_id", db.ForeignKey("courses.id"), primary_key=True),
+    # the primary key covers student -> courses, this one course -> students
+    db.Index("ix_student_course_relation_course_id", "course_id")
+)
+
+student_test_relation = db.Table(
+    "student_test_relation",
+    db.Column("student_id", db.ForeignKey("students.id"), primary_key=True),
+    db.Column("test_id", db.ForeignKey("tests.id"), primary_key=True),
+    db.Index("ix_student_test_relation_test_id", "test_id")
+)
+
+
+# Teachers
+class User(db.Model, UserMixin):
+    __tablename__ = "users"
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False)
+    email = db.Column(db.String, nullable=False, unique=True)
+    password = db.Column(db.String, nullable=False)
+    cellphone = db.Column(db.Integer, nullable=False)
+    line_notify_access_token = db.Column(db.String)
+    updated_at = updated_at_column()
+    # Parent
+    courses = relationship("Course", back_populates="teacher")
+    communications = relationship("Communication", back_populates="teacher")
+    tests = relationship("Test", back_populates="teacher")
+
+    def get_id(self):
+        return f"user:{self.id}"
+
+
+class Student(db.Model, UserMixin):
+    __tablename__ = "students"
+    # all_students is sorted by name with id as tie-breaker
+    __table_args__ = (db.Index("ix_students_name_id", "name", "id"),)
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, nullable=False)
+    grade = db.Column(db.Integer, nullable=False)
+    email = db.Column(db.String, nullable=False, unique=True)
+    password = db.Column(db.String, nullable=False)
+    address = db.Column(db.String)
+    cellphone = db.Column(db.Integer)
+    tel_number = db.Column(db.Integer)
+    card_number = db.Column(db.String, unique=True)
+    line_notify_access_token = db.Column(db.String)
+    note = db.Column(db.String)
+    updated_at = updated_at_column()
+    # Parent
+    scores = relationship("Score", back_populates="student", cascade="all, delete")
+    # Many-to-many relationship
+    courses = relationship("Course", secondary=student_course_relation, back_populates="students")
+    tests = relationship("Test", secondary=student_test_relation, back_populates="students")
+
+    def get_id(self):
+        return f"student:{self.id}"
+
+
+class Course(db.Model):
+    __tablename__ = "courses"
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String)
+    updated_at = updated_at_column()
+    # Parent
+    communications = relationship("Communication", back_populates="course", cascade="all, delete")
+    tests = relationship("Test", back_populates="course", cascade="all, delete")
+    # Child
+    teacher = relationship("User", back_populates="courses")
+    teacher_id = db.Column(db.Integer, db.ForeignKey("users.id"), index=True)
+    # Many-to-many relationship
+    students = relationship("Student", secondary=student_course_relation, back_populates="courses")
+
+
+class Communication(db.Model):
+    __tablename__ = "communications"
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String, nullable=False)
+    body = db.Column(db.String, nullable=False)
+    updated_at = updated_at_column()
+    # Child
+    teacher = relationship("User", back_populates="communications")
+    teacher_id = db.Column(db.Integer, db.ForeignKey("users.id"), index=True)
+    course = relationship("Course", back_populates="communications")
+    course_id = db.Column(db.Integer, db.ForeignKey("courses.id"), index=True)
+
+
+class Test(db.Model):
+    __tablename__ = "tests"
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String, nullable=False)
+    updated_at = updated_at_column()
+    # Parent
+    scores = relationship("Score", back_populates="test", cascade="all, delete")
+    # Child
+    teacher = relationship("User", back_populates="tests")
+    teacher_id = db.Column(db.Integer, db.ForeignKey("users.id"), index=True)
+    course = relationship("Course", back_populates="tests")
+    course_id = db.Column(db.Integer, db.ForeignKey("courses.id"), index=True)
+    # Many-to-many
+    students = relationship("Student", secondary=student_test_relation, back_populates="tests")
+
+
+class Score(db.Model):
+    __tablename__ = "scores"
+    # One score per student per test, also the key edit_score updates by.
+    # It covers lookups by student, test_id has its own index
+    __table_args__ = (db.UniqueConstraint("student_id", "test_id", name="uq_scores_student_test"),)
+    id = db.Column(db.Integer, primary_key=True)
+    score = db.Column(db.Integer, nullable=False)
+    updated_at = updated_at_column()
+    # Child
+    student = relationship("Student", back_populates="scores")
+    student_id = db.Column(db.Integer, db.ForeignKey("students.id"))
+    test = relationship("Test", back_populates="scores")
+    test_id = db.Column(db.Integer, db.ForeignKey("tests.id"), index=True)
+
+
+# LINE Notify jobs, filled by the web routes and drained by worker.py
+class NotifyJob(db.Model):
+    __tablename__ = "notify_jobs"
+    id = db.Column(db.Integer, primary_key=True)
+    # "comm" or "test_result", ref_id is the id of the Communication / Test
+    kind = db.Column(db.String, nullable=False)
+    ref_id = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String, nullable=False)
+    # queued -> running -> done
+    status = db.Column(db.String, nullable=False, default="queued", index=True)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    finished_at = db.Column(db.DateTime)
+    # Parent
+    deliveries = relationship("NotifyDelivery", back_populates="job", cascade="all, delete")
+
+
+class NotifyDelivery(db.Model):
+    __tablename__ = "notify_deliveries"
+    id = db.Column(db.Integer, primary_key=True)
+    message = db.Column(db.String, nullable=False)
+    # pending -> sending -> sent / failed, the student's token is read when the delivery is claimed
+    status = db.Column(db.String, nullable=False, default="pending", index=True)
+    status_code = db.Column(db.Integer)
+    claimed_at = db.Column(db.DateTime)
+    sent_at = db.Column(db.DateTime)
+    # Child
+    job = relationship("NotifyJob", back_populates="deliveries")
+    job_id = db.Column(db.Integer, db.ForeignKey("notify_jobs.id"), nullable=False, index=True)
+    student_id = db.Column(db.Integer, db.ForeignKey("students.id", ondelete="SET NULL"))
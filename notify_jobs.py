@@ -0,0 +1,171 @@
+import datetime
+import os
+
+from sqlalchemy import func, insert, select, update, bindparam
+
+from LineNotify import Push_messages
+from models import db, NotifyJob, NotifyDelivery, Student, Score, Course, Test, Communication, \
+    student_course_relation
+
+# How many deliveries the worker sends per round
+BATCH_SIZE = int(os.environ.get("NOTIFY_BATCH_SIZE", 200))
+# A delivery still "sending" after this many seconds belonged to a worker that died mid-send
+SEND_TIMEOUT = int(os.environ.get("NOTIFY_SEND_TIMEOUT", 600))
+
+
+def enqueue_comm(comm):
+    job = NotifyJob(kind="comm", ref_id=comm.id, title=comm.title)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def enqueue_test_result(test):
+    job = NotifyJob(kind="test_result", ref_id=test.id, title=test.title)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def comm_deliveries(comm_id):
+    comm = db.session.get(Communication, comm_id)
+    if comm is None:
+        return []
+    subject = comm.course.subject if comm.course else ""
+    message = f"\n📖 {comm.title}\nCourse: {subject}\n{comm.body}"
+    student_ids = db.session.execute(
+        select(Student.id)
+        .join(student_course_relation, student_course_relation.c.student_id == Student.id)
+        .where(student_course_relation.c.course_id == comm.course_id,
+               Student.line_notify_access_token.is_not(None))
+    ).scalars()
+    return [{'student_id': student_id, 'message': message} for student_id in student_ids]
+
+
+def test_result_deliveries(test_id):
+    rows = db.session.execute(
+        select(Student.id, Student.name, Score.score, Test.title, Course.subject)
+        .join(Score, Score.student_id == Student.id)
+        .join(Test, Test.id == Score.test_id)
+        .outerjoin(Course, Course.id == Test.course_id)
+        .where(Score.test_id == test_id, Student.line_notify_access_token.is_not(None))
+    )
+    return [{
+        'student_id': student_id,
+        'message': f"\n<成績通知>\nName：{name}\nCourse：{course}\n考試名稱：{title}\n分數：{score}"
+    } for student_id, name, score, title, course in rows]
+
+
+def expand_jobs():
+    """Turn queued jobs into one pending delivery per student who linked LINE Notify."""
+    jobs = db.session.execute(
+        select(NotifyJob).where(NotifyJob.status == "queued").order_by(NotifyJob.id).with_for_update(skip_locked=True)
+    ).scalars().all()
+    for job in jobs:
+        if job.kind == "comm":
+            deliveries = comm_deliveries(job.ref_id)
+        else:
+            deliveries = test_result_deliveries(job.ref_id)
+        if deliveries:
+            db.session.execute(insert(NotifyDelivery), [dict(delivery, job_id=job.id) for delivery in deliveries])
+            job.status = "running"
+        else:
+            job.status = "done"
+            job.finished_at = datetime.datetime.utcnow()
+    db.session.commit()
+    return len(jobs)
+
+
+def claim_deliveries(batch_size):
+    """Mark a batch of pending deliveries as sending and commit, returns (id, token, message) of each.
+
+    The token is the student's current one, None when they unlinked LINE Notify or were deleted.
+    """
+    now = datetime.datetime.utcnow()
+    # LINE may have delivered what a dead worker was sending, so it isn't sent again
+    db.session.execute(
+        update(NotifyDelivery)
+        .where(NotifyDelivery.status == "sending",
+               NotifyDelivery.claimed_at < now - datetime.timedelta(seconds=SEND_TIMEOUT))
+        .values(status="failed", sent_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    ids = db.session.execute(
+        select(NotifyDelivery.id)
+        .where(NotifyDelivery.status == "pending")
+        .order_by(NotifyDelivery.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    deliveries = []
+    if ids:
+        db.session.execute(
+            update(NotifyDelivery)
+            .where(NotifyDelivery.id.in_(ids))
+            .values(status="sending", claimed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        deliveries = db.session.execute(
+            select(NotifyDelivery.id, Student.line_notify_access_token.label("token"), NotifyDelivery.message)
+            .outerjoin(Student, Student.id == NotifyDelivery.student_id)
+            .where(NotifyDelivery.id.in_(ids))
+            .order_by(NotifyDelivery.id)
+        ).all()
+    db.session.commit()
+    return deliveries
+
+
+def send_deliveries(batch_size=BATCH_SIZE):
+    """Send one batch of pending deliveries and record the status code of each one.
+
+    The batch is claimed in one transaction and the results written in another, no transaction
+    or connection is held while the messages are on their way to LINE.
+    """
+    deliveries = claim_deliveries(batch_size)
+    if not deliveries:
+        return 0
+
+    linked = [delivery for delivery in deliveries if delivery.token]
+    codes = dict(zip([delivery.id for delivery in linked],
+                     Push_messages([(delivery.token, delivery.message) for delivery in linked])))
+    now = datetime.datetime.utcnow()
+    db.session.execute(
+        update(NotifyDelivery.__table__)
+        .where(NotifyDelivery.id == bindparam('delivery_id'))
+        .values(status=bindparam('new_status'), status_code=bindparam('code'), sent_at=now),
+        [{'delivery_id': delivery.id, 'new_status': "sent" if codes.get(delivery.id) == 200 else "failed",
+          'code': codes.get(delivery.id)} for delivery in deliveries]
+    )
+    finish_jobs()
+    db.session.commit()
+    return len(deliveries)
+
+
+def finish_jobs():
+    pending = select(NotifyDelivery.id).where(NotifyDelivery.job_id == NotifyJob.id,
+                                              NotifyDelivery.status.in_(["pending", "sending"]))
+    db.session.execute(
+        update(NotifyJob)
+        .where(NotifyJob.status == "running", ~pending.exists())
+        .values(status="done", finished_at=datetime.datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def run_once(batch_size=BATCH_SIZE):
+    """One round of the worker, returns how much work was done (0 when the queue is empty)."""
+    return expand_jobs() + send_deliveries(batch_size)
+
+
+def job_progress(job_id):
+    counts = dict(db.session.execute(
+        select(NotifyDelivery.status, func.count())
+        .where(NotifyDelivery.job_id == job_id)
+        .group_by(NotifyDelivery.status)
+    ).all())
+    return {
+        'pending': counts.get("pending", 0) + counts.get("sending", 0),
+        'sent': counts.get("sent", 0),
+        'failed': counts.get("failed", 0),
+        'total': sum(counts.values())
+    }
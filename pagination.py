@@ -0,0 +1,129 @@
+import base64
+import datetime
+import json
+
+from flask import request
+from sqlalchemy import DateTime, String, func, tuple_
+
+from models import db
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# every query argument paginate() reads
+PAGE_ARGS = ("sort", "dir", "size", "after", "before")
+
+
+def encode_cursor(value, row_id):
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([value, row_id]).encode()).decode()
+
+
+def decode_cursor(cursor, column=None):
+    """(sort value, id) of a cursor, None when it isn't one of ours.
+
+    Datetimes travel as ISO strings, `column` says when to turn the value back into one.
+    """
+    try:
+        value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        # anything else (lists, objects, booleans) would be bound as a query parameter as is
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            return None
+        if column is not None and isinstance(column.type, DateTime):
+            value = datetime.datetime.fromisoformat(value)
+        return value, int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def sort_default(column):
+    # NULLs can't be compared with a row value, so nullable columns sort as ''/0
+    return "" if isinstance(column.type, String) else 0
+
+
+def sort_expression(column):
+    if column.nullable:
+        return func.coalesce(column, sort_default(column))
+    return column
+
+
+class Page:
+    def __init__(self, items, sort, direction, size, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.sort = sort
+        self.direction = direction
+        self.size = size
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def args(self, **kwargs):
+        """Query string arguments for a link to a page of the same list."""
+        args = {'sort': self.sort, 'dir': self.direction, 'size': self.size}
+        args.update(kwargs)
+        return args
+
+    @property
+    def next_args(self):
+        return self.args(after=self.next_cursor)
+
+    @property
+    def prev_args(self):
+        return self.args(before=self.prev_cursor)
+
+    def sort_args(self, sort):
+        # Clicking the current sort column flips the direction, any other column starts ascending
+        direction = "desc" if sort == self.sort and self.direction == "asc" else "asc"
+        return {'sort': sort, 'dir': direction, 'size': self.size}
+
+
+def paginate(stmt, model, sortable, scalars=True, default_sort="id"):
+    """Run one page of `stmt` with keyset pagination.
+
+    `sortable` maps the names allowed in ?sort= to columns of `model`.
+    The page is picked with ?after=<cursor> or ?before=<cursor>, where a cursor holds the
+    sort value and id of the last/first row of the page, and ?size= (capped at MAX_PAGE_SIZE).
+    """
+    sortable = dict(sortable, id=model.id)
+    sort = request.args.get('sort', default_sort)
+    if sort not in sortable:
+        sort = default_sort
+    direction = "desc" if request.args.get('dir') == "desc" else "asc"
+    size = min(max(request.args.get('size', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+
+    column = sortable[sort]
+    key = tuple_(sort_expression(column), model.id)
+    after = decode_cursor(request.args.get('after', ""), column)
+    before = decode_cursor(request.args.get('before', ""), column)
+    # Going back walks the index the other way and the rows get flipped afterwards
+    backwards = before is not None and after is None
+    ascending = (direction == "asc") != backwards
+
+    stmt = stmt.order_by(None)
+    if after is not None:
+        stmt = stmt.where(key > tuple_(*after) if direction == "asc" else key < tuple_(*after))
+    elif before is not None:
+        stmt = stmt.where(key < tuple_(*before) if direction == "asc" else key > tuple_(*before))
+    if ascending:
+        stmt = stmt.order_by(sort_expression(column).asc(), model.id.asc())
+    else:
+        stmt = stmt.order_by(sort_expression(column).desc(), model.id.desc())
+
+    result = db.session.execute(stmt.limit(size + 1))
+    rows = result.scalars().all() if scalars else result.all()
+    has_more = len(rows) > size
+    rows = rows[:size]
+    if backwards:
+        rows.reverse()
+
+    def cursor(row):
+        entity = row if scalars else row[0]
+        value = getattr(entity, column.key)
+        return encode_cursor(sort_default(column) if value is None else value, entity.id)
+
+    page = Page(rows, sort, direction, size)
+    if rows:
+        if has_more or backwards:
+            page.next_cursor = cursor(rows[-1])
+        if (has_more and backwards) or after is not None:
+            page.prev_cursor = cursor(rows[0])
+    return page
@@ -0,0 +1,54 @@
+import os
+
+from flask_login import UserMixin
+from sqlalchemy import select
+
+from cache import TTLCache, on_commit
+from models import db, User
+
+# flask-login calls the user loader on every request. Instead of loading the whole User row
+# (password hash included) each time, the loader returns a Principal with just the fields the
+# views use, cached per user id. edit_user / delete_user drop the entry when they commit.
+
+PRINCIPAL_CACHE_TTL = int(os.environ.get("PRINCIPAL_CACHE_TTL", 60))
+cache = TTLCache(maxsize=int(os.environ.get("PRINCIPAL_CACHE_SIZE", 10000)), ttl=PRINCIPAL_CACHE_TTL)
+
+
+class Principal(UserMixin):
+    """The logged-in teacher as the views see it."""
+
+    def __init__(self, id, name, email):
+        self.id = id
+        self.name = name
+        self.email = email
+
+    def get_id(self):
+        # the type is part of the id so a student can never be mistaken for the teacher with the same number
+        return f"user:{self.id}"
+
+
+def principal_for(user):
+    return Principal(user.id, user.name, user.email)
+
+
+def load_principal(session_id):
+    kind, _, user_id = str(session_id).rpartition(":")
+    # sessions from before the typed ids only hold the number of a teacher
+    if kind not in ("", "user") or not user_id.isdigit():
+        return None
+    user_id = int(user_id)
+    principal = cache.get(("users", user_id))
+    if principal is None:
+        row = db.session.execute(select(User.id, User.name, User.email).where(User.id == user_id)).one_or_none()
+        if row is None:
+            return None
+        principal = Principal(*row)
+        cache.set(("users", user_id), principal)
+    return principal
+
+
+@on_commit
+def invalidate(keys):
+    for table, row_id in keys:
+        if table == "users":
+            cache.pop((table, row_id))
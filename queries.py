@@ -0,0 +1,51 @@
+from sqlalchemy import select, exists
+from sqlalchemy.orm import joinedload, selectinload
+
+from models import User, Student, Course, Communication, Test, Score
+
+# Statements for the list pages. Each one loads everything its template touches up front,
+# so a page runs the same number of queries whatever the number of rows.
+
+
+def student_list():
+    return select(Student).order_by(Student.id)
+
+
+def user_list():
+    # all_users.html shows the subjects of every teacher's courses
+    return (
+        select(User)
+        .options(selectinload(User.courses).load_only(Course.subject))
+        .order_by(User.id)
+    )
+
+
+def course_list():
+    # all_courses.html shows the teacher and the name of every student of each course
+    return (
+        select(Course)
+        .options(joinedload(Course.teacher).load_only(User.name),
+                 selectinload(Course.students).load_only(Student.name))
+        .order_by(Course.id)
+    )
+
+
+def test_list():
+    # all_tests.html only needs to know whether a test has scores, not the scores themselves,
+    # so rows are (test, has_scores)
+    has_scores = exists().where(Score.test_id == Test.id).label("has_scores")
+    return (
+        select(Test, has_scores)
+        .options(joinedload(Test.course).load_only(Course.subject),
+                 joinedload(Test.teacher).load_only(User.name))
+        .order_by(Test.id)
+    )
+
+
+def comm_list():
+    return (
+        select(Communication)
+        .options(joinedload(Communication.course).load_only(Course.subject),
+                 joinedload(Communication.teacher).load_only(User.name))
+        .order_by(Communication.id)
+    )
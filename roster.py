@@ -0,0 +1,36 @@
+from sqlalchemy import delete, insert, select
+
+from cache import mark_dirty
+from models import db, Student, student_course_relation
+
+
+def roster_ids(course_id):
+    return set(db.session.execute(
+        select(student_course_relation.c.student_id).where(student_course_relation.c.course_id == course_id)
+    ).scalars())
+
+
+def sync_roster(course_id, student_ids):
+    """Make the students of a course exactly `student_ids`, writing only the difference.
+
+    Ids of students that don't exist are ignored. Returns (added ids, removed ids).
+    """
+    wanted = set(student_ids)
+    if wanted:
+        wanted = set(db.session.execute(select(Student.id).where(Student.id.in_(wanted))).scalars())
+    current = roster_ids(course_id)
+    added, removed = wanted - current, current - wanted
+
+    if removed:
+        db.session.execute(
+            delete(student_course_relation)
+            .where(student_course_relation.c.course_id == course_id,
+                   student_course_relation.c.student_id.in_(removed))
+        )
+    if added:
+        db.session.execute(insert(student_course_relation), [
+            {'student_id': student_id, 'course_id': course_id} for student_id in added
+        ])
+    if added or removed:
+        mark_dirty(db.session, ("courses", course_id), *[("students", student_id) for student_id in added | removed])
+    return added, removed
@@ -0,0 +1,83 @@
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_request_context, session as cookie
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+# Read/write routing between the primary database and a read replica (DB_REPLICA_URI).
+#
+# Views decorated with @replica_reads send their plain SELECTs to the replica. Everything else
+# goes to the primary: writes, SELECT ... FOR UPDATE, the flush, text() statements, any query
+# outside a request and any query inside a primary_reads() block. Cache fills run in such a
+# block, so a lagging replica can't put stale rows into a cache that lives until the next commit.
+#
+# Read your writes: after a request commits a change, the user's session cookie keeps all their
+# reads on the primary for DB_READ_YOUR_WRITES seconds, long enough for the replica to catch up.
+
+REPLICA_URI = os.environ.get("DB_REPLICA_URI")
+READ_YOUR_WRITES = float(os.environ.get("DB_READ_YOUR_WRITES", 10))
+
+
+def replica_allowed():
+    return (has_request_context() and g.get('replica_reads', False) and not g.get('primary_reads', False)
+            and cookie.get('primary_until', 0) <= time.time())
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends the reads of @replica_reads views to the "replica" bind."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (REPLICA_URI and bind is None and not self._flushing and isinstance(clause, Select)
+                and clause._for_update_arg is None and replica_allowed()):
+            return self._db.engines['replica']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_reads(function):
+    @wraps(function)
+    def wrapper_function(*args, **kwargs):
+        g.replica_reads = True
+        return function(*args, **kwargs)
+
+    return wrapper_function
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside the block, even in a @replica_reads view."""
+    if not has_request_context():
+        yield
+        return
+    previous = g.get('primary_reads', False)
+    g.primary_reads = True
+    try:
+        yield
+    finally:
+        g.primary_reads = previous
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def remember_flush(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def remember_bulk_write(orm_execute_state):
+    # insert()/update()/delete() through session.execute() never flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def pin_to_primary(session):
+    if session.info.pop('wrote', False) and REPLICA_URI and has_request_context():
+        cookie['primary_until'] = time.time() + READ_YOUR_WRITES
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def forget_write(session):
+    session.info.pop('wrote', None)
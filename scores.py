@@ -0,0 +1,153 @@
+import csv
+import io
+
+from sqlalchemy import insert, select, update, bindparam
+
+from cache import mark_dirty
+from forms import MIN_SCORE, MAX_SCORE
+from models import db, Student, Score, student_course_relation, student_test_relation
+
+# Columns a score sheet can use to say which student a row belongs to
+CSV_KEYS = ['student_id', 'email', 'card_number']
+
+
+def course_roster(course_id):
+    """(id, name) of every student in a course, in the order the score form lists them."""
+    return db.session.execute(
+        select(Student.id, Student.name)
+        .join(student_course_relation, student_course_relation.c.student_id == Student.id)
+        .where(student_course_relation.c.course_id == course_id)
+        .order_by(Student.id)
+    ).all()
+
+
+def insert_scores(test_id, scores):
+    """Write {student_id: score} for a test in one executemany, skipping students who already have a score.
+
+    Returns how many scores were inserted.
+    """
+    scores = {student_id: score for student_id, score in scores.items() if score is not None}
+    if not scores:
+        return 0
+    existing = db.session.execute(
+        select(Score.student_id).where(Score.test_id == test_id, Score.student_id.in_(scores))
+    ).scalars().all()
+    for student_id in existing:
+        del scores[student_id]
+    if not scores:
+        return 0
+    db.session.execute(insert(Score), [
+        {'score': score, 'student_id': student_id, 'test_id': test_id} for student_id, score in scores.items()
+    ])
+    db.session.execute(insert(student_test_relation), [
+        {'student_id': student_id, 'test_id': test_id} for student_id in scores
+    ])
+    mark_dirty(db.session, ("tests", test_id), *[("students", student_id) for student_id in scores])
+    return len(scores)
+
+
+def test_scores(test_id):
+    """(student_id, name, score) of every score of a test, ordered by student."""
+    return db.session.execute(
+        select(Score.student_id, Student.name, Score.score)
+        .join(Student, Student.id == Score.student_id)
+        .where(Score.test_id == test_id)
+        .order_by(Score.student_id)
+    ).all()
+
+
+def update_scores(test_id, scores):
+    """Write the scores in {student_id: score} that differ from the stored ones.
+
+    Every changed score goes in one executemany UPDATE keyed on (student_id, test_id).
+    Students without a score for the test and empty scores are ignored. Returns how many scores changed.
+    """
+    scores = {student_id: score for student_id, score in scores.items() if score is not None}
+    if not scores:
+        return 0
+    current = dict(db.session.execute(
+        select(Score.student_id, Score.score).where(Score.test_id == test_id, Score.student_id.in_(scores))
+    ).all())
+    changed = [{'b_student_id': student_id, 'b_score': scores[student_id]}
+               for student_id, score in current.items() if scores[student_id] != score]
+    if not changed:
+        return 0
+    db.session.execute(
+        update(Score.__table__)
+        .where(Score.student_id == bindparam('b_student_id'), Score.test_id == test_id)
+        .values(score=bindparam('b_score')),
+        changed
+    )
+    mark_dirty(db.session, ("tests", test_id), *[("students", row['b_student_id']) for row in changed])
+    return len(changed)
+
+
+def read_score_entries(entries, roster):
+    """{student_id: score} from the validated rows of a CreateScoreForm, plus [error messages].
+
+    `roster` maps the students the form is for to their names, the errors are named after them.
+    student_id comes from a hidden field, so an id that isn't one of them is an error too.
+    """
+    scores, errors = {}, []
+    for entry in entries:
+        value = (entry.student_id.data or "").strip()
+        if not value:
+            continue
+        student_id = int(value) if value.isdigit() else None
+        if student_id not in roster:
+            errors.append(f"{value} is not a student of this course")
+            continue
+        entry_errors = [error for field_errors in entry.errors.values() for error in field_errors]
+        errors += [f"{roster[student_id]}: {error}" for error in entry_errors]
+        if not entry_errors:
+            scores[student_id] = entry.score.data
+    return scores, errors
+
+
+def read_score_csv(file, course_id):
+    """Parse an uploaded score sheet for a course.
+
+    The sheet needs a `score` column and one of student_id / email / card_number.
+    Returns ({student_id: score}, [error messages]).
+    """
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig"))
+    try:
+        fields = reader.fieldnames or []
+        key = next((key for key in CSV_KEYS if key in fields), None)
+        if key is None or 'score' not in fields:
+            return {}, [f"The file needs a score column and one of {', '.join(CSV_KEYS)}"]
+        rows = list(reader)
+    except UnicodeDecodeError:
+        return {}, ["The file is not UTF-8 text, save it as CSV UTF-8"]
+
+    def normalize(value):
+        # ids compare as numbers, 007 in the sheet is student 7
+        value = value.strip()
+        if key == 'student_id':
+            return int(value) if value.isdigit() else None
+        return value
+
+    column = getattr(Student, 'id' if key == 'student_id' else key)
+    values = {normalize(row[key] or "") for row in rows} - {None}
+    # One query resolves every row to a student of the course
+    lookup = dict(db.session.execute(
+        select(column, Student.id)
+        .join(student_course_relation, student_course_relation.c.student_id == Student.id)
+        .where(student_course_relation.c.course_id == course_id, column.in_(values))
+    ).all())
+
+    scores, errors = {}, []
+    for line, row in enumerate(rows, start=2):
+        student_id = lookup.get(normalize(row[key] or ""))
+        if student_id is None:
+            errors.append(f"Line {line}: {row[key]} is not a student of this course")
+            continue
+        try:
+            score = int(row['score'])
+        except (TypeError, ValueError):
+            score = None
+        if score is None or not MIN_SCORE <= score <= MAX_SCORE:
+            errors.append(f"Line {line}: {row['score']} is not a score from {MIN_SCORE} to {MAX_SCORE}")
+            continue
+        scores[student_id] = score
+    return scores, errors
@@ -0,0 +1,189 @@
+import os
+import re
+
+from sqlalchemy import event, func, literal, literal_column, select, text, union_all
+from sqlalchemy.dialects import postgresql
+
+from models import db, Student, Course, Communication
+
+# Full-text search over students (name, email, card number), courses (subject) and
+# communications (title, body).
+#
+# Postgres: a GIN index on a weighted tsvector expression of each table. The database keeps an
+# expression index current itself, and the search query repeats the same expression so the
+# planner uses it.
+# SQLite: one FTS5 table, search_index, kept current by triggers on the three tables, so bulk
+# INSERT/UPDATEs that bypass the ORM are indexed too. The rowid is id * 4 + kind code.
+#
+# The title of a row (name, subject, title) weighs more than the rest. Every word of the query
+# has to match as a prefix, so results show up while the user is still typing.
+
+PAGE_SIZE = int(os.environ.get("SEARCH_PAGE_SIZE", 20))
+TS_CONFIG = literal_column("'simple'")
+
+
+class Source:
+    def __init__(self, code, kind, model, title, body, endpoint, argument):
+        self.code = code
+        self.kind = kind
+        self.model = model
+        self.title = title
+        self.body = body
+        # where a result links to: url_for(endpoint, **{argument: id})
+        self.endpoint = endpoint
+        self.argument = argument
+
+    @property
+    def table(self):
+        return self.model.__tablename__
+
+
+SOURCES = [
+    Source(1, "student", Student, "name", ["email", "card_number"], "students.edit_student", "student_id"),
+    Source(2, "course", Course, "subject", [], "courses.edit_course", "course_id"),
+    Source(3, "comm", Communication, "title", ["body"], "comms.comm", "comm_id"),
+]
+BY_CODE = {source.code: source for source in SOURCES}
+BY_KIND = {source.kind: source for source in SOURCES}
+
+
+def words(query):
+    return re.findall(r"\w+", query.lower())
+
+
+# Postgres
+
+def concatenated(columns):
+    expression = func.coalesce(columns[0], literal_column("''"))
+    for column in columns[1:]:
+        expression = expression.op("||")(literal_column("' '")).op("||")(func.coalesce(column, literal_column("''")))
+    return expression
+
+
+def ts_vector(source, column=None):
+    """The weighted tsvector of a row, `column(name)` picks how columns are referred to."""
+    column = column or (lambda name: getattr(source.model, name))
+    vector = func.setweight(func.to_tsvector(TS_CONFIG, concatenated([column(source.title)])), literal_column("'A'"))
+    if source.body:
+        body = func.setweight(func.to_tsvector(TS_CONFIG, concatenated([column(name) for name in source.body])),
+                              literal_column("'B'"))
+        vector = vector.op("||")(body)
+    return vector
+
+
+def create_pg_indexes(conn):
+    for source in SOURCES:
+        # the same expression the search runs, with bare column names
+        expression = ts_vector(source, literal_column).compile(dialect=postgresql.dialect(),
+                                                              compile_kwargs={'literal_binds': True})
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{source.table}_search ON {source.table} "
+                          f"USING gin (({expression}))"))
+
+
+def pg_search(terms, kinds, limit, offset):
+    query = func.to_tsquery(TS_CONFIG, " & ".join(f"{word}:*" for word in terms))
+    selects = []
+    for source in SOURCES:
+        if source.kind not in kinds:
+            continue
+        vector = ts_vector(source)
+        model = source.model
+        selects.append(
+            select(literal(source.code).label("code"), model.id.label("id"),
+                   getattr(model, source.title).label("title"), func.ts_rank(vector, query).label("rank"))
+            .where(vector.op("@@")(query))
+        )
+    results = union_all(*selects).subquery()
+    return db.session.execute(
+        select(results.c.code, results.c.id, results.c.title)
+        .order_by(results.c.rank.desc(), results.c.code, results.c.id)
+        .limit(limit).offset(offset)
+    ).all()
+
+
+# SQLite
+
+def sqlite_body(source, row):
+    return " || ' ' || ".join(f"coalesce({row}.{name}, '')" for name in source.body) or "''"
+
+
+def create_sqlite_index(conn):
+    exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'search_index'")).first()
+    if not exists:
+        conn.execute(text("CREATE VIRTUAL TABLE search_index USING fts5(title, body, tokenize='unicode61')"))
+    for source in SOURCES:
+        rowid = f"new.id * 4 + {source.code}"
+        values = f"{rowid}, coalesce(new.{source.title}, ''), {sqlite_body(source, 'new')}"
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {source.table}_search_insert AFTER INSERT ON {source.table} BEGIN "
+            f"INSERT INTO search_index (rowid, title, body) VALUES ({values}); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {source.table}_search_update AFTER UPDATE ON {source.table} BEGIN "
+            f"DELETE FROM search_index WHERE rowid = old.id * 4 + {source.code}; "
+            f"INSERT INTO search_index (rowid, title, body) VALUES ({values}); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {source.table}_search_delete AFTER DELETE ON {source.table} BEGIN "
+            f"DELETE FROM search_index WHERE rowid = old.id * 4 + {source.code}; END"
+        ))
+        if not exists:
+            # rows written before the index existed
+            conn.execute(text(
+                f"INSERT INTO search_index (rowid, title, body) SELECT id * 4 + {source.code}, "
+                f"coalesce({source.title}, ''), {sqlite_body(source, source.table)} FROM {source.table}"
+            ))
+
+
+def sqlite_search(terms, kinds, limit, offset):
+    match = " ".join(f'"{word}"*' for word in terms)
+    codes = [source.code for source in SOURCES if source.kind in kinds]
+    rows = db.session.execute(text(
+        f"SELECT rowid, title FROM search_index WHERE search_index MATCH :match "
+        f"AND rowid % 4 IN ({', '.join(str(code) for code in codes)}) "
+        f"ORDER BY bm25(search_index, 2.0, 1.0), rowid LIMIT :limit OFFSET :offset"
+    ), {'match': match, 'limit': limit, 'offset': offset}).all()
+    return [(rowid % 4, rowid // 4, title) for rowid, title in rows]
+
+
+def create_search_index(conn):
+    """Create the index (and on SQLite fill it) if it isn't there yet."""
+    if conn.dialect.name == "postgresql":
+        create_pg_indexes(conn)
+    elif conn.dialect.name == "sqlite":
+        create_sqlite_index(conn)
+
+
+@event.listens_for(db.metadata, "after_create")
+def index_new_tables(target, conn, **kwargs):
+    create_search_index(conn)
+
+
+@event.listens_for(db.metadata, "before_drop")
+def drop_search_index(target, conn, **kwargs):
+    # the SQLite triggers and table go away with drop_all, the Postgres indexes with their tables
+    if conn.dialect.name == "sqlite":
+        conn.execute(text("DROP TABLE IF EXISTS search_index"))
+
+
+def search(query, kinds=None, page=1, size=PAGE_SIZE):
+    """One page of results for `query`, best match first.
+
+    Returns ([{'kind', 'id', 'title', 'endpoint', 'args'}], has_more). `kinds` limits the
+    results to some of "student", "course" and "comm".
+    """
+    terms = words(query)
+    kinds = [kind for kind in (kinds or BY_KIND) if kind in BY_KIND]
+    if not terms or not kinds:
+        return [], False
+    offset = (max(page, 1) - 1) * size
+    if db.engine.dialect.name == "postgresql":
+        rows = pg_search(terms, kinds, size + 1, offset)
+    else:
+        rows = sqlite_search(terms, kinds, size + 1, offset)
+    results = []
+    for code, row_id, title in rows[:size]:
+        source = BY_CODE[code]
+        results.append({'kind': source.kind, 'id': row_id, 'title': title,
+                        'endpoint': source.endpoint, 'args': {source.argument: row_id}})
+    return results, len(rows) > size
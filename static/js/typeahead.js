@@ -0,0 +1,51 @@
+// Search box for the students of a course form. The form only lists the students already
+// picked, this adds more from /api/choices/students as the user types.
+(() => {
+  'use strict'
+
+  const list = document.getElementById('students')
+  const input = document.getElementById('student-search')
+  const results = document.getElementById('student-results')
+  if (!list || !input || !results) {
+    return
+  }
+
+  const addStudent = (student) => {
+    if (list.querySelector(`input[value="${student.id}"]`)) {
+      return
+    }
+    const id = `students-${list.children.length}`
+    const item = document.createElement('li')
+    const checkbox = document.createElement('input')
+    checkbox.type = 'checkbox'
+    checkbox.name = 'students'
+    checkbox.id = id
+    checkbox.value = student.id
+    checkbox.checked = true
+    const label = document.createElement('label')
+    label.htmlFor = id
+    label.textContent = student.name
+    item.append(checkbox, ' ', label)
+    list.append(item)
+  }
+
+  let timer
+  input.addEventListener('input', () => {
+    clearTimeout(timer)
+    timer = setTimeout(async () => {
+      results.replaceChildren()
+      if (!input.value.trim()) {
+        return
+      }
+      const response = await fetch(`${input.dataset.url}?q=${encodeURIComponent(input.value)}`)
+      for (const student of await response.json()) {
+        const button = document.createElement('button')
+        button.type = 'button'
+        button.className = 'list-group-item list-group-item-action'
+        button.textContent = student.name
+        button.addEventListener('click', () => addStudent(student))
+        results.append(button)
+      }
+    }, 200)
+  })
+})()
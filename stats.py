@@ -0,0 +1,126 @@
+import math
+
+from sqlalchemy import func, select
+
+from models import db, Student, Course, Test, Score
+
+# Score statistics. Aggregates, ranks and histograms are computed by the database
+# (GROUP BY and window functions), Python only gets plain rows back.
+
+HISTOGRAM_BUCKET = 10
+PERCENTILES = [10, 25, 50, 75, 90]
+
+
+def percentile(sorted_values, p):
+    """Linear interpolation between the closest ranks, the same as numpy.percentile's default."""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * p / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def stddev(mean, mean_of_squares):
+    # population standard deviation from avg(x) and avg(x * x), which every database has
+    if mean is None:
+        return None
+    return math.sqrt(max(float(mean_of_squares) - float(mean) ** 2, 0))
+
+
+def aggregate_columns():
+    return (
+        func.count(Score.id).label("count"),
+        func.avg(Score.score).label("mean"),
+        func.min(Score.score).label("min"),
+        func.max(Score.score).label("max"),
+        func.avg(Score.score * Score.score).label("mean_of_squares"),
+    )
+
+
+def summary(row):
+    return {
+        'count': row.count,
+        'mean': float(row.mean) if row.mean is not None else None,
+        'min': row.min,
+        'max': row.max,
+        'stddev': stddev(row.mean, row.mean_of_squares),
+    }
+
+
+def test_stats(test_id, bucket=HISTOGRAM_BUCKET):
+    """Summary, percentiles, histogram and the ranked scores of one test."""
+    row = db.session.execute(select(*aggregate_columns()).where(Score.test_id == test_id)).one()
+    result = summary(row)
+
+    ranking = db.session.execute(
+        select(Score.student_id, Student.name, Score.score,
+               func.rank().over(order_by=Score.score.desc()).label("rank"))
+        .join(Student, Student.id == Score.student_id)
+        .where(Score.test_id == test_id)
+        .order_by(Score.score.desc(), Score.student_id)
+    ).all()
+    ascending = [score for student_id, name, score, rank in reversed(ranking)]
+    result['median'] = percentile(ascending, 50)
+    result['percentiles'] = {str(p): percentile(ascending, p) for p in PERCENTILES}
+
+    bucket_start = (Score.score // bucket) * bucket
+    result['histogram'] = [
+        {'from': start, 'to': start + bucket - 1, 'count': count}
+        for start, count in db.session.execute(
+            select(bucket_start, func.count())
+            .where(Score.test_id == test_id)
+            .group_by(bucket_start)
+            .order_by(bucket_start)
+        )
+    ]
+    result['ranking'] = [
+        {'student_id': student_id, 'name': name, 'score': score, 'rank': rank}
+        for student_id, name, score, rank in ranking
+    ]
+    return result
+
+
+def course_trends(course_id):
+    """Summary of every test of a course, in the order the tests were created."""
+    rows = db.session.execute(
+        select(Test.id, Test.title, *aggregate_columns())
+        .outerjoin(Score, Score.test_id == Test.id)
+        .where(Test.course_id == course_id)
+        .group_by(Test.id, Test.title)
+        .order_by(Test.id)
+    ).all()
+    return [dict(summary(row), test_id=row.id, title=row.title) for row in rows]
+
+
+def student_trajectory(student_id):
+    """Every score of a student grouped by course, with the student's rank and the class average of each test."""
+    tests_taken = select(Score.test_id).where(Score.student_id == student_id)
+    per_test = (
+        select(Score.student_id, Score.test_id, Score.score,
+               func.rank().over(partition_by=Score.test_id, order_by=Score.score.desc()).label("rank"),
+               func.avg(Score.score).over(partition_by=Score.test_id).label("test_mean"),
+               func.count(Score.id).over(partition_by=Score.test_id).label("test_count"))
+        .where(Score.test_id.in_(tests_taken))
+        .subquery()
+    )
+    rows = db.session.execute(
+        select(per_test, Test.title, Course.id.label("course_id"), Course.subject)
+        .join(Test, Test.id == per_test.c.test_id)
+        .outerjoin(Course, Course.id == Test.course_id)
+        .where(per_test.c.student_id == student_id)
+        .order_by(Course.id, Test.id)
+    ).all()
+
+    courses = {}
+    for row in rows:
+        course = courses.setdefault(row.course_id, {'course_id': row.course_id, 'subject': row.subject, 'tests': []})
+        course['tests'].append({
+            'test_id': row.test_id,
+            'title': row.title,
+            'score': row.score,
+            'rank': row.rank,
+            'of': row.test_count,
+            'test_mean': float(row.test_mean),
+        })
+    return list(courses.values())
@@ -0,0 +1,79 @@
+import os
+
+from sqlalchemy import func, select
+
+from cache import TTLCache, on_commit
+from fragments import current_generation
+from routing import primary_reads
+from models import db, Score, student_course_relation
+from stats import aggregate_columns, summary
+
+# Precomputed numbers for the list pages: score summary per test, roster size per course and
+# average score per student. Each one is cached under the (table, id) key of its row, so a
+# commit that touches a test, course or student drops exactly that entry in the worker that made
+# it. Entries also remember the fragment generation of their table (fragments.py): with the shared
+# file backend a commit in any worker bumps it, and every other worker's entries for that table
+# stop counting.
+
+SUMMARY_TTL = int(os.environ.get("SUMMARY_CACHE_TTL", 30))
+cache = TTLCache(maxsize=int(os.environ.get("SUMMARY_CACHE_SIZE", 20000)), ttl=SUMMARY_TTL)
+
+
+def cached_many(table, ids, compute):
+    """Cached values for `ids`, the missing ones come from compute(missing_ids) -> {id: value} in one query."""
+    # read before computing, a commit during the query leaves the values already stale
+    generation = current_generation([table])
+    result, missing = {}, []
+    for row_id in ids:
+        entry = cache.get((table, row_id))
+        if entry is None or entry[0] != generation:
+            missing.append(row_id)
+        else:
+            result[row_id] = entry[1]
+    if missing:
+        with primary_reads():
+            computed = compute(missing)
+        for row_id in missing:
+            result[row_id] = computed[row_id]
+            cache.set((table, row_id), (generation, computed[row_id]))
+    return result
+
+
+def test_summaries(test_ids):
+    def compute(ids):
+        rows = db.session.execute(
+            select(Score.test_id, *aggregate_columns()).where(Score.test_id.in_(ids)).group_by(Score.test_id)
+        ).all()
+        computed = {row.test_id: summary(row) for row in rows}
+        empty = {'count': 0, 'mean': None, 'min': None, 'max': None, 'stddev': None}
+        return {test_id: computed.get(test_id, empty) for test_id in ids}
+    return cached_many("tests", test_ids, compute)
+
+
+def course_roster_counts(course_ids):
+    def compute(ids):
+        counts = dict(db.session.execute(
+            select(student_course_relation.c.course_id, func.count())
+            .where(student_course_relation.c.course_id.in_(ids))
+            .group_by(student_course_relation.c.course_id)
+        ).all())
+        return {course_id: counts.get(course_id, 0) for course_id in ids}
+    return cached_many("courses", course_ids, compute)
+
+
+def student_averages(student_ids):
+    def compute(ids):
+        rows = db.session.execute(
+            select(Score.student_id, func.avg(Score.score), func.count(Score.id))
+            .where(Score.student_id.in_(ids))
+            .group_by(Score.student_id)
+        ).all()
+        computed = {student_id: {'mean': float(mean), 'count': count} for student_id, mean, count in rows}
+        return {student_id: computed.get(student_id, {'mean': None, 'count': 0}) for student_id in ids}
+    return cached_many("students", student_ids, compute)
+
+
+@on_commit
+def invalidate(keys):
+    for key in keys:
+        cache.pop(key)
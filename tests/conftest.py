@@ -0,0 +1,58 @@
+import os
+import tempfile
+
+# The app reads these at import time, set them before anything imports it
+DB_PATH = os.path.join(tempfile.mkdtemp(), "tests.db")
+os.environ['DB_URI'] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault('FLASK_KEY', "test")
+# every request renders, a cached fragment would hide the statements under test
+os.environ['FRAGMENT_CACHE'] = "off"
+# cheap hashes, the imports hash every row
+os.environ['PASSWORD_HASH_METHOD'] = "pbkdf2:sha256:1000"
+
+import pytest  # noqa: E402
+
+from application import create_app  # noqa: E402
+from cache import clear_all  # noqa: E402
+from migrations import upgrade  # noqa: E402
+from models import db  # noqa: E402
+from benchmarks.dataset import generate  # noqa: E402
+from benchmarks.harness import StatementCounter  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    return create_app({'TESTING': True, 'WTF_CSRF_ENABLED': False})
+
+
+@pytest.fixture
+def database(app):
+    """An empty database with the current schema, as `flask db-create` makes it."""
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        upgrade(db.engine)
+        clear_all()
+        yield db
+        db.session.remove()
+
+
+@pytest.fixture
+def dataset(database):
+    generate(students=60, teachers=3, courses=6, students_per_course=10)
+    return database
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = "user:1"
+    return client
+
+
+@pytest.fixture
+def statements(database):
+    counter = StatementCounter([database.engine])
+    yield counter
+    counter.remove()
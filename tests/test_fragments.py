@@ -0,0 +1,32 @@
+import pytest
+
+import fragments
+import summaries
+
+
+@pytest.fixture(params=["memory", "file"])
+def backend(request, monkeypatch, tmp_path):
+    backend = fragments.MemoryBackend() if request.param == "memory" else fragments.FileBackend(str(tmp_path))
+    monkeypatch.setattr(fragments, "backend", backend)
+    return backend
+
+
+def test_fragment_renders_read_the_summary_cache(dataset, client, statements, backend):
+    client.get('/login')
+    assert client.get('/all_students?size=10').status_code == 200
+    # another fragment over the same students, only the page query runs
+    statements.reset()
+    assert client.get('/all_students?size=10&dir=asc').status_code == 200
+    assert statements.count == 1
+
+
+def test_another_workers_commit_invalidates_cached_summaries(dataset, client, backend):
+    client.get('/login')
+    client.get('/all_students?size=10')
+    # a stale average this worker still holds, then a commit elsewhere bumps the generation
+    generation, average = summaries.cache.get(("students", 1))
+    summaries.cache.set(("students", 1), (generation, {'mean': 12345.0, 'count': 1}))
+    backend.bump("students")
+    html = client.get('/all_students?size=10&dir=asc').get_data(as_text=True)
+    assert "12345" not in html
+    assert summaries.cache.get(("students", 1))[1] == average
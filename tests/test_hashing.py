@@ -0,0 +1,49 @@
+import multiprocessing
+import os
+import time
+
+import hashing
+
+
+def hold_and_die(leases):
+    leases.acquire()
+    os._exit(0)
+
+
+def test_lease_of_a_dead_process_is_reclaimed():
+    leases = hashing.Leases(1, ttl=60)
+    holder = multiprocessing.get_context("fork").Process(target=hold_and_die, args=(leases,))
+    holder.start()
+    holder.join()
+    start = time.monotonic()
+    slot = leases.acquire()
+    assert time.monotonic() - start < 1
+    leases.release(slot)
+
+
+def test_expired_lease_is_reclaimed():
+    leases = hashing.Leases(1, ttl=0.05)
+    leases.acquire()
+    start = time.monotonic()
+    leases.acquire()
+    assert 0.04 < time.monotonic() - start < 1
+
+
+def test_admission_slots_belong_to_the_worker():
+    hashing.hash_pool()
+    slots = hashing._slots
+    # a forked worker gets its own, permits held by this process don't count against it
+    assert slots.acquire(timeout=0)
+    child = multiprocessing.get_context("fork").Process(target=lambda: os._exit(
+        0 if hashing.hash_pool() and hashing._slots is not slots else 1))
+    child.start()
+    child.join()
+    slots.release()
+    assert child.exitcode == 0
+
+
+def test_hashes_round_trip_through_the_pool():
+    password_hash = hashing.hash_password("secret")
+    assert not hashing.needs_rehash(password_hash)
+    assert hashing.check_password(password_hash, "secret")
+    assert not hashing.check_password(password_hash, "wrong")
@@ -0,0 +1,59 @@
+import io
+
+from sqlalchemy import func, select
+from werkzeug.security import check_password_hash
+
+from imports import NOT_UTF8, import_students
+from models import Student
+
+HEADER = "name,grade,email,password,address,cellphone,tel_number,card_number\n"
+
+
+def csv_file(*rows):
+    return io.BytesIO((HEADER + "".join(row + "\n" for row in rows)).encode())
+
+
+def student(session, email):
+    return session.execute(select(Student).where(Student.email == email)).scalar_one_or_none()
+
+
+def test_import_inserts_new_and_updates_existing_students(dataset):
+    count = dataset.session.execute(select(func.count(Student.id))).scalar()
+    written, errors = import_students(csv_file(
+        "New Student,7,new@demo-school.org,secret,1 Road,0912345678,23456789,N0000001",
+        "Renamed,9,student1@demo-school.org,secret,2 Road,0912345678,23456789,C0000001",
+    ))
+    assert (written, errors) == (2, [])
+    dataset.session.expire_all()
+    assert dataset.session.execute(select(func.count(Student.id))).scalar() == count + 1
+    updated = student(dataset.session, "student1@demo-school.org")
+    assert (updated.id, updated.name, updated.grade) == (1, "Renamed", 9)
+    assert check_password_hash(student(dataset.session, "new@demo-school.org").password, "secret")
+
+
+def test_import_reports_duplicates_in_the_file(dataset):
+    written, errors = import_students(csv_file(
+        "A,5,a@demo-school.org,pw,,0912345678,23456789,X1",
+        "B,5,a@demo-school.org,pw,,0912345678,23456789,X2",
+        "C,5,c@demo-school.org,pw,,0912345678,23456789,X1",
+    ))
+    assert written == 1
+    assert errors == [(3, "a@demo-school.org is already on line 2"), (4, "card number X1 is already on line 2")]
+    assert student(dataset.session, "c@demo-school.org") is None
+
+
+def test_import_keeps_card_numbers_with_their_student(dataset):
+    written, errors = import_students(csv_file("Thief,5,thief@demo-school.org,pw,,0912345678,23456789,C0000002"))
+    assert written == 0
+    assert errors == [(2, "card number C0000002 belongs to student2@demo-school.org")]
+
+
+def test_import_rejects_missing_columns(dataset):
+    assert import_students(io.BytesIO(b"name,email\nA,a@demo-school.org\n")) == \
+        (0, [(1, "missing column(s): grade, password, cellphone, tel_number")])
+
+
+def test_import_rejects_files_that_are_not_utf8(dataset):
+    latin1 = io.BytesIO((HEADER + "J\xe9r\xf4me,5,j@demo-school.org,pw,,0912345678,23456789,\n").encode("latin-1"))
+    assert import_students(latin1) == (0, [(1, NOT_UTF8)])
+    assert student(dataset.session, "j@demo-school.org") is None
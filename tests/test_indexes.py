@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from benchmarks.check_indexes import HOT_LOOKUPS, legacy_database, plan
+from migrations import upgrade
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    """A database with the schema the old db.create_all() made, duplicates included, upgraded."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    legacy_database(engine)
+    assert upgrade(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_migrations_run_once(legacy_engine):
+    assert upgrade(legacy_engine) == []
+
+
+@pytest.mark.parametrize("table", ["student_course_relation", "student_test_relation", "scores"])
+def test_migrations_remove_duplicate_rows(legacy_engine, table):
+    with legacy_engine.connect() as conn:
+        assert conn.execute(text(f"SELECT count(*) FROM {table}")).scalar() == 1
+
+
+@pytest.mark.parametrize("name", HOT_LOOKUPS)
+def test_hot_lookups_use_an_index_after_upgrade(legacy_engine, name):
+    with legacy_engine.connect() as conn:
+        uses_index, detail = plan(conn, HOT_LOOKUPS[name])
+    assert uses_index, detail
+
+
+@pytest.mark.parametrize("name", HOT_LOOKUPS)
+def test_hot_lookups_use_an_index_on_a_new_database(database, name):
+    with database.engine.connect() as conn:
+        uses_index, detail = plan(conn, HOT_LOOKUPS[name])
+    assert uses_index, detail
@@ -0,0 +1,24 @@
+import pytest
+
+from LineNotify import Create_session
+
+
+@pytest.fixture
+def retry():
+    return Create_session().get_adapter("https://notify-api.line.me").max_retries
+
+
+@pytest.mark.parametrize("status, has_retry_after", [(429, False), (429, True), (503, True)])
+def test_posts_are_retried_when_line_did_not_take_the_message(retry, status, has_retry_after):
+    assert retry.is_retry("POST", status, has_retry_after)
+
+
+@pytest.mark.parametrize("status, has_retry_after", [(502, False), (503, False), (504, False), (504, True),
+                                                     (413, True), (500, False)])
+def test_posts_are_not_retried_when_line_may_have_delivered(retry, status, has_retry_after):
+    assert not retry.is_retry("POST", status, has_retry_after)
+
+
+def test_connect_errors_are_retried_read_errors_are_not(retry):
+    assert retry.connect == 3
+    assert retry.read == 0
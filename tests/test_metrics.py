@@ -0,0 +1,14 @@
+def test_metrics_are_only_served_locally_without_a_token(app, monkeypatch):
+    monkeypatch.delenv('METRICS_TOKEN', raising=False)
+    client = app.test_client()
+    assert client.get('/metrics').status_code == 200
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': "203.0.113.7"}).status_code == 404
+
+
+def test_metrics_need_the_token_when_one_is_set(app, monkeypatch):
+    monkeypatch.setenv('METRICS_TOKEN', "s3cret")
+    client = app.test_client()
+    remote = {'REMOTE_ADDR': "203.0.113.7"}
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', environ_base=remote, headers={'Authorization': "Bearer wrong"}).status_code == 403
+    assert client.get('/metrics', environ_base=remote, headers={'Authorization': "Bearer s3cret"}).status_code == 200
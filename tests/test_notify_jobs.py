@@ -0,0 +1,58 @@
+import datetime
+
+import pytest
+from sqlalchemy import select
+
+import notify_jobs
+from models import Communication, NotifyDelivery, Student
+from notify_jobs import enqueue_comm, expand_jobs, job_progress, send_deliveries
+
+
+@pytest.fixture
+def sent(monkeypatch, dataset):
+    """(token, message) of every push, each answered with 200, checking no transaction is open meanwhile."""
+    pushed = []
+
+    def push_messages(messages):
+        assert not dataset.session().in_transaction()
+        pushed.extend(messages)
+        return [200] * len(messages)
+    monkeypatch.setattr(notify_jobs, "Push_messages", push_messages)
+    return pushed
+
+
+def queued_comm(session):
+    comm = session.get(Communication, 1)
+    job = enqueue_comm(comm)
+    expand_jobs()
+    return job
+
+
+def test_deliveries_use_the_token_the_student_has_when_sending(dataset, sent):
+    job = queued_comm(dataset.session)
+    deliveries = dataset.session.execute(select(NotifyDelivery).where(NotifyDelivery.job_id == job.id)).scalars().all()
+    relinked, unlinked = (dataset.session.get(Student, delivery.student_id) for delivery in deliveries[:2])
+    relinked.line_notify_access_token = "new-token"
+    unlinked.line_notify_access_token = None
+    dataset.session.commit()
+
+    assert send_deliveries() == len(deliveries)
+
+    tokens = [token for token, message in sent]
+    assert "new-token" in tokens
+    assert len(tokens) == len(deliveries) - 1
+    assert job_progress(job.id) == {'pending': 0, 'sent': len(deliveries) - 1, 'failed': 1, 'total': len(deliveries)}
+
+
+def test_deliveries_a_dead_worker_was_sending_are_not_resent(dataset, sent):
+    job = queued_comm(dataset.session)
+    abandoned = notify_jobs.claim_deliveries(1)
+    dataset.session.execute(NotifyDelivery.__table__.update().values(
+        claimed_at=datetime.datetime.utcnow() - datetime.timedelta(seconds=notify_jobs.SEND_TIMEOUT + 1)))
+    dataset.session.commit()
+
+    send_deliveries()
+
+    assert abandoned[0].token not in [token for token, message in sent]
+    assert dataset.session.get(NotifyDelivery, abandoned[0].id).status == "failed"
+    assert job_progress(job.id)['pending'] == 0
@@ -0,0 +1,62 @@
+import base64
+import datetime
+import json
+
+import pytest
+
+from models import Student
+from pagination import decode_cursor, encode_cursor
+
+
+def raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+def walk(client, query):
+    """Ids of every row of an API list, following `next` until the last page."""
+    ids, cursor = [], None
+    while True:
+        response = client.get(f"/api/v1/students?{query}" + (f"&after={cursor}" if cursor else ""))
+        assert response.status_code == 200
+        ids += [item['id'] for item in response.json['items']]
+        cursor = response.json['next']
+        if cursor is None:
+            return ids
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("Student 7", 7)) == ("Student 7", 7)
+    assert decode_cursor(encode_cursor(12, 3)) == (12, 3)
+
+
+def test_datetime_cursor_round_trip():
+    moment = datetime.datetime(2024, 5, 1, 12, 30, 15, 250000)
+    assert decode_cursor(encode_cursor(moment, 4), Student.updated_at) == (moment, 4)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!", raw_cursor(["a"]), raw_cursor([True, 1]), raw_cursor([["a"], 1]), raw_cursor([{"a": 1}, 1]),
+    raw_cursor(["a", "b"]), raw_cursor([None, 1]),
+])
+def test_bad_cursors_are_ignored(cursor):
+    assert decode_cursor(cursor) is None
+
+
+@pytest.mark.parametrize("query", ["sort=id&size=7", "sort=name&dir=desc&size=7", "sort=grade&size=9",
+                                   "sort=updated_at&size=5"])
+def test_pages_cover_every_row_once(dataset, client, query):
+    ids = walk(client, query)
+    assert sorted(ids) == list(range(1, 61))
+
+
+def test_previous_page_is_the_page_before(dataset, client):
+    first = client.get("/api/v1/students?sort=grade&size=10").json
+    second = client.get(f"/api/v1/students?sort=grade&size=10&after={first['next']}").json
+    back = client.get(f"/api/v1/students?sort=grade&size=10&before={second['prev']}").json
+    assert back['items'] == first['items']
+
+
+def test_list_page_with_a_bad_cursor_starts_over(dataset, client):
+    response = client.get(f"/all_students?size=5&after={raw_cursor([[1], 1])}")
+    assert response.status_code == 200
+    assert ">Student 1<" in response.get_data(as_text=True)
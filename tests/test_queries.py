@@ -0,0 +1,39 @@
+import pytest
+
+from benchmarks.dataset import generate
+from cache import clear_all
+from models import db
+
+PAGES = ['/all_students', '/all_users', '/all_courses', '/all_tests', '/all_comms']
+
+
+def statements_per_page(client, statements, courses):
+    db.drop_all()
+    db.create_all()
+    generate(students=courses * 10, teachers=max(courses // 5, 1), courses=courses)
+    clear_all()
+    # the tests share one app context and flask-login keeps the user in g, load it before counting
+    client.get('/login')
+    counts = {}
+    for page in PAGES:
+        statements.reset()
+        response = client.get(page)
+        assert response.status_code == 200, page
+        counts[page] = statements.count
+    return counts
+
+
+@pytest.mark.parametrize("page", PAGES)
+def test_list_pages_run_the_same_statements_at_any_size(client, statements, page):
+    small = statements_per_page(client, statements, courses=5)
+    large = statements_per_page(client, statements, courses=40)
+    assert small[page] == large[page]
+
+
+def test_list_page_statement_budget(client, statements, dataset):
+    client.get('/login')
+    for page in PAGES:
+        statements.reset()
+        assert client.get(page).status_code == 200
+        # the page, its eager loads and summaries
+        assert statements.count <= 4, page
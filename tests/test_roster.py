@@ -0,0 +1,35 @@
+from roster import roster_ids, sync_roster
+
+
+def test_sync_roster_writes_only_the_difference(dataset, statements):
+    before = roster_ids(1)
+    keep = sorted(before)[:5]
+    new = [student_id for student_id in range(1, 61) if student_id not in before][:3]
+
+    added, removed = sync_roster(1, keep + new)
+    dataset.session.commit()
+
+    assert added == set(new)
+    assert removed == before - set(keep)
+    assert roster_ids(1) == set(keep + new)
+
+
+def test_sync_roster_without_changes_writes_nothing(dataset, statements):
+    current = roster_ids(1)
+    statements.reset()
+    assert sync_roster(1, current) == (set(), set())
+    # the existing students and the current roster, no DELETE or INSERT
+    assert statements.count == 2
+
+
+def test_sync_roster_ignores_unknown_students(dataset):
+    added, removed = sync_roster(1, list(roster_ids(1)) + [99999])
+    assert added == set() and removed == set()
+    assert 99999 not in roster_ids(1)
+
+
+def test_sync_roster_empties_a_course(dataset):
+    before = roster_ids(2)
+    assert sync_roster(2, []) == (set(), before)
+    dataset.session.commit()
+    assert roster_ids(2) == set()
@@ -0,0 +1,100 @@
+import io
+
+from sqlalchemy import select
+
+import models
+from models import Score, student_test_relation
+from scores import course_roster, insert_scores, read_score_csv, update_scores
+
+
+def stored_scores(session, test_id):
+    return dict(session.execute(select(Score.student_id, Score.score).where(Score.test_id == test_id)).all())
+
+
+def test_update_scores_writes_only_changed_scores(dataset, statements):
+    test = dataset.session.get(models.Test, 1)
+    stored = stored_scores(dataset.session, test.id)
+    changed, unchanged = sorted(stored)[:2]
+    new_score = (stored[changed] + 1) % 101
+
+    statements.reset()
+    assert update_scores(test.id, {changed: new_score, unchanged: stored[unchanged]}) == 1
+    # read the current scores, one executemany UPDATE
+    assert statements.count == 2
+    dataset.session.commit()
+    assert stored_scores(dataset.session, test.id) == {**stored, changed: new_score}
+
+
+def test_update_scores_ignores_empty_scores_and_students_without_one(dataset):
+    stored = stored_scores(dataset.session, 1)
+    outsider = next(student_id for student_id in range(1, 61) if student_id not in stored)
+    assert update_scores(1, {sorted(stored)[0]: None, outsider: 50}) == 0
+    dataset.session.commit()
+    assert stored_scores(dataset.session, 1) == stored
+
+
+def test_insert_scores_skips_students_who_have_one(dataset):
+    test = dataset.session.get(models.Test, 1)
+    roster = [student_id for student_id, name in course_roster(test.course_id)]
+    dataset.session.execute(Score.__table__.delete().where(Score.test_id == test.id, Score.student_id.in_(roster[:3])))
+    dataset.session.execute(student_test_relation.delete().where(student_test_relation.c.test_id == test.id,
+                                                                 student_test_relation.c.student_id.in_(roster[:3])))
+    stored = stored_scores(dataset.session, test.id)
+
+    assert insert_scores(test.id, {student_id: 70 for student_id in roster}) == 3
+    dataset.session.commit()
+    assert stored_scores(dataset.session, test.id) == {student_id: stored.get(student_id, 70) for student_id in roster}
+
+
+def test_read_score_csv_matches_student_ids_as_numbers(dataset):
+    student_id = course_roster(1)[0][0]
+    sheet = f"student_id,score\n{student_id:03d},88\n".encode()
+    assert read_score_csv(io.BytesIO(sheet), 1) == ({student_id: 88}, [])
+
+
+def test_read_score_csv_reports_rows_it_cannot_use(dataset):
+    outsider = next(student_id for student_id in range(1, 61) if student_id not in dict(course_roster(1)))
+    member = course_roster(1)[0][0]
+    sheet = f"student_id,score\n{outsider},10\n{member},ten\n".encode()
+    scores, errors = read_score_csv(io.BytesIO(sheet), 1)
+    assert scores == {}
+    assert errors == [f"Line 2: {outsider} is not a student of this course", "Line 3: ten is not a score from 0 to 100"]
+
+
+def test_read_score_csv_rejects_files_that_are_not_utf8(dataset):
+    sheet = "email,score\nj\xe9r\xf4me@demo-school.org,10\n".encode("latin-1")
+    assert read_score_csv(io.BytesIO(sheet), 1) == ({}, ["The file is not UTF-8 text, save it as CSV UTF-8"])
+
+
+def score_form(*entries):
+    return {f"scores-{i}-{field}": value for i, entry in enumerate(entries) for field, value in entry.items()}
+
+
+def test_score_form_flashes_every_bad_entry_and_writes_nothing(dataset, client):
+    test = dataset.session.get(models.Test, 1)
+    roster = course_roster(test.course_id)
+    stored = stored_scores(dataset.session, test.id)
+    (first, first_name), (second, second_name) = roster[:2]
+    outsider = next(student_id for student_id in range(1, 61) if student_id not in dict(roster))
+
+    response = client.post(f"/edit_score/{test.id}", data=score_form(
+        {'student_id': first, 'score': "101"}, {'student_id': second, 'score': "abc"},
+        {'student_id': outsider, 'score': "50"}, {'student_id': "x1", 'score': "50"}))
+
+    assert response.status_code == 200
+    page = response.get_data(as_text=True)
+    assert f"{first_name}: Number must be between 0 and 100." in page
+    assert f"{second_name}: Not a valid integer value." in page
+    assert f"{outsider} is not a student of this course" in page
+    assert "x1 is not a student of this course" in page
+    # the typed values stay in the form
+    assert 'value="101"' in page
+    assert stored_scores(dataset.session, test.id) == stored
+
+
+def test_score_form_writes_valid_entries(dataset, client):
+    test = dataset.session.get(models.Test, 1)
+    first = course_roster(test.course_id)[0][0]
+    response = client.post(f"/edit_score/{test.id}", data=score_form({'student_id': first, 'score': "100"}))
+    assert response.status_code == 302
+    assert stored_scores(dataset.session, test.id)[first] == 100
@@ -0,0 +1,16 @@
+from functools import wraps
+
+from flask import abort
+from flask_login import current_user
+
+# The pages of the app, one blueprint per area. application.create_app() registers them.
+
+
+def admin_only(function):
+    @wraps(function)
+    def wrapper_function(*args, **kwargs):
+        if not (current_user.get_id() == 1 or current_user.is_authenticated):
+            return abort(403, "Access forbidden - Admin access required")
+        return function(*args, **kwargs)
+
+    return wrapper_function
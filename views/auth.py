@@ -0,0 +1,65 @@
+from flask import Blueprint, render_template, redirect, url_for, flash
+from flask_login import login_user, current_user, logout_user
+from werkzeug.exceptions import ServiceUnavailable
+
+from forms import CreateLoginForm, CreateUserForm
+from models import db, User
+from hashing import hash_password, check_password, needs_rehash
+from principals import principal_for
+
+auth = Blueprint("auth", __name__)
+
+
+@auth.route('/register', methods=["GET", "POST"])
+def register():
+    form = CreateUserForm()
+    if form.validate_on_submit():
+        email = form.email.data
+        result = db.session.execute(db.select(User).where(User.email == email))
+        user = result.scalar()
+        if user:
+            flash("Email already existed")
+            return redirect(url_for("auth.login"))
+        hashed_pwd = hash_password(form.password.data)
+        new_user = User(name=form.name.data,
+                        email=email,
+                        password=hashed_pwd,
+                        cellphone=form.cellphone.data
+                        )
+        db.session.add(new_user)
+        db.session.commit()
+        return redirect(url_for("auth.login"))
+    return render_template("register.html", form=form, logged_in=current_user.is_authenticated)
+
+
+@auth.route('/login', methods=["GET", "POST"])
+def login():
+    form = CreateLoginForm()
+    if form.validate_on_submit():
+        email = form.email.data
+        result = db.session.execute(db.select(User).where(User.email == email))
+        user = result.scalar()
+        if user:
+            if check_password(user.password, form.password.data):
+                if needs_rehash(user.password):
+                    try:
+                        user.password = hash_password(form.password.data)
+                        db.session.commit()
+                    except ServiceUnavailable:
+                        # the upgrade can wait for a quieter login
+                        pass
+                login_user(principal_for(user))
+                return redirect(url_for('site.home'))
+            else:
+                flash("Wrong Password")
+                return redirect(url_for('auth.login'))
+        else:
+            flash('Email is not registered')
+            return redirect(url_for('auth.login'))
+    return render_template("login.html", form=form, logged_in=current_user.is_authenticated)
+
+
+@auth.route('/logout')
+def logout():
+    logout_user()
+    return redirect(url_for('site.home'))
@@ -0,0 +1,90 @@
+from flask import Blueprint, render_template, redirect, url_for
+from flask_login import current_user
+
+from forms import CreateCommForm
+from models import db, Communication, NotifyJob
+from routing import replica_reads
+import fragments
+from choices import course_choices
+from pagination import paginate
+from queries import comm_list
+from notify_jobs import enqueue_comm, job_progress
+from views import admin_only
+
+comms = Blueprint("comms", __name__)
+
+
+@comms.route('/add_comm', methods=["GET", "POST"])
+@admin_only
+def add_comm():
+    form = CreateCommForm()
+    form.course.choices = course_choices(current_user.id)
+    form.teacher.data = current_user.id
+    if form.validate_on_submit():
+        new_comm = Communication(
+            title=form.title.data,
+            teacher_id=current_user.id,
+            course_id=form.course.data,
+            body=form.body.data
+        )
+        db.session.add(new_comm)
+        db.session.commit()
+        return redirect(url_for('site.home'))
+
+    return render_template("add_comm.html", form=form, logged_in=current_user.is_authenticated)
+
+
+@comms.route('/all_comms')
+@admin_only
+@replica_reads
+def all_comms():
+    def render():
+        page = paginate(comm_list(), Communication, {'title': Communication.title})
+        return render_template("tables/comms.html", page=page)
+    table = fragments.cached("comms", ["communications", "courses", "users"], render)
+    return render_template("all_comms.html", table=table, logged_in=current_user.is_authenticated)
+
+
+@comms.route('/delete_comm/<int:comm_id>')
+@admin_only
+def delete_comm(comm_id):
+    comm = db.get_or_404(Communication, comm_id)
+    db.session.delete(comm)
+    db.session.commit()
+    return redirect(url_for('comms.all_comms'))
+
+
+@comms.route('/comm/<int:comm_id>', methods=["GET", "POST"])
+@admin_only
+def comm(comm_id):
+    comm = db.get_or_404(Communication, comm_id)
+    form = CreateCommForm()
+    form.title.default = comm.title
+    form.course.choices = course_choices(current_user.id)
+    form.course.default = comm.course_id
+    form.body.default = comm.body
+    if form.validate_on_submit():
+        comm.title = form.title.data
+        comm.course_id = form.course.data
+        comm.body = form.body.data
+        db.session.commit()
+        return redirect(url_for('comms.all_comms'))
+    form.process()
+
+    return render_template("add_comm.html", form=form, logged_in=current_user.is_authenticated)
+
+
+@comms.route('/comm/<int:comm_id>/push_comm')
+@admin_only
+def push_comm(comm_id):
+    comm = db.get_or_404(Communication, comm_id)
+    job = enqueue_comm(comm)
+    return redirect(url_for('comms.notify_job', job_id=job.id))
+
+
+@comms.route('/notify_job/<int:job_id>')
+@admin_only
+def notify_job(job_id):
+    job = db.get_or_404(NotifyJob, job_id)
+    progress = job_progress(job_id)
+    return render_template("notify_job.html", job=job, progress=progress, logged_in=current_user.is_authenticated)
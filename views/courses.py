@@ -0,0 +1,106 @@
+from flask import Blueprint, render_template, redirect, url_for, request, jsonify
+from flask_login import current_user
+
+from forms import CreateCourseForm, EditCourseForm
+from models import db, Course
+from routing import replica_reads
+import fragments
+from choices import teacher_choices, teacher_choices_for, student_choices, student_count, student_choices_for, \
+    with_submitted, INLINE_STUDENT_LIMIT
+from roster import roster_ids, sync_roster
+from pagination import paginate
+from summaries import course_roster_counts
+from stats import course_trends
+from queries import course_list
+from views import admin_only
+
+courses = Blueprint("courses", __name__)
+
+
+def provide_course_choices(form, enrolled=()):
+    """Fill the teacher and student choices of a course form, returns True when the form should use the typeahead."""
+    # The cached lists can lag behind other workers, submitted ids are checked against the database
+    submitted_teacher = request.form.getlist('teacher', type=int)
+    submitted_students = request.form.getlist('students', type=int)
+    form.teacher.choices = with_submitted(teacher_choices(), submitted_teacher, teacher_choices_for)
+    if student_count() <= INLINE_STUDENT_LIMIT:
+        form.students.choices = with_submitted(student_choices(), submitted_students, student_choices_for)
+        return False
+    # Too many students to list them all, only offer the ones already picked and let the typeahead add more
+    form.students.choices = student_choices_for(set(enrolled) | set(submitted_students))
+    return True
+
+
+@courses.route('/add_course', methods=["GET", "POST"])
+@admin_only
+def add_course():
+    form = CreateCourseForm()
+    typeahead = provide_course_choices(form)
+    if form.validate_on_submit():
+        new_course = Course(
+            subject=form.name.data,
+            teacher_id=form.teacher.data
+        )
+        db.session.add(new_course)
+        db.session.flush()
+        # print(form.students.data)
+        # >>> [1, 2, 3, 4, 5]
+        sync_roster(new_course.id, form.students.data)
+        db.session.commit()
+        return redirect(url_for('site.home'))
+    return render_template("add_course.html", form=form, logged_in=current_user.is_authenticated, typeahead=typeahead)
+
+
+@courses.route('/edit_course/<int:course_id>', methods=["GET", "POST"])
+@admin_only
+def edit_course(course_id):
+    course = db.get_or_404(Course, course_id)
+    form = EditCourseForm()
+    form.name.default = course.subject
+    form.teacher.default = course.teacher_id
+    # provide teachers and students list dynamically
+    enrolled = roster_ids(course_id)
+    typeahead = provide_course_choices(form, enrolled)
+    # Make the checkbox pre-checked by setting the form.students.default and form.process()
+    form.students.default = list(enrolled)
+    # form.process() << will cause CSRF token missing if put above the validate_on_submit()
+
+    if form.validate_on_submit():
+        course.subject = form.name.data
+        course.teacher_id = form.teacher.data  # form.teacher.data returns the id of teacher
+        # only the students who joined or left the course are written
+        sync_roster(course_id, form.students.data)
+        db.session.commit()
+        return redirect(url_for('courses.all_courses'))
+
+    form.process()
+    return render_template("add_course.html", form=form, logged_in=True, course_id=course_id, typeahead=typeahead)
+
+
+@courses.route('/all_courses')
+@admin_only
+@replica_reads
+def all_courses():
+    def render():
+        page = paginate(course_list(), Course, {'subject': Course.subject})
+        counts = course_roster_counts([course.id for course in page.items])
+        return render_template("tables/courses.html", page=page, counts=counts)
+    table = fragments.cached("courses", ["courses", "users", "students"], render)
+    return render_template("all_courses.html", table=table, logged_in=current_user.is_authenticated)
+
+
+@courses.route('/delete/<int:course_id>')
+@admin_only
+def delete_course(course_id):
+    course_to_delete = db.get_or_404(Course, course_id)
+    db.session.delete(course_to_delete)
+    db.session.commit()
+    return redirect(url_for('courses.all_courses'))
+
+
+@courses.route('/api/stats/course/<int:course_id>')
+@admin_only
+@replica_reads
+def course_stats_json(course_id):
+    db.get_or_404(Course, course_id)
+    return jsonify(course_trends(course_id))
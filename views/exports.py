@@ -0,0 +1,49 @@
+from flask import Blueprint
+
+from models import db, Course
+from routing import replica_reads
+from exports import students_csv, scores_csv, rosters_csv, gradebook_csv, gradebook_arrow
+from views import admin_only
+
+exports = Blueprint("exports", __name__)
+
+
+@exports.route('/export/students.csv')
+@admin_only
+@replica_reads
+def export_students():
+    return students_csv()
+
+
+@exports.route('/export/scores.csv')
+@admin_only
+@replica_reads
+def export_scores():
+    return scores_csv()
+
+
+@exports.route('/export/rosters.csv')
+@admin_only
+@replica_reads
+def export_rosters():
+    return rosters_csv()
+
+
+@exports.route('/export/gradebook.csv')
+@exports.route('/export/gradebook/<int:course_id>.csv')
+@admin_only
+@replica_reads
+def export_gradebook(course_id=None):
+    if course_id is not None:
+        db.get_or_404(Course, course_id)
+    return gradebook_csv(course_id)
+
+
+@exports.route('/export/gradebook.arrow')
+@exports.route('/export/gradebook/<int:course_id>.arrow')
+@admin_only
+@replica_reads
+def export_gradebook_arrow(course_id=None):
+    if course_id is not None:
+        db.get_or_404(Course, course_id)
+    return gradebook_arrow(course_id)
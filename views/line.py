@@ -0,0 +1,39 @@
+from flask import Blueprint, redirect, url_for, request
+
+from models import db, Student
+from LineNotify import Generate_auth_link, Get_access_token
+from views import admin_only
+
+line = Blueprint("line", __name__)
+
+
+@line.route('/authorize/<int:user_id>')
+@admin_only
+def authorize(user_id):
+    link = Generate_auth_link(user_id)
+    return redirect(link)
+
+
+@line.route('/callback', methods=["GET", "POST"])
+def callback():
+    code = request.args.get('code')
+    user_id = request.args.get('state')
+    access_token = Get_access_token(code)['access_token']
+    student = db.get_or_404(Student, user_id)
+    student.line_notify_access_token = access_token
+    db.session.commit()
+    return redirect(url_for('students.all_students'))
+
+
+# @line.route('/push_message', methods=["GET", "POST"])
+# @admin_only
+# def push_message():
+#     teachers = db.session.execute(db.select(User).where(User.line_notify_access_token != None)).scalars().all()
+#     form = CreateNotifyForm(obj=teachers)
+#     form.teachers.choices = [(teacher.id, teacher.name) for teacher in teachers]
+#     if form.validate_on_submit():
+#         tokens = [db.get_or_404(User, teacher_id).line_notify_access_token for teacher_id in form.teachers.data]
+#         for token in tokens:
+#             Push_message(token=token, message=form.message.data)
+#         return redirect(url_for('site.home'))
+#     return render_template("push_message.html", form=form, logged_in=current_user.is_authenticated)
@@ -0,0 +1,48 @@
+import os
+
+from flask import Blueprint, abort, render_template, request
+from flask_login import current_user
+
+import metrics
+from routing import replica_reads
+from search import search
+from views import admin_only
+
+site = Blueprint("site", __name__)
+
+
+@site.route('/')
+def home():
+    # result = db.session.execute(db.select(User)).scalars()
+    # users = result.all()
+    # print(users[1].courses[0].subject)
+    # return render_template("index.html")
+    return render_template("index.html", logged_in=current_user.is_authenticated)
+
+
+@site.route('/search')
+@admin_only
+@replica_reads
+def search_page():
+    query = request.args.get('q', "")
+    page = max(request.args.get('page', 1, type=int), 1)
+    kinds = request.args.getlist('kind')
+    results, has_more = search(query, kinds, page)
+    return render_template("search.html", query=query, kinds=kinds, results=results, page=page, has_more=has_more,
+                           logged_in=current_user.is_authenticated)
+
+
+LOCAL_ADDRESSES = ("127.0.0.1", "::1")
+
+
+@site.route('/metrics')
+def metrics_text():
+    # With METRICS_TOKEN set, scrapers send it as a bearer token. Without it only a scraper on the
+    # same host gets in, anyone else sees no endpoint at all.
+    token = os.environ.get('METRICS_TOKEN')
+    if token:
+        if request.headers.get('Authorization') != f"Bearer {token}":
+            return abort(403)
+    elif request.remote_addr not in LOCAL_ADDRESSES:
+        return abort(404)
+    return metrics.render(), 200, {'Content-Type': "text/plain; version=0.0.4"}
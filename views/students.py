@@ -0,0 +1,125 @@
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask_login import current_user
+
+from forms import CreateStudentForm, EditStudentForm, ImportStudentForm
+from models import db, Student
+from routing import replica_reads
+import fragments
+from imports import import_students
+from hashing import hash_password
+from choices import search_students, SEARCH_LIMIT
+from pagination import paginate
+from summaries import student_averages
+from stats import student_trajectory
+from queries import student_list
+from views import admin_only
+
+students = Blueprint("students", __name__)
+
+
+@students.route('/add_student', methods=["GET", "POST"])
+@admin_only
+def add_student():
+    form = CreateStudentForm()
+    if form.validate_on_submit():
+        email = form.email.data
+        result = db.session.execute(db.select(Student).where(Student.email == email))
+        student = result.scalar()
+        if student:
+            flash("The email has been registered")
+            return redirect(url_for('students.add_student'))
+        hashed_pwd = hash_password(form.password.data)
+        new_student = Student(
+            name=form.name.data,
+            grade=form.grade.data,
+            email=email,
+            password=hashed_pwd,
+            address=form.address.data,
+            cellphone=int(form.cellphone.data),
+            tel_number=int(form.tel_number.data)
+        )
+        db.session.add(new_student)
+        db.session.commit()
+        return redirect(url_for('site.home'))
+    return render_template("add_student.html", form=form, logged_in=current_user.is_authenticated, is_edit=False)
+
+
+@students.route('/import_students', methods=["GET", "POST"])
+@admin_only
+def import_students_csv():
+    form = ImportStudentForm()
+    report = None
+    if form.validate_on_submit():
+        written, errors = import_students(form.file.data)
+        report = {'written': written, 'errors': errors}
+    return render_template("import_students.html", form=form, report=report, logged_in=current_user.is_authenticated)
+
+
+@students.route('/edit_student/<int:student_id>', methods=["GET", "POST"])
+@admin_only
+def edit_student(student_id):
+    student = db.get_or_404(Student, student_id)
+    form = EditStudentForm(
+        name=student.name,
+        grade=student.grade,
+        email=student.email,
+        address=student.address,
+        cellphone=student.cellphone,
+        tel_number=student.tel_number,
+        card_number=student.card_number
+    )
+
+    if form.validate_on_submit():
+        student.name = form.name.data
+        student.grade = form.grade.data
+        student.email = form.email.data
+        student.address = form.address.data
+        student.cellphone = form.cellphone.data
+        student.tel_number = form.tel_number.data
+        if form.card_number.data == "":
+            student.card_number = None
+        else:
+            student.card_number = form.card_number.data
+        db.session.commit()
+        return redirect(url_for('students.all_students'))
+
+    return render_template("add_student.html", form=form, logged_in=current_user.is_authenticated, is_edit_student=True,
+                           student_id=student_id)
+
+
+@students.route('/all_students')
+@admin_only
+@replica_reads
+def all_students():
+    def render():
+        page = paginate(student_list(), Student, {'name': Student.name, 'grade': Student.grade})
+        averages = student_averages([student.id for student in page.items])
+        return render_template("tables/students.html", page=page, averages=averages)
+    table = fragments.cached("students", ["students", "scores"], render)
+    return render_template("all_students.html", table=table, logged_in=current_user.is_authenticated)
+
+
+@students.route('/delete_student/<int:student_id>')
+@admin_only
+def delete_student(student_id):
+    student_to_delete = db.get_or_404(Student, student_id)
+    db.session.delete(student_to_delete)
+    db.session.commit()
+    return redirect(url_for('students.all_students'))
+
+
+@students.route('/api/stats/student/<int:student_id>')
+@admin_only
+@replica_reads
+def student_stats_json(student_id):
+    db.get_or_404(Student, student_id)
+    return jsonify(student_trajectory(student_id))
+
+
+@students.route('/api/choices/students')
+@admin_only
+@replica_reads
+def student_choices_json():
+    limit = min(request.args.get('limit', SEARCH_LIMIT, type=int), 100)
+    return jsonify([{'id': student_id, 'name': name}
+                    for student_id, name in search_students(request.args.get('q', ""), limit)])
@@ -0,0 +1,184 @@
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask_login import current_user
+
+from forms import CreateTestForm, CreateScoreForm, UploadScoreForm
+from models import db, Test
+from routing import replica_reads
+import fragments
+from choices import course_choices
+from pagination import paginate
+from summaries import test_summaries
+from stats import test_stats, HISTOGRAM_BUCKET
+from scores import course_roster, insert_scores, read_score_csv, read_score_entries, test_scores, update_scores
+from queries import test_list
+from notify_jobs import enqueue_test_result
+from views import admin_only
+
+tests = Blueprint("tests", __name__)
+
+
+@tests.route('/add_test', methods=["GET", "POST"])
+@admin_only
+def add_test():
+    form = CreateTestForm()
+    form.course.choices = course_choices(current_user.id)
+    if form.validate_on_submit():
+        new_test = Test(
+            title=form.title.data,
+            teacher_id=current_user.id,
+            course_id=form.course.data
+        )
+        db.session.add(new_test)
+        db.session.commit()
+        return redirect(url_for('site.home'))
+    return render_template("add_test.html", form=form, logged_in=current_user.is_authenticated)
+
+
+def submitted_scores(form, roster):
+    """Validate a posted CreateScoreForm, returns ({student_id: score}, errors) and flashes the errors."""
+    form.validate_on_submit()
+    scores, errors = read_score_entries(form.scores.entries, roster)
+    errors = form.errors.get('csrf_token', []) + errors
+    for error in errors:
+        flash(error)
+    return scores, errors
+
+
+def render_score_form(form, roster, test_id, is_edit):
+    # the typed scores stay, the labels are gone after a POST
+    for entry in form.scores:
+        value = entry.student_id.data or ""
+        entry.label.text = roster.get(int(value), "") if value.isdigit() else ""
+    return render_template("add_score.html", form=form, test_id=test_id, is_edit=is_edit,
+                           logged_in=current_user.is_authenticated)
+
+
+@tests.route('/add_score/<int:test_id>', methods=["GET", "POST"])
+@admin_only
+def add_score(test_id):
+    test = db.get_or_404(Test, test_id)
+    form = CreateScoreForm()
+    roster = dict(course_roster(test.course_id))
+
+    if request.method == "POST":
+        # form.scores.data = [{'student_id': '1', 'score': 123, 'csrf_token': '...'}, {'student_id': '2', 'score': None, ...}]
+        # 只收這堂課的學生, 若沒有成績則為None
+        scores, errors = submitted_scores(form, roster)
+        if not errors:
+            insert_scores(test_id, scores)
+            db.session.commit()
+            return redirect(url_for('site.home'))
+        return render_score_form(form, roster, test_id, is_edit=False)
+
+    for i, (student_id, name) in enumerate(roster.items()):
+        form.scores.append_entry()
+        # Add a new entry for each student
+        form.scores.entries[i].student_id.data = student_id
+        form.scores.entries[i].label.text = name
+        # Set the label of the new entry as the student's name
+
+    return render_template("add_score.html",
+                           form=form,
+                           test_id=test_id,
+                           is_edit=False,
+                           logged_in=current_user.is_authenticated
+                           )
+
+
+@tests.route('/upload_scores/<int:test_id>', methods=["GET", "POST"])
+@admin_only
+def upload_scores(test_id):
+    test = db.get_or_404(Test, test_id)
+    form = UploadScoreForm()
+    if form.validate_on_submit():
+        scores, errors = read_score_csv(form.file.data, test.course_id)
+        for error in errors:
+            flash(error)
+        if errors:
+            return redirect(url_for('tests.upload_scores', test_id=test_id))
+        insert_scores(test_id, scores)
+        db.session.commit()
+        return redirect(url_for('tests.all_tests'))
+    return render_template("add_test.html", form=form, logged_in=current_user.is_authenticated)
+
+
+@tests.route('/edit_score/<int:test_id>', methods=["POST", "GET"])
+@admin_only
+def edit_score(test_id):
+    db.get_or_404(Test, test_id)
+    form = CreateScoreForm()
+    current = test_scores(test_id)
+    roster = {student_id: name for student_id, name, score in current}
+
+    # 放在for loop之下會造成新的資料被for loop覆蓋成就的資料
+    if request.method == "POST":
+        # 用student_id對應成績, 只更新有改變的成績
+        scores, errors = submitted_scores(form, roster)
+        if not errors:
+            update_scores(test_id, scores)
+            db.session.commit()
+            return redirect(url_for('tests.all_tests'))
+        return render_score_form(form, roster, test_id, is_edit=True)
+
+    for i, (student_id, name, score) in enumerate(current):
+        form.scores.append_entry()
+        # Add a new entry for each student
+        form.scores.entries[i].student_id.data = student_id
+        form.scores.entries[i].label.text = name
+        # Set the label of the new entry as the student's name
+        form.scores[i].score.data = score
+
+    return render_template("add_score.html",
+                           form=form,
+                           test_id=test_id,
+                           is_edit=True,
+                           logged_in=current_user.is_authenticated
+                           )
+
+
+@tests.route('/delete_test/<int:test_id>')
+@admin_only
+def delete_test(test_id):
+    test = db.get_or_404(Test, test_id)
+    db.session.delete(test)
+    db.session.commit()
+    return redirect(url_for('site.home'))
+
+
+@tests.route('/all_tests')
+@admin_only
+@replica_reads
+def all_tests():
+    def render():
+        page = paginate(test_list(), Test, {'title': Test.title}, scalars=False)
+        summaries = test_summaries([test.id for test, has_scores in page.items])
+        return render_template("tables/tests.html", page=page, summaries=summaries)
+    table = fragments.cached("tests", ["tests", "courses", "users", "scores"], render)
+    return render_template("all_tests.html", table=table, logged_in=current_user.is_authenticated)
+
+
+@tests.route('/test/<int:test_id>')
+@admin_only
+@replica_reads
+def test(test_id):
+    db.get_or_404(Test, test_id)
+    stats = test_stats(test_id)
+    return render_template("test.html", data=stats['ranking'], stats=stats, logged_in=current_user.is_authenticated)
+
+
+@tests.route('/api/stats/test/<int:test_id>')
+@admin_only
+@replica_reads
+def test_stats_json(test_id):
+    db.get_or_404(Test, test_id)
+    bucket = max(request.args.get('bucket', HISTOGRAM_BUCKET, type=int), 1)
+    return jsonify(test_stats(test_id, bucket=bucket))
+
+
+@tests.route('/push_test_result/<int:test_id>')
+@admin_only
+def push_test_result(test_id):
+    test = db.get_or_404(Test, test_id)
+    job = enqueue_test_result(test)
+    # the messages are sent by worker.py
+    return redirect(url_for('comms.notify_job', job_id=job.id))
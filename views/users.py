@@ -0,0 +1,50 @@
+from flask import Blueprint, render_template, redirect, url_for
+from flask_login import current_user
+
+from forms import EditUserForm
+from models import db, User
+from routing import replica_reads
+import fragments
+from pagination import paginate
+from queries import user_list
+from views import admin_only
+
+users = Blueprint("users", __name__)
+
+
+@users.route('/edit_user/<int:user_id>', methods=["GET", "POST"])
+@admin_only
+def edit_user(user_id):
+    user = db.get_or_404(User, user_id)
+    form = EditUserForm(
+        name=user.name,
+        email=user.email,
+        cellphone=user.cellphone
+    )
+    if form.validate_on_submit():
+        user.name = form.name.data
+        user.email = form.email.data
+        user.cellphone = form.cellphone.data
+        db.session.commit()
+        return redirect(url_for('users.all_users'))
+    return render_template("add_student.html", form=form, logged_in=current_user.is_authenticated, user_id=user_id)
+
+
+@users.route('/all_users')
+@admin_only
+@replica_reads
+def all_users():
+    def render():
+        page = paginate(user_list(), User, {'name': User.name, 'email': User.email})
+        return render_template("tables/users.html", page=page)
+    table = fragments.cached("users", ["users", "courses"], render)
+    return render_template("all_users.html", table=table, logged_in=current_user.is_authenticated)
+
+
+@users.route('/delete_user/<int:user_id>')
+@admin_only
+def delete_user(user_id):
+    user_to_delete = db.get_or_404(User, user_id)
+    db.session.delete(user_to_delete)
+    db.session.commit()
+    return redirect(url_for('users.all_users'))
@@ -0,0 +1,37 @@
+import logging
+import os
+import time
+
+from main import app
+from models import db
+from notify_jobs import run_once
+
+# Seconds to wait before polling again when the queue is empty
+POLL_INTERVAL = float(os.environ.get("NOTIFY_POLL_INTERVAL", 2))
+# After a failed round the wait doubles from POLL_INTERVAL up to this many seconds
+MAX_BACKOFF = float(os.environ.get("NOTIFY_MAX_BACKOFF", 60))
+
+logger = logging.getLogger("notify_worker")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    backoff = POLL_INTERVAL
+    while True:
+        with app.app_context():
+            try:
+                done = run_once()
+            except Exception:
+                # a database or LINE error, what the round didn't commit is picked up by a later one
+                db.session.rollback()
+                logger.exception("notify round failed, retrying in %g s", backoff)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                continue
+        backoff = POLL_INTERVAL
+        if not done:
+            time.sleep(POLL_INTERVAL)
+
+
+if __name__ == "__main__":
+    main()